@@ -1,26 +1,59 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from typing import Optional, List
-import tempfile
-import os
-import random
-import string
+import asyncio
+import json
+import logging
+import threading
 import numpy as np
-import librosa
-import re
 
-from core.preprocessing import load_audio
 from core.speaker_model import ECAPAModel
-from core.anti_spoofing import liveness_detector
-from database.milvus_client import (
-    init_milvus,
+from core.batching import EmbeddingBatcher
+from core.pipeline import prepare_clip
+from core.streaming import StreamingSession
+from core.preprocessing import AudioDecodeError, AudioTooLarge
+from core.worker_pool import AudioWorkerPool, PoolSaturated, PoolUnavailable, PipelineTimeout
+from core.metrics import (
+    stage_timer,
+    observe_timings,
+    render_prometheus,
+    DECISIONS,
+    REQUESTS_IN_FLIGHT,
+    BACKEND_ERRORS,
+)
+from core.log import get_logger, log_event
+from database.vector_store import (
+    init_vector_store,
     search_embedding,
-    insert_embedding
+    index_stats,
+)
+from database.postgres_client import init_db, log_auth
+from database.enrollment import (
+    commit_enrollment,
+    active_hits,
+    active_role,
+    EnrollmentCommitError,
+    PendingEnrollmentReaper,
+)
+from database.audit_log import AuditLogWriter
+from config.settings import (
+    SAMPLE_RATE,
+    SIMILARITY_THRESHOLD,
+    MIN_AUDIO_DURATION,
+    STREAM_MAX_SECONDS,
+    MAX_UPLOAD_BYTES,
+    EMBEDDING_BATCHING_ENABLED,
+    WORKER_POOL_ENABLED,
+    WORKER_RETRY_AFTER_SECONDS,
+    AUDIT_LOG_ASYNC,
+    VECTOR_STORE_BACKEND,
+    VECTOR_PARTITION_KEY,
+    VERIFY_CANDIDATES,
 )
-from database.postgres_client import init_db, log_auth, create_user
-from config.settings import SIMILARITY_THRESHOLD
 from api.auth import router as auth_router, get_current_active_user, get_current_admin_user
-from core.security import get_password_hash
+from core.security import get_password_hash, generate_speaker_id, is_valid_speaker_id, SPEAKER_ID_PATTERN
 from fastapi import Depends
 from schemas import UserResponse
 
@@ -36,11 +69,137 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(auth_router)
 
-model = ECAPAModel()
+logger = get_logger("api")
+
+
+@app.middleware("http")
+async def track_in_flight(request, call_next):
+    REQUESTS_IN_FLIGHT.inc()
+    try:
+        return await call_next(request)
+    finally:
+        REQUESTS_IN_FLIGHT.dec()
+
+# In worker-pool mode each pool process holds its own model; the API process needs none.
+worker_pool = AudioWorkerPool() if WORKER_POOL_ENABLED else None
+model = None if WORKER_POOL_ENABLED else ECAPAModel()
+embedding_batcher = EmbeddingBatcher(model) if (model is not None and EMBEDDING_BATCHING_ENABLED) else None
+audit_logger = AuditLogWriter() if AUDIT_LOG_ASYNC else None
+enrollment_reaper = PendingEnrollmentReaper()
+
+
+def record_auth(speaker_id, score, decision):
+    DECISIONS.inc(decision=decision)
+    with stage_timer("auth_log"):
+        if audit_logger is not None:
+            audit_logger.log(speaker_id, score, decision)
+            return
+        try:
+            log_auth(speaker_id, score, decision)
+        except Exception:
+            BACKEND_ERRORS.inc(backend="postgres")
+            raise
+
+
+def parse_scope(scope: Optional[str]) -> Optional[List[str]]:
+    """
+    Comma-separated roles limiting a 1:N search to their partitions.
+    """
+    if not scope:
+        return None
+    if VECTOR_PARTITION_KEY != "role":
+        raise HTTPException(status_code=400, detail="scope requires the vector store to be partitioned by role")
+    return [value.strip() for value in scope.split(",") if value.strip()] or None
+
+
+def find_speaker(embedding, speaker_id=None, scope=None):
+    """
+    Vector store search, timed and counted like the other stages. Only
+    speakers with an active voice profile are returned.
+    """
+    # With role partitions a 1:1 lookup goes straight to the speaker's partition.
+    # The role comes from the cache active_hits then reads, so a known
+    # speaker costs no Postgres query at all.
+    partition_key = active_role(speaker_id) if speaker_id and VECTOR_PARTITION_KEY == "role" else None
+    top_k = 1 if speaker_id else VERIFY_CANDIDATES
+    try:
+        with stage_timer("vector_search"):
+            hits = search_embedding(embedding, top_k=top_k, speaker_id=speaker_id, scope=scope,
+                                    partition_key=partition_key)
+    except Exception:
+        BACKEND_ERRORS.inc(backend=VECTOR_STORE_BACKEND)
+        raise
+    return active_hits(hits)
+
+
+async def embed(audio):
+    if embedding_batcher is not None:
+        return await embedding_batcher.embed(audio)
+    return await run_in_threadpool(model.extract_embedding, audio)
+
+
+async def read_upload(file: UploadFile, chunk_size: int = 1024 * 1024) -> bytes:
+    """
+    Read an upload into memory, refusing anything over MAX_UPLOAD_BYTES
+    before it is fully buffered.
+    """
+    chunks = []
+    total = 0
+    with stage_timer("upload_read"):
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            total += len(chunk)
+            if total > MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail=f"Upload larger than {MAX_UPLOAD_BYTES} bytes")
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def analyze_upload(data: bytes, min_duration: float = None, embed_audio: bool = True) -> dict:
+    """
+    Run decode → liveness → embed for one upload without blocking the event loop.
+    Result shape matches core.pipeline.process_clip.
+
+    With embed_audio=False the in-process path stops before the model and
+    keeps "audio" (embedding None) so callers can embed several clips as
+    one batch; pool workers always return the embedding.
+    """
+    try:
+        if worker_pool is not None:
+            clip = await worker_pool.run(data, min_duration)
+            observe_timings(clip.pop("timings"))
+            return clip
+
+        clip = await run_in_threadpool(prepare_clip, data, min_duration)
+        observe_timings(clip.pop("timings"))
+        clip["embedding"] = None
+        if not embed_audio:
+            return clip
+        audio = clip.pop("audio", None)
+        if audio is not None:
+            with stage_timer("embedding"):
+                clip["embedding"] = await embed(audio)
+        return clip
+
+    except (PoolSaturated, PoolUnavailable) as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(WORKER_RETRY_AFTER_SECONDS)},
+        )
+    except PipelineTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except AudioTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except AudioDecodeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 # -------------------------
@@ -50,10 +209,31 @@ model = ECAPAModel()
 def startup_event():
     init_db()
     try:
-        init_milvus()
+        init_vector_store()
     except Exception as e:
-        print(" Milvus not available at startup, will retry on demand")
-        print(str(e))
+        log_event(logger, logging.WARNING, "vector_store_unavailable", error=str(e), note="will retry on demand")
+
+    if embedding_batcher is not None:
+        embedding_batcher.start()
+    if worker_pool is not None:
+        worker_pool.start()
+    if model is not None:
+        # Warm up off the startup path so /health answers meanwhile; /ready waits for it
+        threading.Thread(target=model.warm_up, name="model-warmup", daemon=True).start()
+    if audit_logger is not None:
+        audit_logger.start()
+    enrollment_reaper.start()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    if embedding_batcher is not None:
+        embedding_batcher.stop()
+    if worker_pool is not None:
+        worker_pool.stop()
+    if audit_logger is not None:
+        audit_logger.stop()
+    enrollment_reaper.stop()
 
 
 # -------------------------
@@ -64,6 +244,56 @@ def health():
     return {"status": "OK"}
 
 
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/ready")
+def ready(response: Response):
+    is_ready = worker_pool.ready if worker_pool is not None else model.ready
+    if not is_ready:
+        response.status_code = 503
+        return {"status": "warming up"}
+    return {"status": "ready"}
+
+
+# -------------------------
+# Embedding Batcher Stats
+# -------------------------
+@app.get("/stats/batching")
+def batching_stats():
+    if embedding_batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **embedding_batcher.stats()}
+
+
+@app.get("/stats/workers")
+def worker_stats():
+    if worker_pool is None:
+        return {"enabled": False}
+    return {"enabled": True, **worker_pool.stats()}
+
+
+@app.get("/stats/embedding-cache")
+def embedding_cache_stats():
+    if model is None or model.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **model.cache.stats()}
+
+
+@app.get("/stats/vector-index")
+def vector_index_stats():
+    return {"backend": VECTOR_STORE_BACKEND, **index_stats()}
+
+
+@app.get("/stats/audit-log")
+def audit_log_stats():
+    if audit_logger is None:
+        return {"enabled": False}
+    return {"enabled": True, **audit_logger.stats()}
+
+
 # -------------------------
 # Enroll Speaker
 # -------------------------
@@ -71,6 +301,47 @@ def health():
 
 # ...
 
+def check_enrollment_clip(clip: dict, filename: str):
+    if clip["status"] == "too_short":
+        raise HTTPException(status_code=400, detail=f"No speech detected in {filename}")
+    if clip["status"] == "spoof":
+        raise HTTPException(
+            status_code=400,
+            detail=f"Spoof detected in {filename}: {clip['liveness']['reason']}"
+        )
+
+
+async def analyze_enrollment_samples(samples: List[UploadFile]) -> list:
+    """
+    Decode and liveness-check every sample concurrently, failing on the
+    first rejected one (the others are cancelled), then embed the accepted
+    clips as one batch. Returns one embedding per sample, in order.
+    """
+    payloads = await asyncio.gather(*(read_upload(file) for file in samples))
+    tasks = [asyncio.ensure_future(analyze_upload(data, embed_audio=False)) for data in payloads]
+    filenames = {task: file.filename for task, file in zip(tasks, samples)}
+
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                check_enrollment_clip(task.result(), filenames[task])
+    finally:
+        for task in pending:
+            task.cancel()
+
+    clips = [task.result() for task in tasks]
+    # Pool workers embed in-process; everything else goes through the model once
+    unembedded = [clip for clip in clips if clip["embedding"] is None]
+    if unembedded:
+        with stage_timer("embedding"):
+            embeddings = await run_in_threadpool(model.extract_embeddings, [clip.pop("audio") for clip in unembedded])
+        for clip, embedding in zip(unembedded, embeddings):
+            clip["embedding"] = embedding
+    return [clip["embedding"] for clip in clips]
+
+
 @app.post("/enroll")
 async def enroll(
     full_name: str = Form(...),
@@ -81,101 +352,33 @@ async def enroll(
     sample_2: UploadFile = File(...),
     sample_3: UploadFile = File(...),
 ):
-    # 1. Create User in DB
+    # 1. Process Audio Samples (nothing is written until all three pass)
     try:
-        # Generate ID from name with special format
-        # Rule: First 3 chars of First Name + "$" + First 3 chars of Last Name (or similar)
-        # "John Doe" -> "joh$doe"
-        # "Alice" -> "ali$ice"
-        
-        # 1. Clean name (keep only letters)
-        clean_name = re.sub(r'[^a-zA-Z]', '', full_name)
-        
-        # Ensure we have enough letters, else pad with random
-        if not clean_name:
-            # Fallback if name has no letters
-            clean_name = string.ascii_letters 
-        
-        # First 3 digits: Random letters from user's name (alphabets only)
-        # Using choices() handles names shorter than 3 chars by repeating
-        prefix = ''.join(random.choices(clean_name, k=3))
-        
-        # Remaining 7 digits: Random alphanumeric
-        suffix_chars = string.ascii_letters + string.digits
-        suffix = ''.join(random.choices(suffix_chars, k=7))
-        
-        speaker_id = prefix + suffix
-        
-        # hashed_pw = get_password_hash(password)
-        create_user(full_name, email, role, user_id=speaker_id, hashed_password=None)
+        embeddings = await analyze_enrollment_samples([sample_1, sample_2, sample_3])
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"DEBUG: Database Error in enroll: {e}")
-        raise HTTPException(status_code=500, detail=f"Database Error: {str(e)}")
+        log_event(logger, logging.ERROR, "enroll_failed", exc_info=True, error=str(e))
+        raise HTTPException(status_code=500, detail=f"Enrollment Logic Failed: {str(e)}")
 
-    # 2. Process Audio Samples
-    samples = [sample_1, sample_2, sample_3]
-    embeddings = []
+    # 2. Average Embeddings (Mean Vector)
+    mean_embedding = np.mean(embeddings, axis=0).tolist()
 
+    # 3. Store user + vector: both land or neither does
+    speaker_id = generate_speaker_id(full_name)
     try:
-        for file in samples:
-            if not file.filename.lower().endswith(('.wav', '.webm', '.ogg', '.mp3')):
-                 # Frontend sends .webm blobs
-                pass 
-            
-            # Write to temp
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-                tmp.write(await file.read())
-                tmp_path = tmp.name
-            
-            try:
-                # Load and Extract
-                audio = load_audio(tmp_path)
-
-                # Liveness Check
-                liveness = liveness_detector.analyze(audio)
-                if not liveness["is_live"]:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Spoof detected in {file.filename}: {liveness['reason']}"
-                    )
-
-                emb = model.extract_embedding(audio)
-                embeddings.append(emb)
-            finally:
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
-
-        # 3. Average Embeddings (Mean Vector)
-        if not embeddings:
-            raise HTTPException(status_code=400, detail="No valid audio samples processed")
-        
-        # Stack and average
-        # embeddings is list of numpy arrays or lists (depending on model output)
-        # assuming extract_embedding returns a list or numpy array
-        mean_embedding = np.mean(embeddings, axis=0)
-        
-        # Ensure it's a list for Milvus
-        if isinstance(mean_embedding, np.ndarray):
-            mean_embedding = mean_embedding.tolist()
+        await run_in_threadpool(commit_enrollment, speaker_id, full_name, email, role, mean_embedding)
+    except EnrollmentCommitError as e:
+        raise HTTPException(status_code=500, detail=f"Enrollment failed and was rolled back: {e.cause}")
 
-        # 4. Store in Vector DB
-        insert_embedding(speaker_id, mean_embedding)
-        
-        # 5. Log Action
-        log_auth(speaker_id, 1.0, "ENROLLED")
+    # 4. Log Action
+    record_auth(speaker_id, 1.0, "ENROLLED")
 
-        return {
-            "status": "success",
-            "user_id": speaker_id,
-            "message": f"User {full_name} enrolled successfully with 3-sample average."
-        }
-
-    except Exception as e:
-        # TODO: Rollback user creation if vectors fail?
-        print(f"DEBUG: Enrollment Logic Failed: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Enrollment Logic Failed: {str(e)}")
+    return {
+        "status": "success",
+        "user_id": speaker_id,
+        "message": f"User {full_name} enrolled successfully with 3-sample average."
+    }
 
 
 
@@ -183,53 +386,85 @@ async def enroll(
 # Admin: List Users
 # -------------------------
 @app.get("/users", response_model=List[UserResponse])
-def list_users():
-    from database.postgres_client import get_all_users
-    users = get_all_users()
+def list_users(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    role: Optional[str] = None,
+    status: Optional[str] = None,
+    current_user = Depends(get_current_admin_user),
+):
+    """
+    One page of users, newest first. When more remain, the cursor for the
+    next page is returned in the X-Next-Cursor header.
+    """
+    from database.postgres_client import list_users_page
+    try:
+        users, next_cursor = list_users_page(limit=limit, cursor=cursor, role=role, status=status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return users
 
 
+@app.get("/users/export")
+def export_users(
+    role: Optional[str] = None,
+    status: Optional[str] = None,
+    current_user = Depends(get_current_admin_user),
+):
+    """
+    Full registry dump as NDJSON, streamed with constant memory.
+    """
+    from database.postgres_client import iter_users
+
+    def generate():
+        for user in iter_users(role=role, status=status):
+            if user["created_at"] is not None:
+                user["created_at"] = user["created_at"].isoformat()
+            yield json.dumps(user) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
 # -------------------------
 # Verify / Identify Speaker
 # -------------------------
 @app.post("/verify")
 async def verify(
     file: UploadFile = File(...),
-    speaker_id: Optional[str] = None,
+    speaker_id: Optional[str] = Query(None, pattern=SPEAKER_ID_PATTERN),
+    scope: Optional[str] = None,
     # current_user: dict = Depends(get_current_active_user) # Removed to allow public voice verification
 ):
     if not file.filename.lower().endswith(('.wav', '.webm', '.ogg', '.mp3')):
          # Frontend sends .wav now, but good to be permissive
         pass 
-    
-    # Write to temp
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-        tmp.write(await file.read())
-        tmp_path = tmp.name
+
+    scope_values = parse_scope(scope)
 
     try:
-        audio = load_audio(tmp_path)
+        # Decode, Duration Check, Liveness Check and Extract
+        clip = await analyze_upload(await read_upload(file), min_duration=MIN_AUDIO_DURATION)
         
-        # Duration Check
-        duration = librosa.get_duration(y=audio, sr=16000)
-        print(f"DEBUG: Audio Duration: {duration}s")
+        duration = clip["speech_duration"]
+        log_event(logger, logging.DEBUG, "verify_audio", duration=clip["duration"], speech_duration=duration)
         
-        # Import MIN_AUDIO_DURATION if not already available
-        from config.settings import MIN_AUDIO_DURATION
-        
-        if duration < MIN_AUDIO_DURATION:
+        if clip["status"] == "too_short":
             return {
                 "verified": False,
                 "similarity_score": 0.0,
                 "matched_speaker_id": None,
-                "message": f"Audio too short ({duration:.2f}s). Please speak for at least {MIN_AUDIO_DURATION} seconds."
+                "message": f"Not enough speech ({duration:.2f}s). Please speak for at least {MIN_AUDIO_DURATION} seconds."
             }
 
         # Liveness Check
-        liveness = liveness_detector.analyze(audio)
-        print(f"DEBUG: Liveness Result: {liveness}")
-        if not liveness["is_live"]:
-            log_auth(
+        liveness = clip["liveness"]
+        log_event(logger, logging.DEBUG, "verify_liveness", **(liveness or {}))
+        if clip["status"] == "spoof":
+            record_auth(
                 speaker_id if speaker_id else -1,
                 0.0,
                 "SPOOF_REJECTED"
@@ -241,11 +476,10 @@ async def verify(
                 "message": f"Spoof detected: {liveness['reason']}"
             }
 
-        embedding = model.extract_embedding(audio)
+        embedding = clip["embedding"]
 
         # If speaker_id is provided, we filter by it
-        print(f"DEBUG: Searching with speaker_id={speaker_id}")
-        results = search_embedding(embedding, speaker_id=speaker_id)
+        results = await run_in_threadpool(find_speaker, embedding, speaker_id, scope_values)
         
         verified = False
         similarity_score = 0.0
@@ -254,27 +488,29 @@ async def verify(
         if results:
             best_match = results[0]
             matched_id = best_match.id
-            # Milvus returns Cosine Similarity in the 'distance' field for COSINE metric
+            # Both stores return Cosine Similarity in the 'distance' field
             similarity_score = best_match.distance  
-            print(f"DEBUG: Match Found. ID={matched_id}, Score={similarity_score}")
+            log_event(logger, logging.DEBUG, "verify_match", speaker_id=speaker_id, matched_id=matched_id, score=similarity_score)
             
             # If specific speaker_id was requested, we only care if that one matched
             if speaker_id is not None:
                 if matched_id == speaker_id and similarity_score >= SIMILARITY_THRESHOLD:
                     verified = True
                 else:
-                    print(f"DEBUG: Verification Failed. Target={speaker_id}, Matched={matched_id}, Score={similarity_score} < {SIMILARITY_THRESHOLD}")
+                    log_event(logger, logging.DEBUG, "verify_rejected", speaker_id=speaker_id, matched_id=matched_id,
+                              score=similarity_score, threshold=SIMILARITY_THRESHOLD)
             else:
                 # If no ID provided, verify against best match (1:N)
                 if similarity_score >= SIMILARITY_THRESHOLD:
                     verified = True
                 else:
-                    print(f"DEBUG: Verification Failed. Best Match={matched_id}, Score={similarity_score} < {SIMILARITY_THRESHOLD}")
+                    log_event(logger, logging.DEBUG, "verify_rejected", matched_id=matched_id,
+                              score=similarity_score, threshold=SIMILARITY_THRESHOLD)
         else:
-            print("DEBUG: No results found in Milvus.")
+            log_event(logger, logging.DEBUG, "verify_no_results", speaker_id=speaker_id)
 
         # Log Result
-        log_auth(
+        record_auth(
             speaker_id if speaker_id else (matched_id if matched_id else -1),
             similarity_score,
             "VERIFIED" if verified else "REJECTED"
@@ -287,12 +523,144 @@ async def verify(
             "message": "Verification successful" if verified else "Voice mismatch detected"
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"ERROR: Verification Logic Failed: {e}")
-        import traceback
-        traceback.print_exc()
+        log_event(logger, logging.ERROR, "verify_failed", exc_info=True, speaker_id=speaker_id, error=str(e))
         raise HTTPException(status_code=500, detail=f"Verification Logic Failed: {str(e)}")
 
-    finally:
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
+
+# -------------------------
+# Streaming Verification
+# -------------------------
+async def score_window(wav: bytes, speaker_id: Optional[str], min_speech: float, scope: Optional[List[str]] = None) -> dict:
+    """
+    VAD + liveness + embedding + search for one rolling window.
+    Returns the analyze_upload result with "similarity_score" and
+    "matched_speaker_id" added (0.0 / None unless status is "ok").
+    """
+    clip = await analyze_upload(wav, min_duration=min_speech)
+    clip["similarity_score"], clip["matched_speaker_id"] = 0.0, None
+    if clip["status"] != "ok":
+        return clip
+
+    results = await run_in_threadpool(find_speaker, clip["embedding"], speaker_id, scope)
+    if results:
+        best = results[0]
+        clip["matched_speaker_id"] = best.id
+        if speaker_id is None or best.id == speaker_id:
+            clip["similarity_score"] = float(best.distance)
+    return clip
+
+
+@app.websocket("/ws/verify")
+async def verify_stream(
+    websocket: WebSocket,
+    speaker_id: Optional[str] = None,
+    sample_rate: int = SAMPLE_RATE,
+    scope: Optional[str] = None,
+):
+    """
+    Streaming counterpart of /verify.
+
+    The client sends 16 kHz mono PCM16 as binary frames while the user
+    speaks, then the text frame "end". After each scored window the server
+    sends {"type": "partial", ...}; it then sends one {"type": "decision", ...}
+    (same fields as /verify, plus "early" and "seconds") and closes. The
+    decision arrives before "end" when the score is confidently past
+    SIMILARITY_THRESHOLD.
+    """
+    await websocket.accept()
+    if sample_rate != SAMPLE_RATE:
+        await websocket.send_json({"type": "error", "message": f"sample_rate must be {SAMPLE_RATE}"})
+        await websocket.close(code=1003)
+        return
+    if speaker_id is not None and not is_valid_speaker_id(speaker_id):
+        await websocket.send_json({"type": "error", "message": "speaker_id must be 10 letters or digits"})
+        await websocket.close(code=1003)
+        return
+    try:
+        scope_values = parse_scope(scope)
+    except HTTPException as e:
+        await websocket.send_json({"type": "error", "message": e.detail})
+        await websocket.close(code=1003)
+        return
+
+    session = StreamingSession()
+    early = None
+
+    try:
+        while session.seconds < STREAM_MAX_SECONDS:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes"):
+                session.feed(message["bytes"])
+            elif message.get("text") == "end":
+                break
+
+            if session.due():
+                # Windows without enough speech yet are reported but never decide
+                window = await score_window(session.window_wav(), speaker_id, session.decision.min_seconds, scope_values)
+                is_live = window["status"] == "ok"
+                await websocket.send_json({
+                    "type": "partial",
+                    "seconds": round(session.seconds, 2),
+                    "speech_seconds": round(window["speech_duration"], 2),
+                    "similarity_score": window["similarity_score"],
+                    "live": is_live,
+                })
+                if window["status"] != "too_short":
+                    early = session.decision.update(window["similarity_score"], is_live, window["speech_duration"])
+                    if early is not None:
+                        break
+
+        # Early decisions come from the last window; otherwise the final window
+        # is rescored under /verify's speech gate (an embedding cache hit if unchanged)
+        if early is None:
+            window = await score_window(session.window_wav(), speaker_id, MIN_AUDIO_DURATION, scope_values)
+            if window["status"] == "too_short":
+                await websocket.send_json({
+                    "type": "decision",
+                    "verified": False,
+                    "similarity_score": 0.0,
+                    "matched_speaker_id": None,
+                    "early": False,
+                    "seconds": round(session.seconds, 2),
+                    "message": f"Not enough speech ({window['speech_duration']:.2f}s). Please speak for at least {MIN_AUDIO_DURATION} seconds."
+                })
+                await websocket.close()
+                return
+
+        liveness = window["liveness"]
+        if early is not None:
+            verified = early
+        else:
+            verified = session.decision.final(window["similarity_score"], liveness["is_live"])
+
+        score, matched_id = window["similarity_score"], window["matched_speaker_id"]
+        if not liveness["is_live"]:
+            decision, message = "SPOOF_REJECTED", f"Spoof detected: {liveness['reason']}"
+        elif verified:
+            decision, message = "VERIFIED", "Verification successful"
+        else:
+            decision, message = "REJECTED", "Voice mismatch detected"
+
+        record_auth(speaker_id if speaker_id else (matched_id if matched_id else -1), score, decision)
+
+        await websocket.send_json({
+            "type": "decision",
+            "verified": verified,
+            "similarity_score": score,
+            "matched_speaker_id": matched_id,
+            "early": early is not None,
+            "seconds": round(session.seconds, 2),
+            "message": message,
+        })
+        await websocket.close()
+
+    except WebSocketDisconnect:
+        return
+    except HTTPException as e:
+        await websocket.send_json({"type": "error", "message": e.detail})
+        await websocket.close(code=1011)
@@ -1,53 +1,57 @@
 import numpy as np
-import os
-try:
-    from scipy.signal import welch
-except ImportError:
-    welch = None
+
+from core.features import AudioClip, N_FFT, WINDOW
 
 class LivenessDetector:
     def __init__(self):
         self.threshold = 0.5
 
-    def analyze(self, audio_data: np.ndarray, sample_rate: int = 16000) -> dict:
+    def analyze(self, audio_data, sample_rate: int = 16000) -> dict:
         """
         Analyze audio for liveness.
+        Accepts an AudioClip (sharing its cached STFT) or a raw numpy signal.
         Returns a dictionary with 'is_live' (bool) and 'score' (float).
         """
-        if len(audio_data) == 0:
+        clip = audio_data if isinstance(audio_data, AudioClip) else AudioClip(audio_data, sample_rate)
+
+        if len(clip) == 0:
              return {"is_live": False, "score": 0.0, "reason": "Empty audio"}
 
-        # 1. Energy Analysis
-        energy = np.mean(audio_data ** 2)
+        # All checks below work on the shared frame-level power spectrum
+        power = clip.power_spectrum
+
+        # 1. Energy Analysis (mean over frames of per-frame mean-square amplitude)
+        energy = float(np.mean(clip.frame_energy))
         if energy < 1e-5: # Silence check
             return {"is_live": False, "score": 0.0, "reason": "Audio too silent"}
 
         # 2. Spectral Analysis (Simple Heuristic for now)
         # Real liveness detection needs a trained Deepfake detection model (e.g. RawNet2).
-        # Here we implement a placeholder check for 'Spectral Flatness' logic if scipy is available
-        # or simple variance check.
-        
+
         score = 1.0
         reason = "Pass"
 
         # Heuristic: Synthetic speech sometimes has lower variance in energy compared to natural speech
         # (Very simplified assumption)
-        variance = np.var(audio_data)
+        # Variance = energy without the DC bin
+        dc = power[:, 0] / (N_FFT * float(np.sum(WINDOW ** 2)))
+        variance = float(np.mean(clip.frame_energy - dc))
         if variance < 1e-4:
              score -= 0.2
              reason = "Low variance (possible synthesis)"
 
         # Heuristic: Check significant frequency content
         # (Replay often loses high freq)
-        if welch:
-            freqs, psd = welch(audio_data, fs=sample_rate)
-            # Check energy < 300Hz (Bass) vs > 3000Hz (Treble)
-            low_freq_energy = np.sum(psd[(freqs < 300)])
-            high_freq_energy = np.sum(psd[(freqs > 3000)])
-            
-            if high_freq_energy < (low_freq_energy * 0.01): # Arbitrary heuristic
-                score -= 0.3
-                reason = "Muffled Audio (possible replay)"
+        # Averaging frame spectra gives a Welch-style PSD estimate for free
+        psd = power.mean(axis=0)
+        freqs = clip.freqs
+        # Check energy < 300Hz (Bass) vs > 3000Hz (Treble)
+        low_freq_energy = np.sum(psd[(freqs < 300)])
+        high_freq_energy = np.sum(psd[(freqs > 3000)])
+
+        if high_freq_energy < (low_freq_energy * 0.01): # Arbitrary heuristic
+            score -= 0.3
+            reason = "Muffled Audio (possible replay)"
 
         is_live = score > 0.7
 
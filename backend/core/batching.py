@@ -0,0 +1,157 @@
+# core/batching.py
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from config.settings import EMBEDDING_BATCH_MAX_SIZE, EMBEDDING_BATCH_MAX_WAIT_MS
+from core.metrics import Histogram
+
+_STOP = object()
+
+
+class _Pending:
+    __slots__ = ("audio", "future", "enqueued_at")
+
+    def __init__(self, audio: np.ndarray):
+        self.audio = audio
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class EmbeddingBatcher:
+    """
+    Collects clips from concurrent requests and runs them through a single
+    ECAPAModel.extract_embeddings call.
+
+    A batch is dispatched when it reaches max_batch_size or when the oldest
+    clip in it has waited max_wait_ms, whichever comes first. The model runs
+    on a dedicated worker thread so the event loop is never blocked.
+    """
+
+    def __init__(
+        self,
+        model,
+        max_batch_size: int = EMBEDDING_BATCH_MAX_SIZE,
+        max_wait_ms: float = EMBEDDING_BATCH_MAX_WAIT_MS,
+    ):
+        self.model = model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self.batch_size_hist = Histogram(
+            "embedding_batch_size",
+            [1, 2, 4, 8, 16, 32, 64],
+        )
+        self.queue_wait_hist = Histogram(
+            "embedding_queue_wait_seconds",
+            [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25],
+        )
+
+    # -------------------------
+    # Lifecycle
+    # -------------------------
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="embedding-batcher", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    # -------------------------
+    # Submission
+    # -------------------------
+    def submit(self, audio: np.ndarray) -> Future:
+        """
+        Queue one clip. The returned future resolves to List[float].
+        """
+        if self._thread is None:
+            self.start()
+        pending = _Pending(audio)
+        self._queue.put(pending)
+        return pending.future
+
+    async def embed(self, audio: np.ndarray) -> list:
+        """
+        Awaitable wrapper around submit() for use inside async endpoints.
+        """
+        return await asyncio.wrap_future(self.submit(audio))
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize(),
+            "batch_size": self.batch_size_hist.snapshot(),
+            "queue_wait_seconds": self.queue_wait_hist.snapshot(),
+        }
+
+    # -------------------------
+    # Worker
+    # -------------------------
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = item.enqueued_at + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    nxt = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    stopping = True
+                    break
+                batch.append(nxt)
+
+            self._dispatch(batch)
+
+        # Fail anything still queued so callers are not left hanging
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                item.future.set_exception(RuntimeError("Embedding batcher stopped"))
+
+    def _dispatch(self, batch):
+        now = time.monotonic()
+        for item in batch:
+            self.queue_wait_hist.observe(now - item.enqueued_at)
+        self.batch_size_hist.observe(len(batch))
+
+        try:
+            embeddings = self.model.extract_embeddings([item.audio for item in batch])
+        except Exception as e:
+            for item in batch:
+                item.future.set_exception(e)
+            return
+
+        for item, emb in zip(batch, embeddings):
+            item.future.set_result(emb)
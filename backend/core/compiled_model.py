@@ -0,0 +1,190 @@
+# core/compiled_model.py
+
+import os
+import json
+import hashlib
+import warnings
+from contextlib import contextmanager
+
+import numpy as np
+import torch
+
+from config.settings import ECAPA_MODEL, SAMPLE_RATE
+from core.features import AudioClip, N_FFT, WIN_LENGTH, HOP_LENGTH
+
+# Written into the artifact; a mismatch on load means it was built for
+# something else and is ignored.
+ARTIFACT_META = {
+    # 2: traced with batch-size-independent masks (format 1 artifacts only work for the traced batch size)
+    "format": 2,
+    "model": ECAPA_MODEL,
+    "sample_rate": SAMPLE_RATE,
+    "n_fft": N_FFT,
+    "win_length": WIN_LENGTH,
+    "hop_length": HOP_LENGTH,
+}
+
+
+class EmbeddingPipeline(torch.nn.Module):
+    """
+    ECAPA from power spectrum to embedding: filterbank → sentence mean
+    normalization → ECAPA-TDNN. Input is the zero-padded [B, frames, bins]
+    power spectra of AudioClips plus relative lengths, output is [B, 1, D].
+
+    The mean normalization is written with a mask instead of SpeechBrain's
+    per-sentence loop so the time dimension stays dynamic when traced.
+    """
+
+    def __init__(self, frontend, embedding_model):
+        super().__init__()
+        self.frontend = frontend
+        self.embedding_model = embedding_model
+
+    def forward(self, power, lens):
+        feats = self.frontend.compute_fbanks(power)
+
+        frames = feats.shape[1]
+        valid = torch.arange(frames, device=feats.device).unsqueeze(0) < torch.round(lens * frames).unsqueeze(1)
+        valid = valid.unsqueeze(-1).to(feats.dtype)
+        mean = (feats * valid).sum(dim=1, keepdim=True) / valid.sum(dim=1, keepdim=True)
+
+        return self.embedding_model(feats - mean, lens)
+
+
+def _length_to_mask(length, max_len=None, dtype=None, device=None):
+    # Broadcasting instead of SpeechBrain's expand(len(length), ...), which
+    # the tracer records as a constant and so bakes in the traced batch size
+    if max_len is None:
+        max_len = length.max().long().item()
+    mask = torch.arange(max_len, device=length.device, dtype=length.dtype).unsqueeze(0) < length.unsqueeze(1)
+    return mask.to(dtype=dtype or length.dtype, device=device or length.device)
+
+
+@contextmanager
+def _traceable_masks():
+    import speechbrain.lobes.models.ECAPA_TDNN as ecapa
+
+    original = ecapa.length_to_mask
+    ecapa.length_to_mask = _length_to_mask
+    try:
+        yield
+    finally:
+        ecapa.length_to_mask = original
+
+
+def check_pipeline(traced, pipeline, clips, batch_sizes, atol: float = 1e-4):
+    """
+    Compare a traced pipeline with the eager one on batches of several
+    sizes and lengths. Tracing records shapes, so a batch size or length
+    the trace did not generalize over shows up here as a shape mismatch,
+    an error, or different embeddings.
+    """
+    for size in batch_sizes:
+        for start in range(0, len(clips) - size + 1):
+            power, lens = pad_spectra(clips[start:start + size])
+            with torch.no_grad():
+                expected = pipeline(power, lens)
+                try:
+                    actual = traced(power, lens)
+                except Exception as e:
+                    raise RuntimeError(f"Traced pipeline fails on a batch of {size}: {e}") from e
+            if actual.shape != expected.shape or not torch.allclose(actual, expected, atol=atol):
+                raise RuntimeError(f"Traced pipeline does not reproduce a batch of {size}")
+
+
+def export_pipeline(sb_model, frontend, path: str, check_durations=(1.5, 3.0, 7.0), atol: float = 1e-4):
+    """
+    Trace the pipeline of a loaded SpeechBrain model and save it to path.
+    Before anything is written, the traced module is checked against
+    SpeechBrain's own encoder on a padded batch of random clips, and
+    against the eager pipeline on batches of 1, 2 and more clips of
+    other lengths than the traced ones.
+    """
+    norm = sb_model.mods.mean_var_norm
+    if frontend is None or norm.norm_type != "sentence" or norm.std_norm:
+        raise ValueError("Model front end does not match the exported pipeline")
+
+    pipeline = EmbeddingPipeline(frontend, sb_model.mods.embedding_model).eval()
+
+    rng = np.random.default_rng(0)
+    clips = [AudioClip(rng.normal(0, 0.1, int(SAMPLE_RATE * d)).astype(np.float32)) for d in check_durations]
+    power, lens = pad_spectra(clips)
+
+    with torch.no_grad(), warnings.catch_warnings(), _traceable_masks():
+        # Tracer warnings about Python ints are expected: only batch and time vary
+        warnings.simplefilter("ignore")
+        traced = torch.jit.trace(pipeline, (power, lens), check_trace=False)
+        traced = torch.jit.freeze(traced)
+
+        wavs = torch.zeros(len(clips), max(len(c) for c in clips))
+        for i, clip in enumerate(clips):
+            wavs[i, :len(clip)] = torch.from_numpy(clip.samples)
+        expected = sb_model.encode_batch(wavs, torch.tensor([len(c) for c in clips], dtype=torch.float32) / wavs.shape[1])
+        actual = traced(power, lens)
+
+    # Boundary frames of padded clips differ slightly between the two front
+    # ends, so only the longest (unpadded) clip is compared
+    longest = int(np.argmax([len(c) for c in clips]))
+    if not torch.allclose(actual[longest], expected[longest], atol=atol):
+        raise RuntimeError("Traced pipeline does not reproduce the model's embeddings")
+
+    other = [AudioClip(rng.normal(0, 0.1, int(SAMPLE_RATE * d)).astype(np.float32)) for d in (2.2, 4.1, 5.3, 9.6)]
+    check_pipeline(traced, pipeline, other, batch_sizes=(1, 2, len(other)), atol=atol)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    torch.jit.save(traced, tmp_path, _extra_files={"meta.json": json.dumps(ARTIFACT_META)})
+    os.replace(tmp_path, path)
+    return traced
+
+
+def load_pipeline(path: str):
+    """
+    Load an exported pipeline, or None if it is missing or was built for a
+    different model / framing.
+    """
+    if not path or not os.path.exists(path):
+        return None
+
+    extra = {"meta.json": ""}
+    try:
+        module = torch.jit.load(path, map_location="cpu", _extra_files=extra)
+        meta = json.loads(extra["meta.json"] or "{}")
+    except Exception as e:
+        print(f" Could not load compiled model {path}: {e}")
+        return None
+
+    if meta != ARTIFACT_META:
+        print(f" Ignoring compiled model {path}: built for {meta}")
+        return None
+
+    module.eval()
+    return module
+
+
+def pipeline_fingerprint(path: str) -> str:
+    """
+    Short content hash of an exported pipeline. Re-exports (another torch
+    version, another trace) can give slightly different embeddings, so
+    caches of compiled-model output are namespaced by it.
+    """
+    h = hashlib.blake2b(digest_size=8)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def pad_spectra(clips):
+    """
+    Zero-pad the clips' power spectra into one [B, frames, bins] tensor,
+    plus relative lengths in (0, 1].
+    """
+    frames = [c.power_spectrum.shape[0] for c in clips]
+    max_frames = max(frames)
+
+    power = torch.zeros(len(clips), max_frames, N_FFT // 2 + 1, dtype=torch.float32)
+    for i, clip in enumerate(clips):
+        power[i, :frames[i]] = torch.from_numpy(clip.power_spectrum)
+    lens = torch.tensor(frames, dtype=torch.float32) / max_frames
+    return power, lens
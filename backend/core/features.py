@@ -0,0 +1,62 @@
+# core/features.py
+
+import numpy as np
+
+from config.settings import SAMPLE_RATE
+
+# Same framing as SpeechBrain's Fbank front end used by ECAPA
+# (25 ms Hamming window, 10 ms hop, 400-point FFT, centered, zero padded),
+# so the power spectrum below can be fed straight into the model's filterbank.
+N_FFT = 400
+WIN_LENGTH = 400
+HOP_LENGTH = 160
+
+# torch.hamming_window(WIN_LENGTH) is periodic
+WINDOW = np.hamming(WIN_LENGTH + 1)[:-1].astype(np.float32)
+
+
+class AudioClip:
+    """
+    One request's decoded audio plus lazily computed spectral features.
+
+    The STFT is computed at most once per clip; liveness detection and the
+    speaker model both read it from here instead of each running their own.
+    """
+
+    def __init__(self, samples: np.ndarray, sample_rate: int = SAMPLE_RATE):
+        self.samples = np.ascontiguousarray(samples, dtype=np.float32)
+        self.sample_rate = sample_rate
+        self._power = None
+
+    def __len__(self):
+        return len(self.samples)
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / self.sample_rate
+
+    @property
+    def power_spectrum(self) -> np.ndarray:
+        """
+        |STFT|² as float32 [frames, N_FFT // 2 + 1].
+        """
+        if self._power is None:
+            padded = np.pad(self.samples, N_FFT // 2)
+            frames = np.lib.stride_tricks.sliding_window_view(padded, WIN_LENGTH)[::HOP_LENGTH]
+            spectrum = np.fft.rfft(frames * WINDOW, n=N_FFT)
+            self._power = (spectrum.real ** 2 + spectrum.imag ** 2).astype(np.float32)
+        return self._power
+
+    @property
+    def freqs(self) -> np.ndarray:
+        return np.fft.rfftfreq(N_FFT, d=1.0 / self.sample_rate)
+
+    @property
+    def frame_energy(self) -> np.ndarray:
+        """
+        Mean-square amplitude per frame, recovered from the one-sided
+        spectrum via Parseval and undoing the window's energy.
+        """
+        power = self.power_spectrum
+        full = 2.0 * power.sum(axis=1) - power[:, 0] - power[:, -1]
+        return full / (N_FFT * float(np.sum(WINDOW ** 2)))
@@ -0,0 +1,48 @@
+# core/locking.py
+#
+# Identical in backend/ and engine/ (used by the shared embedding cache).
+
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:                                     # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False, blocking: bool = True):
+    """
+    Lock shared by every process that opens the same path, held for the
+    block, which receives True. With blocking=False the block receives
+    False at once if the lock is taken. Shared locks only exclude an
+    exclusive holder (on Windows every lock is exclusive). The OS releases
+    the lock if the holder dies.
+    """
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            flags = (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | (0 if blocking else fcntl.LOCK_NB)
+            try:
+                fcntl.flock(f.fileno(), flags)
+            except BlockingIOError:
+                yield False
+                return
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:                         # LK_LOCK gives up after ~10 s
+                    if not blocking:
+                        yield False
+                        return
+        try:
+            yield True
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,56 @@
+# core/log.py
+
+import json
+import logging
+import sys
+import time
+
+from config.settings import LOG_LEVEL, LOG_FORMAT
+
+
+class _StructuredFormatter(logging.Formatter):
+    """
+    One line per record: the event name plus its fields, either as a JSON
+    object or as key=value pairs.
+    """
+
+    def __init__(self, as_json: bool):
+        super().__init__()
+        self.as_json = as_json
+
+    def format(self, record):
+        fields = getattr(record, "fields", {})
+        ts = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z"
+
+        if self.as_json:
+            entry = {"ts": ts, "level": record.levelname, "logger": record.name, "event": record.getMessage(), **fields}
+            if record.exc_info:
+                entry["exc"] = self.formatException(record.exc_info)
+            return json.dumps(entry, default=str)
+
+        line = f"{ts} {record.levelname} {record.name} {record.getMessage()}"
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def get_logger(name: str) -> logging.Logger:
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(_StructuredFormatter(as_json=LOG_FORMAT == "json"))
+        logger.addHandler(handler)
+        logger.setLevel(LOG_LEVEL)
+        logger.propagate = False
+    return logger
+
+
+def log_event(logger: logging.Logger, level: int, event: str, exc_info=False, **fields):
+    """
+    Structured log call. The level check comes first, so disabled (e.g.
+    DEBUG) events cost one comparison on the request path.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, event, exc_info=exc_info, extra={"fields": fields})
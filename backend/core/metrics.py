@@ -0,0 +1,200 @@
+# core/metrics.py
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Seconds; covers a 1 ms cache hit up to a slow cold decode
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Metrics exposed on /metrics, in registration order
+REGISTRY = []
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    body = ",".join(f'{k}="{str(v)}"' for k, v in labels.items())
+    return "{" + body + "}"
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram, cheap enough to call on the request path.
+    Bucket bounds are inclusive upper edges (Prometheus "le" semantics).
+    """
+
+    def __init__(self, name: str, buckets, help: str = ""):
+        self.name = name
+        self.help = help
+        self.buckets = sorted(float(b) for b in buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> dict:
+        """
+        Returns cumulative bucket counts plus sum/count.
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+
+        cumulative = {}
+        running = 0
+        for bound, c in zip(self.buckets + [float("inf")], counts):
+            running += c
+            cumulative["+Inf" if bound == float("inf") else f"{bound:g}"] = running
+
+        return {"buckets": cumulative, "sum": total, "count": count}
+
+    def render(self, labels: dict = None) -> list:
+        """
+        Prometheus text-format sample lines (no HELP / TYPE header).
+        """
+        snap = self.snapshot()
+        labels = labels or {}
+        lines = [
+            f"{self.name}_bucket{_format_labels({**labels, 'le': le})} {count}"
+            for le, count in snap["buckets"].items()
+        ]
+        lines.append(f"{self.name}_sum{_format_labels(labels)} {snap['sum']}")
+        lines.append(f"{self.name}_count{_format_labels(labels)} {snap['count']}")
+        return lines
+
+
+class LabeledHistogram:
+    """
+    One Histogram per value of a single label (e.g. stage="decode").
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, label: str, buckets=LATENCY_BUCKETS, help: str = ""):
+        self.name = name
+        self.label = label
+        self.buckets = buckets
+        self.help = help
+        self._children = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def child(self, value: str) -> Histogram:
+        hist = self._children.get(value)
+        if hist is None:
+            with self._lock:
+                hist = self._children.setdefault(value, Histogram(self.name, self.buckets))
+        return hist
+
+    def observe(self, value: str, amount: float):
+        self.child(value).observe(amount)
+
+    def render(self) -> list:
+        lines = []
+        for value, hist in sorted(self._children.items()):
+            lines.extend(hist.render({self.label: value}))
+        return lines
+
+
+class Counter:
+    """
+    Monotonic counter, optionally split by label values.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str = "", labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {} if self.labels else {(): 0.0}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(dict(zip(self.labels, key)))} {v:g}" for key, v in items]
+
+
+class Gauge(Counter):
+    """
+    Value that can go up and down (e.g. requests in flight).
+    """
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+def render_prometheus() -> str:
+    """
+    All registered metrics in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in REGISTRY:
+        if metric.help:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------
+# Request path metrics
+# -------------------------
+STAGE_SECONDS = LabeledHistogram(
+    "biovan_stage_seconds", "stage", help="Latency of each request pipeline stage"
+)
+DECISIONS = Counter(
+    "biovan_decisions_total", help="Authentication decisions written to auth_logs", labels=("decision",)
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "biovan_requests_in_flight", help="HTTP requests currently being handled"
+)
+BACKEND_ERRORS = Counter(
+    "biovan_backend_errors_total", help="Failed vector store / Postgres calls", labels=("backend",)
+)
+
+
+@contextmanager
+def stage_timer(stage: str, timings: dict = None):
+    """
+    Time a block into STAGE_SECONDS, or into `timings` when given (for work
+    done in another process, observed later via observe_timings).
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if timings is not None:
+            timings[stage] = elapsed
+        else:
+            STAGE_SECONDS.observe(stage, elapsed)
+
+
+def observe_timings(timings: dict):
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.observe(stage, seconds)
@@ -0,0 +1,65 @@
+# core/pipeline.py
+
+from core.preprocessing import decode_audio_bytes, trim_silence
+from core.features import AudioClip
+from core.anti_spoofing import liveness_detector
+from core.metrics import stage_timer
+from config.settings import SAMPLE_RATE, VAD_ENABLED
+
+
+def speech_clip(signal) -> AudioClip:
+    """
+    AudioClip of the speech in a decoded signal (VAD-trimmed and capped at
+    MAX_SPEECH_SECONDS, unless VAD is disabled).
+    """
+    return AudioClip(trim_silence(signal) if VAD_ENABLED else signal, SAMPLE_RATE)
+
+
+def prepare_clip(data: bytes, min_duration: float = None) -> dict:
+    """
+    decode → VAD trim → speech-duration check → liveness, without touching
+    the speaker model.
+
+    Returns a dict with:
+        status:          "ok" | "too_short" | "spoof"
+        duration:        seconds of decoded audio
+        speech_duration: seconds left after trimming non-speech
+                         (too_short also covers clips with no speech at all)
+        liveness:        liveness_detector result (None if the clip was too short)
+        audio:           AudioClip with the trimmed signal (only when status == "ok");
+                         its STFT, computed for liveness, is reused by the speaker model
+        timings:         seconds spent per stage ("decode", "vad", "liveness"); returned
+                         rather than recorded so worker processes can report them too
+    """
+    timings = {}
+    with stage_timer("decode", timings):
+        signal = decode_audio_bytes(data)
+    duration = len(signal) / SAMPLE_RATE
+
+    with stage_timer("vad", timings):
+        audio = speech_clip(signal)
+    result = {"duration": duration, "speech_duration": audio.duration, "liveness": None, "timings": timings}
+
+    if len(audio) == 0 or (min_duration is not None and audio.duration < min_duration):
+        return {"status": "too_short", **result}
+
+    with stage_timer("liveness", timings):
+        result["liveness"] = liveness_detector.analyze(audio)
+    if not result["liveness"]["is_live"]:
+        return {"status": "spoof", **result}
+
+    return {"status": "ok", **result, "audio": audio}
+
+
+def process_clip(data: bytes, model, min_duration: float = None) -> dict:
+    """
+    Full decode → liveness → embed pipeline for one upload.
+    Same result shape as prepare_clip, with "embedding" instead of "audio".
+    """
+    clip = prepare_clip(data, min_duration)
+    audio = clip.pop("audio", None)
+    clip["embedding"] = None
+    if audio is not None:
+        with stage_timer("embedding", clip["timings"]):
+            clip["embedding"] = model.extract_embedding(audio)
+    return clip
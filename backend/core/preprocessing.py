@@ -1,6 +1,152 @@
+import io
+import os
+import tempfile
+
+import numpy as np
 import librosa
-from config.settings import SAMPLE_RATE
+import soundfile as sf
+
+from config.settings import (
+    SAMPLE_RATE,
+    MAX_UPLOAD_BYTES,
+    MAX_AUDIO_DURATION,
+    RESAMPLE_TYPE,
+    VAD_THRESHOLD_DB,
+    VAD_FLOOR_DB,
+    VAD_HANGOVER_MS,
+    MAX_SPEECH_SECONDS,
+)
+
+# VAD frame length (10 ms)
+VAD_FRAME_MS = 10
+
+
+class AudioDecodeError(ValueError):
+    """Upload could not be decoded as audio."""
+
+
+class AudioTooLarge(ValueError):
+    """Upload exceeds MAX_UPLOAD_BYTES or decodes to more than MAX_AUDIO_DURATION."""
+
 
 def load_audio(file_path):
     audio, _ = librosa.load(file_path, sr=SAMPLE_RATE, mono=True)
     return audio
+
+
+def _to_mono_16k(audio: np.ndarray, sr: int) -> np.ndarray:
+    # audio: [frames, channels]
+    audio = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+    if sr != SAMPLE_RATE:
+        audio = librosa.resample(audio, orig_sr=sr, target_sr=SAMPLE_RATE, res_type=RESAMPLE_TYPE)
+    return np.ascontiguousarray(audio, dtype=np.float32)
+
+
+def _decode_native(data: bytes):
+    """
+    libsndfile path (WAV/FLAC/OGG). Returns None if the container is not supported.
+    Duration is checked from the header before any samples are read.
+    """
+    try:
+        info = sf.info(io.BytesIO(data))
+    except Exception:
+        return None
+
+    if info.samplerate <= 0:
+        raise AudioDecodeError("Invalid sample rate in audio header")
+    if info.frames / info.samplerate > MAX_AUDIO_DURATION:
+        raise AudioTooLarge(
+            f"Audio longer than {MAX_AUDIO_DURATION:.0f}s ({info.frames / info.samplerate:.1f}s)"
+        )
+
+    try:
+        audio, sr = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    except Exception as e:
+        raise AudioDecodeError(f"Could not decode audio: {e}")
+    return _to_mono_16k(audio, sr)
+
+
+def _decode_fallback(data: bytes) -> np.ndarray:
+    """
+    Compressed browser formats (webm/opus, mp3) need audioread/ffmpeg, which only
+    reads from a path. Decoding stops just past MAX_AUDIO_DURATION.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".audio", delete=False) as tmp:
+        tmp.write(data)
+        tmp_path = tmp.name
+
+    try:
+        audio, _ = librosa.load(
+            tmp_path,
+            sr=SAMPLE_RATE,
+            mono=True,
+            duration=MAX_AUDIO_DURATION + 1.0,
+            res_type=RESAMPLE_TYPE,
+        )
+    except Exception as e:
+        raise AudioDecodeError(f"Could not decode audio: {e}")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    if len(audio) > MAX_AUDIO_DURATION * SAMPLE_RATE:
+        raise AudioTooLarge(f"Audio longer than {MAX_AUDIO_DURATION:.0f}s")
+    return audio
+
+
+def decode_audio_bytes(data: bytes) -> np.ndarray:
+    """
+    Decode an upload held in memory into a SAMPLE_RATE mono float32 signal.
+
+    WAV/FLAC/OGG are decoded in memory; clips already at SAMPLE_RATE skip
+    resampling entirely. Anything else falls back to librosa.
+    """
+    if len(data) == 0:
+        raise AudioDecodeError("Empty upload")
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise AudioTooLarge(f"Upload larger than {MAX_UPLOAD_BYTES} bytes")
+
+    audio = _decode_native(data)
+    if audio is None:
+        audio = _decode_fallback(data)
+    return audio
+
+
+def speech_mask(audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Per-sample boolean mask of speech, from 10 ms frame energies.
+
+    A frame is speech if its level is within VAD_THRESHOLD_DB of the clip's
+    loud frames (95th percentile, so a single click cannot raise the bar)
+    and above the absolute VAD_FLOOR_DB. Speech regions are then widened by
+    VAD_HANGOVER_MS on each side, which keeps word onsets/offsets and the
+    short pauses between words.
+    """
+    frame = max(1, int(sample_rate * VAD_FRAME_MS / 1000))
+    n_frames = -(-len(audio) // frame)
+    if n_frames == 0:
+        return np.zeros(0, dtype=bool)
+
+    padded = np.zeros(n_frames * frame, dtype=np.float32)
+    padded[:len(audio)] = audio
+    energy_db = 10.0 * np.log10(np.mean(padded.reshape(n_frames, frame) ** 2, axis=1) + 1e-12)
+
+    threshold = max(np.percentile(energy_db, 95) + VAD_THRESHOLD_DB, VAD_FLOOR_DB)
+    speech = energy_db > threshold
+
+    hangover = int(VAD_HANGOVER_MS / VAD_FRAME_MS)
+    if hangover > 0 and speech.any():
+        speech = np.convolve(speech, np.ones(2 * hangover + 1), mode="same") > 0
+
+    return np.repeat(speech, frame)[:len(audio)]
+
+
+def trim_silence(audio: np.ndarray, sample_rate: int = SAMPLE_RATE, max_speech_seconds: float = MAX_SPEECH_SECONDS) -> np.ndarray:
+    """
+    Keep only the speech in a signal (see speech_mask), capped at
+    max_speech_seconds. Returns an empty array if no speech is found.
+    """
+    speech = audio[speech_mask(audio, sample_rate)]
+    if max_speech_seconds:
+        speech = speech[:int(max_speech_seconds * sample_rate)]
+    return np.ascontiguousarray(speech, dtype=np.float32)
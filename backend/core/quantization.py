@@ -0,0 +1,115 @@
+# core/quantization.py
+
+import os
+import copy
+import glob
+import warnings
+
+import numpy as np
+import torch
+
+from core.evaluation import calculate_eer
+from core.pipeline import speech_clip
+from core.preprocessing import load_audio
+
+
+class _ConvAsLinear(torch.nn.Module):
+    """
+    A stride-1, unpadded Conv1d rewritten as a Linear over unfolded frames.
+
+    ECAPA-TDNN is built entirely from Conv1d layers (even its final "fc"),
+    and PyTorch's dynamic quantization only covers Linear; expressing each
+    convolution as a Linear lets quantize_dynamic reach all of them.
+    """
+
+    def __init__(self, conv: torch.nn.Conv1d):
+        super().__init__()
+        self.kernel_size = conv.kernel_size[0]
+        self.dilation = conv.dilation[0]
+
+        out_channels, in_channels, k = conv.weight.shape
+        self.linear = torch.nn.Linear(in_channels * k, out_channels, bias=conv.bias is not None)
+        with torch.no_grad():
+            self.linear.weight.copy_(conv.weight.reshape(out_channels, in_channels * k))
+            if conv.bias is not None:
+                self.linear.bias.copy_(conv.bias)
+
+    @staticmethod
+    def supports(conv: torch.nn.Conv1d) -> bool:
+        return (
+            conv.groups == 1
+            and conv.stride == (1,)
+            and conv.padding in ((0,), "valid")
+            and conv.padding_mode == "zeros"
+        )
+
+    def forward(self, x):
+        # x: [B, C, T] → [B, T', C * k]
+        if self.kernel_size > 1:
+            span = (self.kernel_size - 1) * self.dilation + 1
+            x = x.unfold(2, span, 1)[..., ::self.dilation]
+            x = x.permute(0, 2, 1, 3).reshape(x.shape[0], x.shape[2], -1)
+        else:
+            x = x.transpose(1, 2)
+        return self.linear(x).transpose(1, 2)
+
+
+def quantize_embedding_model(module: torch.nn.Module) -> torch.nn.Module:
+    """
+    Copy of the embedding model with every eligible Conv1d replaced by a
+    dynamically quantized int8 Linear (per-channel weights, activations
+    quantized on the fly). The original module is left untouched.
+    """
+    module = copy.deepcopy(module).eval()
+
+    for parent in list(module.modules()):
+        for name, child in list(parent.named_children()):
+            if isinstance(child, torch.nn.Conv1d) and _ConvAsLinear.supports(child):
+                setattr(parent, name, _ConvAsLinear(child))
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return torch.ao.quantization.quantize_dynamic(
+            module,
+            {torch.nn.Linear: torch.ao.quantization.per_channel_dynamic_qconfig},
+            dtype=torch.qint8,
+        )
+
+
+# -------------------------
+# Accuracy gate
+# -------------------------
+def load_reference_set(reference_dir: str):
+    """
+    Clips and speaker labels from a directory of speakerID_sampleID.wav
+    files (the benchmark's layout), VAD-trimmed like served requests.
+    """
+    files = sorted(glob.glob(os.path.join(reference_dir, "*.wav")))
+    clips, speakers = [], []
+    for path in files:
+        clip = speech_clip(load_audio(path))
+        if len(clip) == 0:
+            continue
+        clips.append(clip)
+        speakers.append(os.path.basename(path).split('_')[0].split('.')[0])
+    return clips, np.array(speakers)
+
+
+def reference_eer(embed_fn, clips, speakers, batch_size: int = 16) -> float:
+    """
+    EER over all unordered pairs of the reference clips, using embed_fn
+    (list of AudioClips → list of embeddings).
+    """
+    embs = []
+    for start in range(0, len(clips), batch_size):
+        embs.extend(embed_fn(clips[start:start + batch_size]))
+
+    matrix = np.asarray(embs, dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+
+    rows, cols = np.triu_indices(len(clips), k=1)
+    scores = np.sum(matrix[rows] * matrix[cols], axis=1)
+    labels = (speakers[rows] == speakers[cols]).astype(int)
+
+    eer, _ = calculate_eer(scores, labels)
+    return float(eer)
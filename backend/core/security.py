@@ -1,4 +1,7 @@
 
+import random
+import re
+import string
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -24,3 +27,33 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+
+
+# Every ID generate_speaker_id hands out has this shape; IDs from requests
+# are checked against it before they reach a query
+SPEAKER_ID_PATTERN = r"^[A-Za-z0-9]{10}$"
+
+
+def is_valid_speaker_id(speaker_id: str) -> bool:
+    return re.fullmatch(SPEAKER_ID_PATTERN, speaker_id or "") is not None
+
+
+def generate_speaker_id(full_name: str, rng: random.Random = random) -> str:
+    """
+    10-character speaker ID: 3 random letters from the user's name followed
+    by 7 random alphanumerics. Pass a seeded rng for a reproducible ID.
+    """
+    # Clean name (keep only letters)
+    clean_name = re.sub(r'[^a-zA-Z]', '', full_name)
+
+    # Fallback if name has no letters
+    if not clean_name:
+        clean_name = string.ascii_letters
+
+    # choices() handles names shorter than 3 chars by repeating
+    prefix = ''.join(rng.choices(clean_name, k=3))
+
+    suffix_chars = string.ascii_letters + string.digits
+    suffix = ''.join(rng.choices(suffix_chars, k=7))
+
+    return prefix + suffix
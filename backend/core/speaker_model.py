@@ -8,32 +8,236 @@ os.environ["HF_HUB_DISABLE_SYMLINKS"] = "1"
 os.environ["HF_HUB_DISABLE_SYMLINKS_WARNING"] = "1"
 
 from speechbrain.pretrained import SpeakerRecognition
-from config.settings import ECAPA_MODEL
+from config.settings import (
+    ECAPA_MODEL,
+    SAMPLE_RATE,
+    EMBEDDING_DIM,
+    EMBEDDING_CACHE_ENABLED,
+    EMBEDDING_CACHE_ENTRIES,
+    EMBEDDING_CACHE_DIR,
+    EMBEDDING_CACHE_DISK_BYTES,
+    EMBEDDING_CACHE_SHARD_ROWS,
+    COMPILED_MODEL_PATH,
+    USE_COMPILED_MODEL,
+    WARMUP_DURATIONS,
+    WARMUP_PASSES,
+    QUANTIZED_INFERENCE,
+    QUANTIZATION_REFERENCE_DIR,
+    QUANTIZATION_EER_TOLERANCE,
+)
+from core.features import AudioClip, N_FFT, WIN_LENGTH, HOP_LENGTH, WINDOW
+from core.embedding_cache import EmbeddingCache
+from core.compiled_model import load_pipeline, pad_spectra, pipeline_fingerprint
 
 
 class ECAPAModel:
-    def __init__(self):
-        self.model = SpeakerRecognition.from_hparams(
-            source=ECAPA_MODEL,
-            savedir="pretrained_models/ecapa",
-            run_opts={"device": "cpu"}
+    def __init__(self, use_compiled: bool = USE_COMPILED_MODEL, quantized: bool = QUANTIZED_INFERENCE, sb_model=None):
+        """
+        sb_model: an already-built SpeechBrain SpeakerRecognition-like object
+        (mods + encode_batch) to use instead of loading ECAPA_MODEL, e.g. the
+        load-test harness's untrained stand-in.
+        """
+        # The exported TorchScript pipeline (scripts/export_model.py) skips
+        # SpeechBrain's hparams loading entirely. It is float32, so the
+        # quantized mode always starts from the SpeechBrain modules.
+        use_compiled = use_compiled and not quantized and sb_model is None
+        self.compiled = load_pipeline(COMPILED_MODEL_PATH) if use_compiled else None
+
+        if self.compiled is not None:
+            print(f"✅ Loaded compiled ECAPA pipeline from {COMPILED_MODEL_PATH}")
+            self.model = None
+            self.frontend = None
+        else:
+            self.model = sb_model or SpeakerRecognition.from_hparams(
+                source=ECAPA_MODEL,
+                savedir="pretrained_models/ecapa",
+                run_opts={"device": "cpu"}
+            )
+            self.frontend = self._shared_frontend()
+
+        self.quantized = self._enable_quantized() if (quantized and self.model is not None) else False
+
+        # Compiled and int8 embeddings differ slightly from eager float32 ones,
+        # so each variant gets its own cache namespace
+        self.cache = EmbeddingCache(
+            self.cache_id(),
+            dim=EMBEDDING_DIM,
+            max_entries=EMBEDDING_CACHE_ENTRIES,
+            cache_dir=EMBEDDING_CACHE_DIR,
+            disk_max_bytes=EMBEDDING_CACHE_DISK_BYTES,
+            shard_rows=EMBEDDING_CACHE_SHARD_ROWS,
+        ) if EMBEDDING_CACHE_ENABLED else None
+        self.ready = False
+
+    def cache_id(self) -> str:
+        """
+        Embedding cache namespace: the checkpoint plus the variant that
+        computes its embeddings.
+        """
+        if self.compiled is not None:
+            return f"{ECAPA_MODEL}:compiled:{pipeline_fingerprint(COMPILED_MODEL_PATH)}"
+        return ECAPA_MODEL + (":int8" if self.quantized else "")
+
+    def warm_up(self, durations=WARMUP_DURATIONS, passes: int = WARMUP_PASSES):
+        """
+        Run the encoder on random clips of typical lengths (singly and as a
+        batch of each length) so allocator growth and lazy init happen before
+        the first real request. Bypasses the embedding cache.
+        """
+        rng = np.random.default_rng(0)
+        clips = [AudioClip(rng.normal(0, 0.1, int(SAMPLE_RATE * d)).astype(np.float32)) for d in durations]
+        batch = [AudioClip(rng.normal(0, 0.1, len(clip)).astype(np.float32)) for clip in clips]
+
+        for _ in range(max(0, passes)):
+            for clip, twin in zip(clips, batch):
+                self._compute_embeddings([clip])
+                self._compute_embeddings([clip, twin])
+
+        self.ready = True
+
+    def _enable_quantized(self, reference_dir=QUANTIZATION_REFERENCE_DIR, tolerance=QUANTIZATION_EER_TOLERANCE) -> bool:
+        """
+        Swap in a dynamic int8 copy of the embedding model, but only if EER
+        on the reference trial set stays within tolerance of float32.
+        Returns whether the quantized model is now in use.
+        """
+        from core.quantization import quantize_embedding_model, load_reference_set, reference_eer
+
+        if not reference_dir or not os.path.isdir(reference_dir):
+            print(" Quantized inference needs QUANTIZATION_REFERENCE_DIR for its accuracy gate; using float32")
+            return False
+
+        clips, speakers = load_reference_set(reference_dir)
+        if len(set(speakers)) < 2 or len(speakers) == len(set(speakers)):
+            print(f" Reference set {reference_dir} has no usable target/non-target trials; using float32")
+            return False
+
+        mods = self.model.mods
+        float_model = mods.embedding_model
+        float_eer = reference_eer(self._compute_embeddings, clips, speakers)
+
+        mods.embedding_model = quantize_embedding_model(float_model)
+        int8_eer = reference_eer(self._compute_embeddings, clips, speakers)
+
+        if int8_eer - float_eer > tolerance:
+            mods.embedding_model = float_model
+            print(f" int8 EER {int8_eer:.4f} vs float32 {float_eer:.4f} exceeds tolerance {tolerance}; using float32")
+            return False
+
+        print(f"✅ Quantized inference enabled (EER float32 {float_eer:.4f}, int8 {int8_eer:.4f})")
+        return True
+
+    def _shared_frontend(self):
+        """
+        The model's Fbank module if it frames audio exactly like AudioClip,
+        so it can start from the clip's cached power spectrum. None otherwise,
+        in which case embeddings are computed from the waveform as usual.
+        """
+        fbank = getattr(self.model.mods, "compute_features", None)
+        stft = getattr(fbank, "compute_STFT", None)
+        if stft is None or getattr(fbank, "deltas", True) or getattr(fbank, "context", True):
+            return None
+
+        same_framing = (
+            stft.sample_rate == SAMPLE_RATE
+            and stft.n_fft == N_FFT
+            and stft.win_length == WIN_LENGTH
+            and stft.hop_length == HOP_LENGTH
+            and stft.center
+            and stft.pad_mode == "constant"
+            and not stft.normalized_stft
+            and np.allclose(stft.window.cpu().numpy(), WINDOW, atol=1e-6)
         )
+        return fbank if same_framing else None
 
-    def extract_embedding(self, audio_np: np.ndarray) -> list:
+    def extract_embedding(self, audio) -> list:
         """
+        audio: numpy signal or AudioClip
         Returns: List[float] of length EMBEDDING_DIM
         """
+        return self.extract_embeddings([audio])[0]
+
+    def extract_embeddings(self, audios: list) -> list:
+        """
+        Batched variant of extract_embedding.
+        Clips of equal length share a forward pass; see _compute_embeddings.
+
+        Returns: List[List[float]], one embedding per input clip (same order)
+        """
+        if not audios:
+            return []
+
+        clips = [a if isinstance(a, AudioClip) else AudioClip(a) for a in audios]
+        if min(len(c) for c in clips) == 0:
+            raise ValueError("Cannot embed empty audio")
+
+        if self.cache is None:
+            return self._compute_embeddings(clips)
+
+        # Only clips the cache has not seen go through the model
+        keys = [self.cache.key(c.samples) for c in clips]
+        results = [self.cache.get(k) for k in keys]
+        missing = [i for i, r in enumerate(results) if r is None]
+
+        if missing:
+            computed = self._compute_embeddings([clips[i] for i in missing])
+            for i, emb in zip(missing, computed):
+                self.cache.put(keys[i], emb)
+                results[i] = emb
+
+        return [r if isinstance(r, list) else r.astype(float).tolist() for r in results]
+
+    def _compute_embeddings(self, clips):
+        """
+        Embeddings for clips, bypassing the cache. Only clips of the same
+        length are encoded together: zero-padding changes the result (the
+        convolutions see the zeros past a clip's end, whatever wav_lens
+        says), so each embedding matches the clip's own and is safe to
+        cache under its samples.
+        """
+        out = [None] * len(clips)
+        by_length = {}
+        for i, clip in enumerate(clips):
+            by_length.setdefault(len(clip), []).append(i)
 
-        # 1️⃣ numpy → torch (shape: [1, T])
-        wav = torch.tensor(audio_np, dtype=torch.float32).unsqueeze(0)
+        for idxs in by_length.values():
+            for i, emb in zip(idxs, self._forward([clips[i] for i in idxs])):
+                out[i] = emb
+        return out
 
-        # 2️⃣ SpeechBrain embedding (shape: [1, 1, D] or [1, D])
+    def _forward(self, clips):
+        # clips all have the same length
         with torch.no_grad():
-            emb = self.model.encode_batch(wav)
+            if self.compiled is not None:
+                emb = self.compiled(*pad_spectra(clips))
+            elif self.frontend is not None:
+                emb = self._encode_spectra(clips)
+            else:
+                emb = self._encode_waveforms(clips)
+
+        # [B, 1, D] → [B, D]
+        emb = emb.reshape(len(clips), -1).cpu().numpy()
 
-        # 3️⃣ FORCE 1-D vector
-        emb = emb.squeeze()          # removes batch dims
-        emb = emb.cpu().numpy()      # numpy array (D,)
+        # Convert to pure Python lists of floats
+        return [row.astype(float).tolist() for row in emb]
+
+    def _encode_waveforms(self, clips):
+        # 1️⃣ stack into one [B, T] tensor (equal lengths, no padding)
+        wavs = torch.from_numpy(np.stack([clip.samples for clip in clips]))
+
+        # 2️⃣ SpeechBrain embedding (shape: [B, 1, D])
+        return self.model.encode_batch(wavs, torch.ones(len(clips)))
+
+    def _encode_spectra(self, clips):
+        """
+        Same as encode_batch, but starts after the STFT: the clips' cached
+        power spectra go straight into the filterbank.
+        """
+        # 1️⃣ one [B, frames, bins] tensor (equal lengths, so no padding)
+        power, lens = pad_spectra(clips)
 
-        # 4️⃣ Convert to pure Python list of floats
-        return emb.astype(float).tolist()
+        # 2️⃣ filterbank → sentence norm → ECAPA (shape: [B, 1, D])
+        mods = self.model.mods
+        feats = self.frontend.compute_fbanks(power)
+        feats = mods.mean_var_norm(feats, lens)
+        return mods.embedding_model(feats, lens)
@@ -0,0 +1,158 @@
+# core/streaming.py
+
+import io
+from typing import Optional
+
+import numpy as np
+import soundfile as sf
+
+from config.settings import (
+    SAMPLE_RATE,
+    MIN_AUDIO_DURATION,
+    SIMILARITY_THRESHOLD,
+    STREAM_WINDOW_SECONDS,
+    STREAM_HOP_SECONDS,
+    STREAM_MIN_SECONDS,
+    STREAM_DECISION_MARGIN,
+    STREAM_CONFIRMATIONS,
+)
+
+
+class RingBuffer:
+    """
+    Fixed-capacity float32 sample buffer holding the most recent audio.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = int(capacity)
+        self._data = np.zeros(self.capacity, dtype=np.float32)
+        self._end = 0          # write position
+        self.total = 0         # samples ever appended
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def append(self, samples: np.ndarray):
+        samples = np.asarray(samples, dtype=np.float32)
+        if len(samples) >= self.capacity:
+            self._data[:] = samples[-self.capacity:]
+            self._end = 0
+        else:
+            first = min(len(samples), self.capacity - self._end)
+            self._data[self._end:self._end + first] = samples[:first]
+            self._data[:len(samples) - first] = samples[first:]
+            self._end = (self._end + len(samples)) % self.capacity
+        self.total += len(samples)
+
+    def window(self) -> np.ndarray:
+        """
+        Buffered samples, oldest first (a copy).
+        """
+        if self.total < self.capacity:
+            return self._data[:self.total].copy()
+        return np.concatenate([self._data[self._end:], self._data[:self._end]])
+
+
+def decode_pcm16(data: bytes) -> np.ndarray:
+    """
+    Little-endian 16-bit mono PCM → float32 in [-1, 1).
+    A trailing odd byte (split sample) is dropped.
+    """
+    usable = len(data) - (len(data) % 2)
+    return np.frombuffer(data[:usable], dtype="<i2").astype(np.float32) / 32768.0
+
+
+def encode_wav(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> bytes:
+    buf = io.BytesIO()
+    sf.write(buf, samples, sample_rate, format="WAV", subtype="FLOAT")
+    return buf.getvalue()
+
+
+class StreamingDecision:
+    """
+    Early accept / reject policy over a sequence of rolling-window scores.
+
+    A decision is taken early only once the score has been at least
+    margin above (accept) or below (reject) the threshold for
+    `confirmations` consecutive windows. Rejects may come from
+    min_seconds of speech on; accepts need as much speech as /verify
+    (accept_min_seconds, MIN_AUDIO_DURATION by default) in every counted
+    window, and a window that passed liveness. Otherwise the stream runs
+    to the end and final() applies the plain threshold, as /verify does.
+    """
+
+    def __init__(
+        self,
+        threshold: float = SIMILARITY_THRESHOLD,
+        margin: float = STREAM_DECISION_MARGIN,
+        confirmations: int = STREAM_CONFIRMATIONS,
+        min_seconds: float = STREAM_MIN_SECONDS,
+        accept_min_seconds: float = MIN_AUDIO_DURATION,
+    ):
+        self.threshold = threshold
+        self.margin = margin
+        self.confirmations = max(1, int(confirmations))
+        self.min_seconds = min_seconds
+        self.accept_min_seconds = max(min_seconds, accept_min_seconds)
+
+        self._accept_streak = 0
+        self._reject_streak = 0
+
+    def update(self, score: float, is_live: bool, seconds: float) -> Optional[bool]:
+        """
+        Feed one window's score. Returns True (accept) / False (reject) once
+        confident, None to keep listening.
+        """
+        if seconds < self.min_seconds:
+            return None
+
+        if is_live and seconds >= self.accept_min_seconds and score >= self.threshold + self.margin:
+            self._accept_streak += 1
+        else:
+            self._accept_streak = 0
+
+        if score < self.threshold - self.margin:
+            self._reject_streak += 1
+        else:
+            self._reject_streak = 0
+
+        if self._accept_streak >= self.confirmations:
+            return True
+        if self._reject_streak >= self.confirmations:
+            return False
+        return None
+
+    def final(self, score: float, is_live: bool) -> bool:
+        return is_live and score >= self.threshold
+
+
+class StreamingSession:
+    """
+    Per-connection state: incoming PCM goes into a ring buffer holding the
+    last window_seconds, and the window becomes due for scoring after every
+    hop_seconds of new audio.
+    """
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, window_seconds: float = STREAM_WINDOW_SECONDS, hop_seconds: float = STREAM_HOP_SECONDS):
+        self.sample_rate = sample_rate
+        self.buffer = RingBuffer(int(window_seconds * sample_rate))
+        self.decision = StreamingDecision()
+        self.hop = int(hop_seconds * sample_rate)
+        self._scored_at = 0
+
+    @property
+    def seconds(self) -> float:
+        return self.buffer.total / self.sample_rate
+
+    def feed(self, data: bytes):
+        self.buffer.append(decode_pcm16(data))
+
+    def due(self) -> bool:
+        return (
+            self.seconds >= self.decision.min_seconds
+            and self.buffer.total - self._scored_at >= self.hop
+        )
+
+    def window_wav(self) -> bytes:
+        self._scored_at = self.buffer.total
+        return encode_wav(self.buffer.window(), self.sample_rate)
@@ -0,0 +1,178 @@
+# core/worker_pool.py
+
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config.settings import (
+    WORKER_POOL_SIZE,
+    WORKER_QUEUE_DEPTH,
+    WORKER_REQUEST_TIMEOUT,
+)
+from core.pipeline import process_clip
+
+# Per-process model, created once by the pool initializer
+_worker_model = None
+
+
+class PoolSaturated(Exception):
+    """Raised when the admission queue is full."""
+
+
+class PipelineTimeout(Exception):
+    """Raised when a clip is not processed within the per-request timeout."""
+
+
+class PoolUnavailable(Exception):
+    """Raised when the pool broke again after being rebuilt."""
+
+
+def _init_worker():
+    global _worker_model
+    from core.speaker_model import ECAPAModel
+
+    _worker_model = ECAPAModel()
+
+    # Warm-up so the first real request does not pay for lazy init
+    _worker_model.warm_up()
+
+
+def _ping():
+    return _worker_model is not None
+
+
+def _run_job(data: bytes, min_duration):
+    return process_clip(data, _worker_model, min_duration)
+
+
+class AudioWorkerPool:
+    """
+    Runs the decode → liveness → embed pipeline in a pool of pre-warmed
+    processes, each holding its own ECAPAModel.
+
+    At most size + queue_depth clips are admitted at once; anything beyond
+    that is refused with PoolSaturated instead of queueing unboundedly.
+
+    A worker dying (OOM, segfault in a native decoder) breaks the whole
+    executor. The pool then replaces it and retries the request once;
+    /ready reports not ready until the replacement workers are warm.
+    """
+
+    def __init__(
+        self,
+        size: int = WORKER_POOL_SIZE,
+        queue_depth: int = WORKER_QUEUE_DEPTH,
+        timeout: float = WORKER_REQUEST_TIMEOUT,
+    ):
+        self.size = max(1, int(size))
+        self.queue_depth = max(0, int(queue_depth))
+        self.timeout = timeout
+
+        self._executor = None
+        self._warming = []
+        self._admitted = 0
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        return self.size + self.queue_depth
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.size,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+
+    def _spawn(self):
+        self._executor = self._new_executor()
+        # ProcessPoolExecutor spawns lazily; force every worker up (and warm) now
+        self._warming = [self._executor.submit(_ping) for _ in range(self.size)]
+
+    def start(self):
+        if self._executor is not None:
+            return
+        self._spawn()
+        for p in self._warming:
+            p.result()
+        print(f"✅ Audio worker pool ready ({self.size} workers, queue depth {self.queue_depth})")
+
+    def _rebuild(self, broken):
+        """Replace a broken executor (once, however many requests saw it break)."""
+        with self._lock:
+            if self._executor is not broken:
+                return
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._spawn()
+        print("⚠️ Audio worker pool broken (a worker died); restarting it")
+
+    @property
+    def ready(self) -> bool:
+        """
+        True once every worker is warm. A broken executor is rebuilt here
+        too, so the pool recovers even if the load balancer stops sending
+        requests once /ready fails.
+        """
+        executor = self._executor
+        if executor is None:
+            return False
+        # ProcessPoolExecutor flags itself as soon as a worker dies
+        if getattr(executor, "_broken", False):
+            self._rebuild(executor)
+            return False
+        return all(p.done() for p in self._warming)
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "queue_depth": self.queue_depth,
+            "admitted": self._admitted,
+        }
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._admitted -= 1
+
+    async def run(self, data: bytes, min_duration: float = None) -> dict:
+        """
+        Process one upload in the pool. Result shape matches core.pipeline.process_clip.
+        """
+        if self._executor is None:
+            raise RuntimeError("Worker pool not started")
+
+        for _ in range(2):
+            executor = self._executor
+            try:
+                return await self._run_once(executor, data, min_duration)
+            except BrokenProcessPool:
+                self._rebuild(executor)
+        raise PoolUnavailable("Audio worker pool crashed twice; it is restarting")
+
+    async def _run_once(self, executor, data, min_duration):
+        with self._lock:
+            if self._admitted >= self.capacity:
+                raise PoolSaturated(f"Audio pipeline saturated ({self._admitted} in flight)")
+            self._admitted += 1
+
+        try:
+            future = executor.submit(_run_job, data, min_duration)
+        except Exception:
+            self._release()
+            raise
+
+        # Slot is freed when the job really finishes, not when the caller gives up,
+        # so timed-out jobs still count against capacity while they run.
+        future.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise PipelineTimeout(f"Audio pipeline timed out after {self.timeout}s")
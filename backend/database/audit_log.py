@@ -0,0 +1,230 @@
+# database/audit_log.py
+
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from config.settings import (
+    AUDIT_QUEUE_SIZE,
+    AUDIT_BATCH_SIZE,
+    AUDIT_FLUSH_INTERVAL,
+    AUDIT_SPILL_PATH,
+)
+from database.postgres_client import log_auth_many
+from core.locking import file_lock
+from core.metrics import stage_timer, BACKEND_ERRORS
+
+_STOP = object()
+
+
+class AuditLogWriter:
+    """
+    Write-behind logger for auth_logs.
+
+    log() only enqueues; a background thread writes rows in multi-row batches,
+    flushing when AUDIT_BATCH_SIZE rows are waiting or AUDIT_FLUSH_INTERVAL
+    seconds have passed. Batches that fail to reach Postgres are appended to
+    a local JSONL spill file, which is replayed on start and again after any
+    later successful write. When the queue is full, new rows are dropped (and
+    counted) rather than blocking the request.
+
+    Every process shares the spill file, so appending and replaying hold a
+    file lock next to it, and replay removes rows from the file as each
+    batch lands: a row is written once even if replay stops half way.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = AUDIT_QUEUE_SIZE,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL,
+        spill_path: str = AUDIT_SPILL_PATH,
+        writer=log_auth_many,
+    ):
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+        self._spill_lock_path = spill_path + ".lock"
+        self._writer = writer
+
+        self._queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._thread = None
+        self._spill_lock = threading.Lock()
+
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.replayed = 0
+
+    # -------------------------
+    # Lifecycle
+    # -------------------------
+    def start(self):
+        if self._thread is not None:
+            return
+        self.replay_spilled()
+        self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """
+        Drain everything still queued, then stop the writer thread.
+        """
+        thread = self._thread
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        self._thread = None
+
+    # -------------------------
+    # API
+    # -------------------------
+    def log(self, speaker_id, score, decision):
+        try:
+            self._queue.put_nowait((speaker_id, score, decision, datetime.utcnow()))
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "batch_size": self.batch_size,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+        }
+
+    # -------------------------
+    # Spill file
+    # -------------------------
+    @staticmethod
+    def _encode(row) -> str:
+        sid, score, decision, ts = row
+        return json.dumps({
+            "speaker_id": str(sid),
+            "score": float(score),
+            "decision": decision,
+            "timestamp": ts.isoformat(),
+        }) + "\n"
+
+    def _spill(self, rows):
+        with self._spill_lock, file_lock(self._spill_lock_path):
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                f.writelines(self._encode(row) for row in rows)
+        self.spilled += len(rows)
+
+    def _read_spill(self) -> list:
+        rows = []
+        with open(self.spill_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                rows.append((
+                    rec["speaker_id"],
+                    rec["score"],
+                    rec["decision"],
+                    datetime.fromisoformat(rec["timestamp"]),
+                ))
+        return rows
+
+    def _rewrite_spill(self, rows):
+        tmp = self.spill_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(self._encode(row) for row in rows)
+        os.replace(tmp, self.spill_path)
+
+    def replay_spilled(self):
+        """
+        Re-insert spilled rows (from any process). After each batch lands,
+        the file is rewritten without it, and removed once empty; a failed
+        batch leaves exactly the rows not yet written.
+        """
+        with self._spill_lock, file_lock(self._spill_lock_path):
+            if not os.path.exists(self.spill_path):
+                return
+
+            rows = self._read_spill()
+            done = 0
+            try:
+                while done < len(rows):
+                    batch = rows[done:done + self.batch_size]
+                    self._writer(batch)
+                    done += len(batch)
+                    self.replayed += len(batch)
+                    if done < len(rows):
+                        self._rewrite_spill(rows[done:])
+            except Exception as e:
+                if done:
+                    print(f"✅ Replayed {done} spilled audit log rows")
+                print(f"Warning: audit spill replay deferred, Postgres unavailable: {e}")
+                return
+
+            os.remove(self.spill_path)
+            if rows:
+                print(f"✅ Replayed {len(rows)} spilled audit log rows")
+
+    # -------------------------
+    # Worker
+    # -------------------------
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            with stage_timer("auth_log_flush"):
+                self._writer(batch)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            BACKEND_ERRORS.inc(backend="postgres")
+            print(f"Warning: audit log write failed, spilling {len(batch)} rows: {e}")
+            self._spill(batch)
+            return
+
+        # Postgres is reachable: catch up on anything spilled meanwhile
+        if os.path.exists(self.spill_path):
+            self.replay_spilled()
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+
+        while True:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                break
+            if item is not None:
+                batch.append(item)
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._write(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+        # Shutdown: flush everything that is left
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+        for start in range(0, len(batch), self.batch_size):
+            self._write(batch[start:start + self.batch_size])
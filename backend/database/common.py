@@ -0,0 +1,19 @@
+# database/common.py
+
+from typing import NamedTuple
+
+import numpy as np
+
+
+class SearchHit(NamedTuple):
+    # Same attribute names as a pymilvus Hit, so callers can treat both alike
+    id: str
+    distance: float
+
+
+def normalize_embedding(embedding) -> np.ndarray:
+    vec = np.asarray(embedding, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(vec)
+    if norm == 0 or np.isnan(norm):
+        raise ValueError("Invalid embedding norm detected")
+    return vec / norm
@@ -0,0 +1,173 @@
+# database/compression.py
+
+import numpy as np
+
+# float32 is the uncompressed layout; the others keep a compact copy for
+# candidate scoring and re-rank against the float32 rows
+STORAGE_TYPES = ("float32", "float16", "int8", "pq")
+
+# Product quantization: 4-dim sub-vectors, one byte (256 centroids) each
+PQ_SUBVECTOR_DIM = 4
+PQ_CENTROIDS = 256
+# Below this many rows the codebook is not trained and search stays exact
+PQ_TRAIN_MIN_ROWS = 1000
+
+# Rows scored per block, bounding the float32 temporaries of a full scan
+_SCAN_BLOCK = 65536
+
+
+def bytes_per_vector(storage: str, dim: int) -> int:
+    """
+    Memory per stored vector for a storage type (codes only, no index
+    overhead). int8 carries one float32 scale per vector.
+    """
+    if storage == "float32":
+        return 4 * dim
+    if storage == "float16":
+        return 2 * dim
+    if storage == "int8":
+        return dim + 4
+    if storage == "pq":
+        return dim // PQ_SUBVECTOR_DIM
+    raise ValueError(f"Unknown embedding storage: {storage}")
+
+
+def train_pq_codebook(vectors: np.ndarray, iterations: int = 15, seed: int = 0) -> np.ndarray:
+    """
+    k-means per sub-space: [m, k, PQ_SUBVECTOR_DIM] centroids with
+    k = min(256, rows).
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    m = dim // PQ_SUBVECTOR_DIM
+    k = min(PQ_CENTROIDS, n)
+    rng = np.random.default_rng(seed)
+
+    subs = vectors.reshape(n, m, PQ_SUBVECTOR_DIM)
+    codebook = np.empty((m, k, PQ_SUBVECTOR_DIM), dtype=np.float32)
+    for j in range(m):
+        data = subs[:, j]
+        centroids = data[rng.choice(n, k, replace=False)].copy()
+        for _ in range(iterations):
+            dist = (data ** 2).sum(1, keepdims=True) - 2 * data @ centroids.T + (centroids ** 2).sum(1)
+            assign = np.argmin(dist, axis=1)
+            counts = np.bincount(assign, minlength=k)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, data)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+        codebook[j] = centroids
+    return codebook
+
+
+class CompactMatrix:
+    """
+    In-memory compressed copy of an index's rows, used to score every row
+    cheaply so only the best candidates need their float32 vectors.
+
+        float16  half-precision copy
+        int8     symmetric per-vector scalar quantization
+        pq       product quantization against a trained codebook
+                 (untrained until a codebook is set; callers search exactly until then)
+    """
+
+    def __init__(self, storage: str, dim: int, capacity: int, codebook: np.ndarray = None):
+        if storage not in STORAGE_TYPES or storage == "float32":
+            raise ValueError(f"Not a compressed storage type: {storage}")
+        if storage == "pq" and dim % PQ_SUBVECTOR_DIM:
+            raise ValueError(f"pq storage needs dim divisible by {PQ_SUBVECTOR_DIM}")
+
+        self.storage = storage
+        self.dim = dim
+        self.codebook = codebook
+        self._capacity = 0
+        self.resize(capacity)
+
+    @property
+    def trained(self) -> bool:
+        return self.storage != "pq" or self.codebook is not None
+
+    @property
+    def bytes_per_vector(self) -> int:
+        return bytes_per_vector(self.storage, self.dim)
+
+    def resize(self, capacity: int):
+        capacity = max(1, int(capacity))
+        if self.storage == "float16":
+            codes = np.zeros((capacity, self.dim), dtype=np.float16)
+        elif self.storage == "int8":
+            codes = np.zeros((capacity, self.dim), dtype=np.int8)
+            scales = np.zeros(capacity, dtype=np.float32)
+            if self._capacity:
+                keep = min(capacity, self._capacity)
+                scales[:keep] = self._scales[:keep]
+            self._scales = scales
+        else:
+            codes = np.zeros((capacity, self.dim // PQ_SUBVECTOR_DIM), dtype=np.uint8)
+
+        if self._capacity:
+            keep = min(capacity, self._capacity)
+            codes[:keep] = self._codes[:keep]
+        self._codes = codes
+        self._capacity = capacity
+
+    # -------------------------
+    # Writes
+    # -------------------------
+    def set_rows(self, rows, vectors):
+        """
+        Encode L2-normalized vectors into the given rows.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        rows = np.asarray(rows, dtype=np.int64)
+
+        if self.storage == "float16":
+            self._codes[rows] = vectors.astype(np.float16)
+        elif self.storage == "int8":
+            peak = np.abs(vectors).max(axis=1)
+            scales = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+            self._codes[rows] = np.clip(np.round(vectors / scales[:, None]), -127, 127).astype(np.int8)
+            self._scales[rows] = scales
+        elif self.trained:
+            subs = vectors.reshape(len(vectors), -1, PQ_SUBVECTOR_DIM)
+            for j in range(subs.shape[1]):
+                centroids = self.codebook[j]
+                dist = -2 * subs[:, j] @ centroids.T + (centroids ** 2).sum(1)
+                self._codes[rows, j] = np.argmin(dist, axis=1)
+
+    def _decode(self, start: int, stop: int) -> np.ndarray:
+        if self.storage == "pq":
+            # Larger query batches: reconstruct the block once and use one matmul
+            codes = self._codes[start:stop]
+            parts = [self.codebook[j][codes[:, j]] for j in range(codes.shape[1])]
+            return np.concatenate(parts, axis=1)
+        return self._codes[start:stop].astype(np.float32)
+
+    # -------------------------
+    # Reads
+    # -------------------------
+    def scores(self, queries: np.ndarray, n: int) -> np.ndarray:
+        """
+        Approximate cosine scores [Q, n] of normalized float32 queries
+        against rows [0, n).
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        out = np.empty((len(queries), n), dtype=np.float32)
+
+        if self.storage == "pq" and len(queries) <= 8:
+            # Asymmetric distance: per-query lookup tables of sub-vector dot products
+            subs = queries.reshape(len(queries), -1, PQ_SUBVECTOR_DIM)
+            tables = np.einsum("qms,mks->qmk", subs, self.codebook)
+            out[:] = 0
+            codes = self._codes[:n]
+            for j in range(codes.shape[1]):
+                out += tables[:, j, codes[:, j]]
+            return out
+
+        for start in range(0, n, _SCAN_BLOCK):
+            stop = min(n, start + _SCAN_BLOCK)
+            block = self._decode(start, stop)
+            out[:, start:stop] = queries @ block.T
+            if self.storage == "int8":
+                out[:, start:stop] *= self._scales[start:stop]
+        return out
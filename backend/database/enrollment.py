@@ -0,0 +1,226 @@
+# database/enrollment.py
+#
+# Enrollment writes span Postgres and the vector store, which share no
+# transaction. They are made in two phases with compensation:
+#
+#   1. prepare  user row inserted with voice_profile_status "pending"
+#   2. vector   embedding inserted into the vector store
+#   3. commit   user row switched to "active"
+#
+# If a step fails, the steps already taken are undone in reverse order, so
+# the user row and the vector either both land (active) or neither does. A
+# process dying between steps leaves a "pending" row;
+# recover_pending_enrollments removes those (and any vector), run by a
+# PendingEnrollmentReaper in every API process. Until then the vector can
+# be found by a search, so searches keep only hits with an active profile
+# (active_hits), looked up through a short-lived per-process cache.
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from config.settings import (
+    VECTOR_STORE_BACKEND,
+    ENROLL_PENDING_TIMEOUT_SECONDS,
+    ENROLL_RECOVERY_INTERVAL_SECONDS,
+    PROFILE_STATUS_CACHE_SECONDS,
+)
+from core.log import get_logger, log_event
+from core.metrics import stage_timer, BACKEND_ERRORS
+from database.postgres_client import (
+    create_pending_user,
+    set_voice_profile_status,
+    delete_user,
+    get_pending_user_ids,
+    get_active_user_roles,
+)
+from database.vector_store import insert_embedding, delete_embedding
+
+logger = get_logger("enrollment")
+
+
+class EnrollmentCommitError(Exception):
+    """
+    An enrollment write failed and was rolled back. stage is the step that
+    failed ("prepare", "vector" or "commit"); orphans lists what could not
+    be cleaned up ("user", "vector"), normally empty.
+    """
+
+    def __init__(self, speaker_id: str, stage: str, cause: Exception, orphans: list):
+        self.speaker_id = speaker_id
+        self.stage = stage
+        self.cause = cause
+        self.orphans = orphans
+        super().__init__(f"Enrollment {stage} failed: {cause}")
+
+    @property
+    def backend(self) -> str:
+        return VECTOR_STORE_BACKEND if self.stage == "vector" else "postgres"
+
+
+def _compensate(speaker_id: str, undo: list) -> list:
+    """
+    Run compensations newest first, stopping at the first that fails so the
+    pending user row survives as the marker for recovery to retry. Returns
+    the names of what was left behind.
+    """
+    undo = list(reversed(undo))
+    for i, (name, action) in enumerate(undo):
+        try:
+            action()
+        except Exception as e:
+            log_event(logger, logging.ERROR, "enroll_compensation_failed", speaker_id=speaker_id, undo=name, error=str(e))
+            return [remaining for remaining, _ in undo[i:]]
+    return []
+
+
+def commit_enrollment(speaker_id: str, full_name: str, email: str, role: str, embedding, hashed_password: str = None):
+    """
+    Persist a new enrollment atomically across Postgres and the vector
+    store. Raises EnrollmentCommitError (after rolling back) on failure.
+    """
+    undo = []
+    stage = "prepare"
+    try:
+        with stage_timer("enroll_prepare"):
+            create_pending_user(full_name, email, role, user_id=speaker_id, hashed_password=hashed_password)
+        undo.append(("user", lambda: delete_user(speaker_id)))
+
+        stage = "vector"
+        # Registered before the insert: a write that errored after landing is removed too
+        undo.append(("vector", lambda: delete_embedding(speaker_id)))
+        with stage_timer("vector_insert"):
+            insert_embedding(speaker_id, embedding, partition_key=role)
+
+        stage = "commit"
+        with stage_timer("enroll_commit"):
+            set_voice_profile_status(speaker_id, "active")
+    except Exception as e:
+        error = EnrollmentCommitError(speaker_id, stage, e, [])
+        BACKEND_ERRORS.inc(backend=error.backend)
+        error.orphans = _compensate(speaker_id, undo)
+        log_event(logger, logging.ERROR, "enroll_rolled_back", speaker_id=speaker_id, stage=stage,
+                  error=str(e), orphans=error.orphans)
+        raise error from e
+
+
+def recover_pending_enrollments(timeout_seconds: int = ENROLL_PENDING_TIMEOUT_SECONDS) -> int:
+    """
+    Roll back enrollments left "pending" for longer than timeout_seconds.
+    Returns how many were removed.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=timeout_seconds)
+    recovered = 0
+    for speaker_id in get_pending_user_ids(cutoff):
+        undo = [("user", lambda sid=speaker_id: delete_user(sid)),
+                ("vector", lambda sid=speaker_id: delete_embedding(sid))]
+        if not _compensate(speaker_id, undo):
+            recovered += 1
+    if recovered:
+        log_event(logger, logging.WARNING, "enroll_pending_recovered", count=recovered)
+    return recovered
+
+
+class ActiveProfileCache:
+    """
+    Roles of speakers with an active voice profile, remembered for ttl
+    seconds so a /verify does not query Postgres for every hit.
+
+    Only active profiles are cached: a pending enrollment is looked up
+    again until it commits, and a profile removed elsewhere stops matching
+    within ttl.
+    """
+
+    def __init__(self, ttl: float = PROFILE_STATUS_CACHE_SECONDS):
+        self.ttl = ttl
+        self._entries = {}      # user_id -> (role, expires at)
+        self._lock = threading.Lock()
+
+    def roles(self, user_ids: list) -> dict:
+        """{user_id: role} for the user_ids with an active profile."""
+        now = time.monotonic()
+        with self._lock:
+            found = {uid: self._entries[uid][0] for uid in user_ids
+                     if uid in self._entries and self._entries[uid][1] > now}
+        missing = [uid for uid in dict.fromkeys(user_ids) if uid not in found]
+        if not missing:
+            return found
+
+        with stage_timer("profile_status"):
+            loaded = get_active_user_roles(missing)
+        if self.ttl > 0:
+            with self._lock:
+                self._entries = {uid: e for uid, e in self._entries.items() if e[1] > now}
+                self._entries.update((uid, (role, now + self.ttl)) for uid, role in loaded.items())
+        found.update(loaded)
+        return found
+
+
+active_profiles = ActiveProfileCache()
+
+
+def active_role(speaker_id: str):
+    """Role of a speaker with an active profile; None otherwise."""
+    return active_profiles.roles([speaker_id]).get(speaker_id)
+
+
+def active_hits(hits: list) -> list:
+    """
+    Search hits whose speaker has a committed ("active") voice profile, in
+    the same order. A vector whose enrollment is still pending or was
+    abandoned is never a match.
+    """
+    if not hits:
+        return hits
+    active = active_profiles.roles([hit.id for hit in hits])
+    return [hit for hit in hits if hit.id in active]
+
+
+class PendingEnrollmentReaper:
+    """
+    Runs recover_pending_enrollments on a background thread at start and
+    then every `interval` seconds. Every API process runs one; recovery is
+    idempotent, so overlapping passes are harmless.
+    """
+
+    def __init__(self, interval: float = ENROLL_RECOVERY_INTERVAL_SECONDS,
+                 timeout_seconds: int = ENROLL_PENDING_TIMEOUT_SECONDS):
+        self.interval = interval
+        self.timeout_seconds = timeout_seconds
+        self._stop = threading.Event()
+        self._thread = None
+        self.passes = 0
+        self.recovered = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="enrollment-reaper", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        thread = self._thread
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join(timeout)
+        self._thread = None
+
+    def run_once(self) -> int:
+        try:
+            recovered = recover_pending_enrollments(self.timeout_seconds)
+        except Exception as e:
+            # Postgres or the vector store is down; the next pass retries
+            log_event(logger, logging.WARNING, "enroll_recovery_failed", error=str(e))
+            return 0
+        self.passes += 1
+        self.recovered += recovered
+        return recovered
+
+    def _run(self):
+        while True:
+            self.run_once()
+            if self._stop.wait(self.interval):
+                return
@@ -0,0 +1,557 @@
+# database/local_index.py
+
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+import numpy as np
+
+from config.settings import (
+    EMBEDDING_DIM,
+    LOCAL_INDEX_PATH,
+    LOCAL_INDEX_COMPACT_RATIO,
+    LOCAL_INDEX_COMPACT_MIN_ROWS,
+    EMBEDDING_STORAGE,
+    RERANK_CANDIDATES,
+    VECTOR_PARTITION_KEY,
+)
+from core.locking import file_lock
+from database.common import SearchHit, normalize_embedding as _normalize
+from database.compression import CompactMatrix, PQ_TRAIN_MIN_ROWS, train_pq_codebook
+
+_GENERATION_FILE = re.compile(r"embeddings_(\d+)\.(?:f32|log)")
+
+
+class LocalVectorIndex:
+    """
+    Embedded speaker index: a float32 matrix of L2-normalized embeddings,
+    memory-mapped from disk, plus an append-only log of the speaker ids.
+
+    One generation of the index is two files:
+
+        embeddings_N.f32  [capacity, dim] float32 matrix, rows written in order
+        embeddings_N.log  one record per line: "+id" claims the next row for
+                          id, "-id" tombstones id's current row
+
+    index.json names the current generation. A write flushes its vectors
+    before it appends the log records that reference them, so the append
+    is the commit point: a crash before it leaves rows nothing refers to,
+    and a torn last record is dropped by the next write. Replacing a
+    speaker appends a new row (the later row wins) and deleting one
+    appends a tombstone, so no write costs more than the rows it touches.
+    Once dead rows pass compact_ratio, compaction copies the live rows into
+    the next generation and switches index.json in one os.replace. The old
+    generation stays on disk, since other processes may still map it; the
+    next handle to open the index removes generations before the current
+    one (a file that is still mapped on Windows is left for a later open).
+
+    Search is one matrix-vector product over the written rows with dead
+    rows masked out. Cosine similarity equals the dot product because
+    rows are normalized.
+
+    Several processes (API workers) may open the same path. Writes hold
+    index.lock, and each first catches up with the log so rows are never
+    claimed twice. Reads pick up other processes' writes by reading new
+    log records, and they reopen when index.json names a new generation.
+
+    With a compressed storage type the memory-mapped float32 rows become
+    the full-precision tier: searches score a compact in-memory copy of
+    every row, then re-rank the best rerank_k candidates with their
+    float32 vectors, so only those pages of the file are touched.
+    """
+
+    META_FILE = "index.json"
+    LOCK_FILE = "index.lock"
+    CODEBOOK_FILE = "pq_codebook.npy"
+    LEGACY_MATRIX_FILE = "embeddings.f32"
+
+    def __init__(
+        self,
+        path: str,
+        dim: int = EMBEDDING_DIM,
+        initial_capacity: int = 1024,
+        storage: str = "float32",
+        rerank_k: int = RERANK_CANDIDATES,
+        compact_ratio: float = LOCAL_INDEX_COMPACT_RATIO,
+        compact_min_rows: int = LOCAL_INDEX_COMPACT_MIN_ROWS,
+    ):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.dim = dim
+        self.storage = storage
+        self.rerank_k = rerank_k
+        self.compact_ratio = compact_ratio
+        self.compact_min_rows = compact_min_rows
+        self._meta_path = os.path.join(path, self.META_FILE)
+        self._codebook_path = os.path.join(path, self.CODEBOOK_FILE)
+        self._lock_path = os.path.join(path, self.LOCK_FILE)
+        self._lock = threading.RLock()
+        self._write_depth = 0
+
+        meta = self._read_meta()
+        if meta is None or "generation" not in meta:
+            with file_lock(self._lock_path):
+                meta = self._read_meta()
+                if meta is None:
+                    self._generation = 0
+                    self._create_generation(0, max(1, initial_capacity))
+                    self._save_meta()
+                elif "generation" not in meta:
+                    self._upgrade(meta)
+
+        self._compact = None
+        if storage != "float32":
+            self._compact = CompactMatrix(storage, dim, 1)
+
+        self._reload()
+        with self._writing():
+            self._remove_old_generations()
+            if self._compact is not None and not self._compact.trained and len(self._rows) >= PQ_TRAIN_MIN_ROWS:
+                self._maybe_train()
+
+    # -------------------------
+    # Files
+    # -------------------------
+    def _file(self, ext: str, generation: int = None) -> str:
+        generation = self._generation if generation is None else generation
+        return os.path.join(self.path, f"embeddings_{generation:06d}.{ext}")
+
+    def _remove_old_generations(self):
+        for name in os.listdir(self.path):
+            match = _GENERATION_FILE.fullmatch(name)
+            if match and int(match.group(1)) < self._generation:
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass                    # still mapped somewhere (Windows)
+
+    def _create_generation(self, generation: int, capacity: int):
+        with open(self._file("f32", generation), "wb") as f:
+            f.truncate(capacity * self.dim * 4)
+        open(self._file("log", generation), "wb").close()
+
+    def _read_meta(self) -> Optional[dict]:
+        if not os.path.exists(self._meta_path):
+            return None
+        with open(self._meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["dim"] != self.dim:
+            raise ValueError(f"Index at {self.path} has dim {meta['dim']}, expected {self.dim}")
+        return meta
+
+    def _meta_stamp(self):
+        # os.replace gives index.json a new inode whenever the generation changes
+        st = os.stat(self._meta_path)
+        return st.st_ino, st.st_mtime_ns
+
+    def _save_meta(self):
+        tmp_path = self._meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "generation": self._generation}, f)
+        os.replace(tmp_path, self._meta_path)
+
+    def _upgrade(self, meta: dict):
+        # Indexes written before the log kept every id in index.json next to
+        # embeddings.f32; they become generation 0 with the same rows
+        self._generation = 0
+        with open(self._file("log"), "wb") as f:
+            f.write("".join(f"+{sid}\n" for sid in meta["ids"]).encode("utf-8"))
+        legacy = os.path.join(self.path, self.LEGACY_MATRIX_FILE)
+        if os.path.exists(legacy):
+            os.replace(legacy, self._file("f32"))
+        self._save_meta()
+
+    def _reload(self, attempts: int = 3):
+        for attempt in range(attempts):
+            stamp = self._meta_stamp()
+            self._generation = self._read_meta()["generation"]
+            try:
+                self._load()
+            except FileNotFoundError:
+                # Compacted away by another process between the two reads
+                if attempt == attempts - 1:
+                    raise
+                continue
+            self._stamp = stamp
+            return
+
+    def _open(self):
+        self._capacity = os.path.getsize(self._file("f32")) // (self.dim * 4)
+        self._matrix = np.memmap(
+            self._file("f32"), dtype=np.float32, mode="r+", shape=(self._capacity, self.dim)
+        )
+        if self._compact is not None:
+            self._compact.resize(self._capacity)
+
+    def _load(self):
+        if self._compact is not None and not self._compact.trained and os.path.exists(self._codebook_path):
+            self._compact.codebook = np.load(self._codebook_path)
+        self._open()
+        self._ids = []                                      # row -> speaker_id
+        self._rows = {}                                     # speaker_id -> live row
+        self._alive = np.zeros(self._capacity, dtype=bool)
+        self._log_offset = 0
+        self._read_log()
+        if self._compact is not None and self._compact.trained:
+            self._encode_all()
+
+    def _read_log(self):
+        with open(self._file("log"), "rb") as f:
+            f.seek(self._log_offset)
+            raw = f.read()
+        # A record without its newline is torn by a crash (or still being written)
+        end = raw.rfind(b"\n") + 1
+        records = raw[:end].decode("utf-8").split("\n")[:-1]
+        start = len(self._ids)
+        rows = start + sum(1 for record in records if record[0] == "+")
+        if rows > self._capacity:
+            # Grown by another process
+            self._open()
+            self._alive = np.concatenate([self._alive, np.zeros(self._capacity - len(self._alive), dtype=bool)])
+        self._apply(records)
+        self._log_offset += end
+        return start
+
+    def _refresh(self):
+        """
+        Catch up with writes made through other processes.
+        """
+        if self._meta_stamp() != self._stamp:
+            generation = self._read_meta()["generation"]
+            if generation != self._generation:
+                self._reload()
+                return
+            self._stamp = self._meta_stamp()
+        if os.path.getsize(self._file("log")) == self._log_offset:
+            return
+
+        start = self._read_log()
+        if self._compact is None:
+            return
+        if not self._compact.trained and os.path.exists(self._codebook_path):
+            self._compact.codebook = np.load(self._codebook_path)
+            self._encode_all()
+        elif self._compact.trained and len(self._ids) > start:
+            rows = np.arange(start, len(self._ids))
+            self._compact.set_rows(rows, self._matrix[rows])
+
+    @contextmanager
+    def _writing(self):
+        # Thread lock, then the cross-process lock, then catch up so the
+        # next free row and the log end are current
+        with self._lock:
+            if self._write_depth:
+                self._write_depth += 1
+                try:
+                    yield
+                finally:
+                    self._write_depth -= 1
+                return
+            with file_lock(self._lock_path):
+                self._write_depth = 1
+                try:
+                    self._refresh()
+                    yield
+                finally:
+                    self._write_depth = 0
+
+    def _apply(self, records: list):
+        for record in records:
+            sid = record[1:]
+            previous = self._rows.pop(sid, None)
+            if previous is not None:
+                self._alive[previous] = False
+            if record[0] == "+":
+                row = len(self._ids)
+                self._ids.append(sid)
+                self._rows[sid] = row
+                self._alive[row] = True
+
+    def _append(self, records: list):
+        # Overwrites a torn record left at the end of the log
+        with open(self._file("log"), "r+b") as f:
+            f.seek(self._log_offset)
+            f.truncate()
+            f.write("".join(f"{record}\n" for record in records).encode("utf-8"))
+            # The append is the commit point, so it has to reach the disk
+            f.flush()
+            os.fsync(f.fileno())
+            self._log_offset = f.tell()
+        self._apply(records)
+
+    def _grow(self, min_capacity: int):
+        new_capacity = max(self._capacity * 2, min_capacity)
+        self._matrix.flush()
+        del self._matrix
+        with open(self._file("f32"), "r+b") as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self._alive = np.concatenate([self._alive, np.zeros(new_capacity - self._capacity, dtype=bool)])
+        self._open()
+
+    def _encode_all(self, block: int = 65536):
+        # Blockwise so opening a large index never copies the whole file at once
+        for start in range(0, len(self._ids), block):
+            stop = min(len(self._ids), start + block)
+            self._compact.set_rows(np.arange(start, stop), self._matrix[start:stop])
+
+    def _maybe_train(self, sample: int = 20000):
+        # PQ needs a codebook. It is trained once, when the index first holds
+        # PQ_TRAIN_MIN_ROWS speakers, and kept so existing codes stay valid.
+        if self._compact is None or self._compact.trained or len(self._rows) < PQ_TRAIN_MIN_ROWS:
+            return
+        live = np.flatnonzero(self._alive[:len(self._ids)])
+        rows = np.sort(np.random.default_rng(0).choice(live, min(len(live), sample), replace=False))
+        codebook = train_pq_codebook(self._matrix[rows])
+        tmp_path = self._codebook_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, codebook)
+        os.replace(tmp_path, self._codebook_path)
+        self._compact.codebook = codebook
+        self._encode_all()
+
+    # -------------------------
+    # Writes
+    # -------------------------
+    def upsert(self, speaker_id: str, embedding):
+        self.upsert_many([speaker_id], [embedding])
+
+    def upsert_many(self, speaker_ids, embeddings):
+        """
+        Insert or replace many speakers with a single flush.
+        """
+        speaker_ids = list(speaker_ids)
+        for sid in speaker_ids:
+            if not sid or "\n" in sid:
+                raise ValueError(f"Invalid speaker_id: {sid!r}")
+        vectors = np.stack([_normalize(e) for e in embeddings]) if speaker_ids else None
+
+        if not speaker_ids:
+            return
+        with self._writing():
+            start = len(self._ids)
+            if start + len(speaker_ids) > self._capacity:
+                self._grow(start + len(speaker_ids))
+
+            # Vectors first, then the log records that make them visible
+            rows = np.arange(start, start + len(speaker_ids))
+            self._matrix[rows] = vectors
+            self._matrix.flush()
+            if self._compact is not None:
+                self._compact.set_rows(rows, vectors)
+            self._append([f"+{sid}" for sid in speaker_ids])
+
+            self._maybe_train()
+            self._maybe_compact()
+
+    def delete(self, speaker_id: str) -> bool:
+        with self._writing():
+            if speaker_id not in self._rows:
+                return False
+            self._append([f"-{speaker_id}"])
+            self._maybe_compact()
+            return True
+
+    def _maybe_compact(self):
+        dead = len(self._ids) - len(self._rows)
+        if len(self._ids) >= self.compact_min_rows and dead > self.compact_ratio * len(self._ids):
+            self.compact()
+
+    def compact(self, block: int = 65536):
+        """
+        Copy the live rows densely into a new generation. Other processes
+        switch over on their next read; the old generation is removed by
+        the next handle that opens the index.
+        """
+        with self._writing():
+            live = np.flatnonzero(self._alive[:len(self._ids)])
+            generation = self._generation + 1
+            capacity = max(1, len(live) * 2)
+            self._create_generation(generation, capacity)
+
+            matrix = np.memmap(self._file("f32", generation), dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+            for start in range(0, len(live), block):
+                rows = live[start:start + block]
+                matrix[start:start + len(rows)] = self._matrix[rows]
+            matrix.flush()
+            del matrix
+            with open(self._file("log", generation), "wb") as f:
+                f.write("".join(f"+{self._ids[row]}\n" for row in live).encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+
+            del self._matrix
+            self._generation = generation
+            self._save_meta()
+            self._reload()
+
+    # -------------------------
+    # Reads
+    # -------------------------
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._rows)
+
+    def __contains__(self, speaker_id):
+        with self._lock:
+            self._refresh()
+            return speaker_id in self._rows
+
+    def get(self, speaker_id: str) -> Optional[np.ndarray]:
+        with self._lock:
+            self._refresh()
+            row = self._rows.get(speaker_id)
+            return None if row is None else np.array(self._matrix[row])
+
+    def vectors(self, limit: int = None) -> np.ndarray:
+        """
+        Copy of the live (normalized) rows, in row order.
+        """
+        with self._lock:
+            self._refresh()
+            rows = np.flatnonzero(self._alive[:len(self._ids)])[:limit]
+            return np.array(self._matrix[rows])
+
+    def score(self, speaker_id: str, embedding) -> Optional[float]:
+        """
+        1:1 cosine score against one enrolled speaker (None if not enrolled).
+        """
+        query = _normalize(embedding)
+        with self._lock:
+            self._refresh()
+            row = self._rows.get(speaker_id)
+            if row is None:
+                return None
+            return float(self._matrix[row] @ query)
+
+    def search(self, embedding, top_k: int = 1) -> list:
+        """
+        Exact top-k by cosine similarity, best first.
+        """
+        return self.search_many([embedding], top_k)[0]
+
+    def search_many(self, embeddings, top_k: int = 1) -> list:
+        """
+        Exact top-k for several queries with one matrix-matrix product.
+        Returns one best-first hit list per query.
+        """
+        queries = np.stack([_normalize(e) for e in embeddings]) if len(embeddings) else None
+        with self._lock:
+            self._refresh()
+            n = len(self._ids)
+            if not self._rows or top_k <= 0 or queries is None:
+                return [[] for _ in embeddings]
+
+            if self._compact is not None and self._compact.trained:
+                return self._search_compact(queries, top_k, n)
+
+            scores = queries @ self._matrix[:n].T      # [Q, n]
+            scores[:, ~self._alive[:n]] = -np.inf
+            return [self._top(row, top_k) for row in scores]
+
+    def _top(self, scores, k: int) -> list:
+        k = min(k, len(self._rows))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [SearchHit(self._ids[i], float(scores[i])) for i in top]
+
+    def _search_compact(self, queries, top_k: int, n: int) -> list:
+        # Candidates from the compact codes, final order and scores from float32
+        approx = self._compact.scores(queries, n)
+        approx[:, ~self._alive[:n]] = -np.inf
+        c = min(max(top_k, self.rerank_k), len(self._rows))
+        results = []
+        for query, row in zip(queries, approx):
+            # c never exceeds the live rows, so dead rows (at -inf) are never candidates
+            candidates = np.argpartition(-row, c - 1)[:c] if c < n else np.arange(n)
+            candidates = np.sort(candidates)
+            exact = self._matrix[candidates] @ query
+            order = np.argsort(-exact)[:top_k]
+            results.append([SearchHit(self._ids[candidates[i]], float(exact[i])) for i in order])
+        return results
+
+    def memory_stats(self) -> dict:
+        """
+        Bytes held in memory for scoring vs. on disk in the float32 tier.
+        Scoring scans every written row, dead ones included, until compaction.
+        """
+        n = len(self._ids)
+        per_vector = self._compact.bytes_per_vector if self._compact is not None else 4 * self.dim
+        return {
+            "storage": self.storage,
+            "bytes_per_vector": per_vector,
+            "scoring_bytes": per_vector * n,
+            "full_precision_bytes": 4 * self.dim * n,
+            "dead_rows": n - len(self._rows),
+        }
+
+
+# -------------------------
+# Module API (mirrors database.milvus_client)
+# -------------------------
+_index = None
+
+
+def init_local_index():
+    global _index
+
+    if _index is None:
+        if VECTOR_PARTITION_KEY != "none":
+            raise ValueError("VECTOR_PARTITION_KEY is only supported by the milvus backend")
+        _index = LocalVectorIndex(LOCAL_INDEX_PATH, storage=EMBEDDING_STORAGE)
+        print(f"✅ Local vector index loaded ({len(_index)} speakers)")
+    return _index
+
+
+# partition_key / partition_keys / scope exist for API parity: the local
+# index is never partitioned, and a scoped search is refused rather than
+# silently widened to every speaker
+
+
+def insert_embedding(speaker_id: str, embedding: list[float], partition_key: str = None):
+    init_local_index().upsert(speaker_id, embedding)
+
+
+def insert_embeddings(speaker_ids: list, embeddings: list, flush: bool = True, partition_keys: list = None):
+    # Every local write is already flushed; the flag exists for API parity
+    init_local_index().upsert_many(speaker_ids, embeddings)
+
+
+def flush_embeddings():
+    pass
+
+
+def delete_embedding(speaker_id: str):
+    init_local_index().delete(speaker_id)
+
+
+def search_embedding(
+    embedding: list[float],
+    top_k: int = 1,
+    speaker_id: str = None,
+    scope: list = None,
+    partition_key: str = None,
+):
+    index = init_local_index()
+
+    # 1:1 verification is a row fetch and a dot product
+    if speaker_id is not None:
+        score = index.score(speaker_id, embedding)
+        return [] if score is None else [SearchHit(speaker_id, score)]
+
+    return search_embeddings([embedding], top_k, scope=scope)[0]
+
+
+def search_embeddings(embeddings: list, top_k: int = 1, scope: list = None):
+    if scope:
+        raise ValueError("Scoped search needs VECTOR_PARTITION_KEY=role")
+    return init_local_index().search_many(embeddings, top_k)
+
+
+def index_stats() -> dict:
+    # Always a scan over the dense matrix (of compact codes if compressed)
+    index = init_local_index()
+    return {"index": {"index_type": "FLAT", "metric_type": "COSINE", "params": {}}, "rows": len(index), **index.memory_stats()}
@@ -1,6 +1,9 @@
 # database/milvus_client.py
 
+import os
+import re
 import time
+import numpy as np
 from pymilvus import (
     connections,
     Collection,
@@ -10,10 +13,85 @@ from pymilvus import (
     utility,
 )
 
-from config.settings import MILVUS_COLLECTION, EMBEDDING_DIM
+from config.settings import (
+    MILVUS_COLLECTION,
+    EMBEDDING_DIM,
+    MILVUS_CONSISTENCY_LEVEL,
+    MILVUS_STRONG_READ_WINDOW,
+    MILVUS_WRITE_MARKER_PATH,
+    EMBEDDING_STORAGE,
+    RERANK_CANDIDATES,
+    FULL_PRECISION_INDEX_PATH,
+    VECTOR_PARTITION_KEY,
+    VECTOR_PARTITION_COUNT,
+    VECTOR_PARTITION_REFRESH_SECONDS,
+)
+from database.common import SearchHit, normalize_embedding
+from database.compression import bytes_per_vector
+from database.local_index import LocalVectorIndex
+from database.milvus_index import MilvusIndexManager
+from database.partitioning import (
+    PARTITION_SCHEMES,
+    PartitionLoader,
+    PartitionSearcher,
+    hash_partitions,
+    partition_name,
+    scope_partitions,
+)
 
+# Set only once the collection is connected *and* loaded, so every later
+# call can skip load() entirely.
 _collection = None
 
+# monotonic() of the last insert/delete from this process
+_last_write_at = 0.0
+
+# Picks the index type / search params and rebuilds as the collection grows
+index_manager = MilvusIndexManager()
+
+# With compressed storage Milvus only generates candidates; the float32
+# vectors live in a local memory-mapped file that is read to re-rank them
+# and for 1:1 scores
+COMPRESSED = EMBEDDING_STORAGE != "float32"
+_VECTOR_DTYPE = DataType.FLOAT16_VECTOR if EMBEDDING_STORAGE == "float16" else DataType.FLOAT_VECTOR
+# FLOAT16_VECTOR fields arrived in Milvus 2.4
+FLOAT16_MIN_SERVER = (2, 4)
+_full_precision = None
+
+# Partitioned collections: partitions that exist, and the loader / fan-out
+# searcher that keep at most VECTOR_MAX_LOADED_PARTITIONS of them in memory
+if VECTOR_PARTITION_KEY not in PARTITION_SCHEMES:
+    raise ValueError(f"Unknown VECTOR_PARTITION_KEY: {VECTOR_PARTITION_KEY}")
+PARTITIONED = VECTOR_PARTITION_KEY != "none"
+# Rows enrolled before partitioning was switched on stay here until
+# scripts/migrate_partitions.py moves them
+LEGACY_PARTITION = "_default"
+_partitions = set()
+_partitions_refreshed_at = 0.0
+_partition_loader = None
+_partition_searcher = None
+
+
+def _full_tier() -> LocalVectorIndex:
+    global _full_precision
+    if _full_precision is None:
+        _full_precision = LocalVectorIndex(FULL_PRECISION_INDEX_PATH)
+    return _full_precision
+
+
+def _id_literal(speaker_id: str) -> str:
+    # Double-quoted string literal for a Milvus expression, with quotes and
+    # backslashes escaped so an ID can never end the literal early
+    return '"' + str(speaker_id).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _to_field(embeddings) -> list:
+    # A FLOAT16_VECTOR field takes numpy float16 rows (normalized first, so
+    # the half-precision range is spent on direction, not magnitude)
+    if EMBEDDING_STORAGE == "float16":
+        return [normalize_embedding(e).astype(np.float16) for e in embeddings]
+    return [list(map(float, e)) for e in embeddings]
+
 
 def init_milvus(retries: int = 10, delay: int = 2):
     global _collection
@@ -30,6 +108,7 @@ def init_milvus(retries: int = 10, delay: int = 2):
                 host="localhost",
                 port="19530"
             )
+            _check_server_version()
 
             if not utility.has_collection(MILVUS_COLLECTION):
                 fields = [
@@ -42,7 +121,7 @@ def init_milvus(retries: int = 10, delay: int = 2):
                     ),
                     FieldSchema(
                         name="embedding",
-                        dtype=DataType.FLOAT_VECTOR,
+                        dtype=_VECTOR_DTYPE,
                         dim=EMBEDDING_DIM
                     )
                 ]
@@ -52,29 +131,36 @@ def init_milvus(retries: int = 10, delay: int = 2):
                     description="Speaker embeddings"
                 )
 
-                _collection = Collection(
+                collection = Collection(
                     name=MILVUS_COLLECTION,
                     schema=schema
                 )
 
-                index_params = {
-                    "index_type": "IVF_FLAT",
-                    "metric_type": "COSINE",
-                    "params": {"nlist": 1024}
-                }
-
-                _collection.create_index(
-                    field_name="embedding",
-                    index_params=index_params
-                )
-
             else:
-                _collection = Collection(MILVUS_COLLECTION)
+                collection = Collection(MILVUS_COLLECTION)
+                field = next(f for f in collection.schema.fields if f.name == "embedding")
+                if field.dtype != _VECTOR_DTYPE:
+                    raise ValueError(
+                        f"Collection {MILVUS_COLLECTION} stores {field.dtype.name}, but EMBEDDING_STORAGE="
+                        f"{EMBEDDING_STORAGE} needs {_VECTOR_DTYPE.name}; re-enroll into a new collection"
+                    )
 
-            _collection.load()
-            print("✅ Milvus connected & collection loaded")
+            if PARTITIONED:
+                _attach_partitions(collection)
+            else:
+                index_manager.attach(collection)
+                collection.load()
+            if COMPRESSED:
+                _backfill_full_tier(collection)
+            _collection = collection
+            print(f"✅ Milvus connected & collection loaded ({index_manager.stats()['index']['index_type']} index)")
+            # Existing collections may have outgrown (or never matched) their index
+            index_manager.check()
             return _collection
 
+        except ValueError:
+            # Configuration mismatch: retrying cannot help
+            raise
         except Exception as e:
             last_error = e
             print(f"⏳ Milvus not ready (attempt {attempt+1}/{retries}), retrying...")
@@ -83,55 +169,395 @@ def init_milvus(retries: int = 10, delay: int = 2):
     raise last_error
 
 
-def insert_embedding(speaker_id: str, embedding: list[float]):
+def _check_server_version():
+    if _VECTOR_DTYPE != DataType.FLOAT16_VECTOR:
+        return
+    version = utility.get_server_version()
+    parsed = tuple(int(part) for part in re.findall(r"\d+", version)[:2])
+    if parsed < FLOAT16_MIN_SERVER:
+        raise ValueError(
+            f"EMBEDDING_STORAGE=float16 needs Milvus {'.'.join(map(str, FLOAT16_MIN_SERVER))}+ "
+            f"(server is {version}); use int8 or pq, or upgrade the server"
+        )
+
+
+def _attach_partitions(collection):
+    global _partition_loader, _partition_searcher
+
+    loader = PartitionLoader(
+        lambda names: collection.load(partition_names=names),
+        lambda names: [collection.partition(name).release() for name in names],
+    )
+
+    # Hash partitions are fixed, so all exist up front and no writer ever
+    # creates one another process does not know about
+    if VECTOR_PARTITION_KEY == "hash":
+        for name in hash_partitions(VECTOR_PARTITION_COUNT):
+            if not collection.has_partition(name):
+                collection.create_partition(name)
+    _refresh_partitions(collection, force=True)
+
+    def reload():
+        # After an index rebuild, reload just what was loaded before it
+        if loader.loaded():
+            collection.load(partition_names=loader.loaded())
+
+    index_manager.attach(collection, reload=reload)
+    if not loader.max_loaded and _partitions:
+        # No memory limit: everything loaded up front, as without partitions
+        loader.acquire(sorted(_partitions))
+        loader.release(sorted(_partitions))
+
+    _partition_loader = loader
+    _partition_searcher = PartitionSearcher(loader)
+
+
+def _refresh_partitions(collection, force: bool = False):
+    """
+    Re-read the partition list (at most every VECTOR_PARTITION_REFRESH_SECONDS
+    unless forced): other API workers and scripts/bulk_enroll.py create role
+    partitions this process would otherwise never search. Rows enrolled
+    before partitioning was switched on stay searchable in _default until
+    it is empty.
+    """
+    global _partitions, _partitions_refreshed_at
+
+    now = time.monotonic()
+    if not force and now - _partitions_refreshed_at < VECTOR_PARTITION_REFRESH_SECONDS:
+        return
+    _partitions_refreshed_at = now
+    # Swapped, not mutated, so a concurrent search sees the old or the new list
+    _partitions = {p.name for p in collection.partitions if p.name != LEGACY_PARTITION or p.num_entities > 0}
+
+
+def _ensure_partition(collection, name: str):
+    global _partitions
+
+    if name not in _partitions:
+        if not collection.has_partition(name):
+            collection.create_partition(name)
+        _partitions = _partitions | {name}
+
+
+def _route(speaker_ids, partition_keys) -> dict:
+    """
+    {partition: [row positions]} for a batch of writes (one None group when
+    the collection is not partitioned).
+    """
+    if not PARTITIONED:
+        return {None: list(range(len(speaker_ids)))}
+
+    keys = partition_keys if partition_keys is not None else [None] * len(speaker_ids)
+    groups = {}
+    for i, (sid, key) in enumerate(zip(speaker_ids, keys)):
+        name = partition_name(sid, key)
+        if name is None:
+            raise ValueError(f"Speaker {sid} has no {VECTOR_PARTITION_KEY} to partition by")
+        groups.setdefault(name, []).append(i)
+    return groups
+
+
+def _backfill_full_tier(collection, batch_size: int = 5000):
+    """
+    Copy float32 vectors out of the collection into the full-precision tier
+    when compression is switched on for an existing FLOAT_VECTOR collection.
+    """
+    full = _full_tier()
+    if _VECTOR_DTYPE != DataType.FLOAT_VECTOR or len(full) >= collection.num_entities:
+        return
+
+    # Partition by partition, so cold partitions are only loaded one at a time
+    groups = [[p] for p in sorted(_partitions)] if PARTITIONED else [None]
+    copied = 0
+    for partition_names in groups:
+        if partition_names:
+            _partition_loader.acquire(partition_names)
+        try:
+            iterator = collection.query_iterator(
+                batch_size=batch_size, output_fields=["speaker_id", "embedding"], partition_names=partition_names
+            )
+            while True:
+                batch = iterator.next()
+                if not batch:
+                    break
+                full.upsert_many([row["speaker_id"] for row in batch], [row["embedding"] for row in batch])
+                copied += len(batch)
+            iterator.close()
+        finally:
+            if partition_names:
+                _partition_loader.release(partition_names)
+    print(f"✅ Full-precision tier backfilled ({copied} speakers)")
+
+
+def _mark_write(count: int = 1):
+    global _last_write_at
+    _last_write_at = time.monotonic()
+    # The marker's mtime tells the other API processes a write just happened
+    try:
+        with open(MILVUS_WRITE_MARKER_PATH, "a"):
+            pass
+        os.utime(MILVUS_WRITE_MARKER_PATH)
+    except OSError as e:
+        print(f"Warning: could not touch {MILVUS_WRITE_MARKER_PATH}: {e}")
+    index_manager.note_writes(count)
+
+
+def _written_recently() -> bool:
+    if time.monotonic() - _last_write_at < MILVUS_STRONG_READ_WINDOW:
+        return True
+    try:
+        return time.time() - os.stat(MILVUS_WRITE_MARKER_PATH).st_mtime < MILVUS_STRONG_READ_WINDOW
+    except OSError:
+        return False
+
+
+def _read_consistency(consistency_level: str = None) -> str:
+    """
+    Explicit level wins. Otherwise reads shortly after any process wrote
+    use Strong (so a fresh enrollment is visible), everything else uses
+    the cheaper MILVUS_CONSISTENCY_LEVEL.
+    """
+    if consistency_level is not None:
+        return consistency_level
+    if _written_recently():
+        return "Strong"
+    return MILVUS_CONSISTENCY_LEVEL
+
+
+def insert_embedding(speaker_id: str, embedding: list[float], partition_key: str = None):
     collection = init_milvus()
+    partition = next(iter(_route([speaker_id], [partition_key])))
+
+    # Full-precision copy first, so a candidate can always be re-ranked
+    if COMPRESSED:
+        _full_tier().upsert(speaker_id, embedding)
 
-    # Delete existing if present (Upsert behavior)
+    # Delete existing if present (Upsert behavior; also moves a speaker whose role changed)
     try:
-        collection.delete(f"speaker_id == '{speaker_id}'")
+        collection.delete(f"speaker_id == {_id_literal(speaker_id)}")
     except Exception as e:
         print(f"Warning during delete: {e}")
 
+    if partition is not None:
+        _ensure_partition(collection, partition)
     collection.insert([
         {
             "speaker_id": speaker_id,
-            "embedding": embedding
+            "embedding": _to_field([embedding])[0]
         }
-    ])
+    ], partition_name=partition)
 
     # 🔴 REQUIRED
     collection.flush()
+    _mark_write()
 
 
-def search_embedding(embedding: list[float], top_k: int = 1, speaker_id: str = None):
+def insert_embeddings(speaker_ids: list, embeddings: list, flush: bool = True, partition_keys: list = None):
+    """
+    Bulk upsert: one delete + one insert for the whole batch (one insert per
+    partition when partitioned; partition_keys are the speakers' roles).
+    Pass flush=False when loading many batches and call flush_embeddings() once at the end.
+    """
     collection = init_milvus()
 
-    # 🔴 REQUIRED for fresh inserts
-    collection.load()
+    if not speaker_ids:
+        return
+    groups = _route(speaker_ids, partition_keys)
 
-    search_params = {
-        "metric_type": "COSINE",
-        "params": {"nprobe": 10},
-    }
+    if COMPRESSED:
+        _full_tier().upsert_many(speaker_ids, embeddings)
+
+    collection.delete(f"speaker_id in [{', '.join(_id_literal(sid) for sid in speaker_ids)}]")
+    fields = _to_field(embeddings)
+    for partition, rows in groups.items():
+        if partition is not None:
+            _ensure_partition(collection, partition)
+        collection.insert([[speaker_ids[i] for i in rows], [fields[i] for i in rows]], partition_name=partition)
+
+    if flush:
+        collection.flush()
+    _mark_write(len(speaker_ids))
+
+
+def flush_embeddings():
+    init_milvus().flush()
+    # Bulk loads are where collections cross size thresholds. Scripts exit
+    # right after flushing, so the rebuild is finished here, not abandoned.
+    index_manager.check(wait=True)
 
-    expr = None
-    if speaker_id is not None:
-        expr = f"speaker_id == '{speaker_id}'"
 
+def index_stats() -> dict:
+    # No connection attempt: before init_milvus() succeeds the index is None
+    stats = index_manager.stats()
+    per_vector = bytes_per_vector(EMBEDDING_STORAGE, EMBEDDING_DIM)
+    stats.update(
+        storage=EMBEDDING_STORAGE,
+        bytes_per_vector=per_vector,
+        vector_mb_per_million=round(per_vector * 1e6 / 2**20, 1),
+    )
+    if COMPRESSED:
+        stats.update(rerank_candidates=RERANK_CANDIDATES, full_precision_rows=len(_full_tier()))
+    if PARTITIONED:
+        stats["partitioning"] = {"key": VECTOR_PARTITION_KEY, "partitions": sorted(_partitions)}
+        if _partition_loader is not None:
+            stats["partitioning"].update(_partition_loader.stats())
+    return stats
+
+
+def delete_embedding(speaker_id: str):
+    collection = init_milvus()
+    collection.delete(f"speaker_id == {_id_literal(speaker_id)}")
+    collection.flush()
+    if COMPRESSED:
+        _full_tier().delete(speaker_id)
+    _mark_write()
+
+
+def get_embedding(speaker_id: str, consistency_level: str = None, partition_key: str = None):
+    """
+    Fetch one enrolled vector by primary key. Returns None if not enrolled.
+    A miss at a weaker level is retried Strong: a speaker enrolled moments
+    ago (by any process or host) may not be visible to it yet.
+    In a partitioned collection only the speaker's partition (plus _default
+    while it still holds pre-partitioning rows) is loaded and queried; with
+    role partitioning and no role given, only the partitions that are
+    already loaded are searched.
+    """
+    collection = init_milvus()
+
+    if COMPRESSED:
+        enrolled = _full_tier().get(speaker_id)
+        if enrolled is not None:
+            return enrolled
+
+    partitions = None
+    if PARTITIONED:
+        partition = partition_name(speaker_id, partition_key)
+        if partition is not None and partition not in _partitions:
+            # Possibly created by another process since the last refresh
+            _refresh_partitions(collection, force=True)
+        if partition is None:
+            partitions = _partition_loader.loaded()
+        else:
+            partitions = [partition] if partition in _partitions else []
+        # Not yet migrated out of _default: the speaker may still be there
+        if LEGACY_PARTITION in _partitions and LEGACY_PARTITION not in partitions:
+            partitions = partitions + [LEGACY_PARTITION]
+        if not partitions:
+            return None
+
+    index_manager.wait_available()
+    if partitions:
+        _partition_loader.acquire(partitions)
     try:
-        results = collection.search(
-            data=[embedding],
+        def query(level):
+            return collection.query(
+                expr=f"speaker_id in [{_id_literal(speaker_id)}]",
+                output_fields=["embedding"],
+                partition_names=partitions,
+                consistency_level=level,
+            )
+
+        level = _read_consistency(consistency_level)
+        rows = query(level)
+        if not rows and consistency_level is None and level != "Strong":
+            rows = query("Strong")
+    finally:
+        if partitions:
+            _partition_loader.release(partitions)
+    if not rows:
+        return None
+    return rows[0]["embedding"]
+
+
+def search_embeddings(embeddings: list, top_k: int = 1, consistency_level: str = None, scope: list = None):
+    """
+    1:N search for many query vectors in one RPC (one per partition, in
+    parallel, when partitioned). scope limits the search to the partitions
+    of those roles. Returns one best-first hit list per query.
+    """
+    partitions = scope_partitions(scope)
+    collection = init_milvus()
+
+    if not embeddings:
+        return []
+
+    # Compressed storage over-fetches candidates for the full-precision re-rank
+    limit = max(top_k, RERANK_CANDIDATES) if COMPRESSED else top_k
+    # Params read after the wait, so they match the index a rebuild left behind
+    index_manager.wait_available()
+    search_params = index_manager.search_params(limit)
+
+    data = _to_field(embeddings) if EMBEDDING_STORAGE == "float16" else list(embeddings)
+    consistency = _read_consistency(consistency_level)
+
+    def search_partitions(partition_names):
+        return [list(hits) for hits in collection.search(
+            data=data,
             anns_field="embedding",
             param=search_params,
-            limit=top_k,
-            expr=expr,
-            consistency_level="Strong",
-        )
+            limit=limit,
+            partition_names=partition_names,
+            consistency_level=consistency,
+        )]
+
+    try:
+        if PARTITIONED:
+            _refresh_partitions(collection)
+            targets = sorted(_partitions) if partitions is None else [p for p in partitions if p in _partitions]
+            if not targets:
+                return [[] for _ in embeddings]
+            results = _partition_searcher.search(lambda p: search_partitions([p]), targets, limit)
+        else:
+            results = search_partitions(None)
     except Exception as e:
         print(f"ERROR: Milvus Search Failed: {e}")
         raise e
 
-    if not results or not results[0]:
-        return []
+    if COMPRESSED:
+        return _rerank(embeddings, results, top_k)
+    return [hits[:top_k] for hits in results]
+
+
+def _rerank(embeddings, results, top_k: int) -> list:
+    """
+    Re-score each query's candidates with their float32 vectors and keep the
+    best top_k. A candidate missing from the tier keeps Milvus' score.
+    """
+    full = _full_tier()
+    reranked = []
+    for embedding, hits in zip(embeddings, results):
+        query = normalize_embedding(embedding)
+        scored = []
+        for hit in hits:
+            score = full.score(hit.id, query)
+            scored.append(SearchHit(hit.id, float(hit.distance) if score is None else score))
+        scored.sort(key=lambda h: h.distance, reverse=True)
+        reranked.append(scored[:top_k])
+    return reranked
+
+
+def search_embedding(
+    embedding: list[float],
+    top_k: int = 1,
+    speaker_id: str = None,
+    consistency_level: str = None,
+    scope: list = None,
+    partition_key: str = None,
+):
+    # 1:1 verification: primary-key fetch + local cosine instead of a filtered ANN search
+    if speaker_id is not None:
+        try:
+            enrolled = get_embedding(speaker_id, consistency_level, partition_key)
+        except Exception as e:
+            print(f"ERROR: Milvus Query Failed: {e}")
+            raise e
+
+        if enrolled is None:
+            return []
+
+        score = float(normalize_embedding(enrolled) @ normalize_embedding(embedding))
+        return [SearchHit(speaker_id, score)]
 
-    return results[0]
+    results = search_embeddings([embedding], top_k=top_k, consistency_level=consistency_level, scope=scope)
+    return results[0] if results else []
@@ -0,0 +1,441 @@
+# database/milvus_index.py
+
+import json
+import math
+import os
+import threading
+import time
+
+import numpy as np
+from pymilvus import utility
+
+from config.settings import (
+    MILVUS_TARGET_RECALL,
+    MILVUS_FLAT_MAX_ROWS,
+    MILVUS_HNSW_MIN_RECALL,
+    MILVUS_HNSW_MAX_ROWS,
+    MILVUS_SQ8_MIN_ROWS,
+    MILVUS_INDEX_CHECK_EVERY,
+    MILVUS_REBUILD_WAIT_SECONDS,
+    MILVUS_REBUILD_LOCK_PATH,
+    MILVUS_INDEX_CALIBRATION_PATH,
+    EMBEDDING_DIM,
+    EMBEDDING_STORAGE,
+)
+from core.locking import file_lock
+from database.compression import PQ_SUBVECTOR_DIM
+
+METRIC = "COSINE"
+
+# Build parameters that distinguish one index from another
+BUILD_PARAMS = ("nlist", "M", "efConstruction", "m", "nbits")
+
+
+# -------------------------
+# Index selection
+# -------------------------
+def choose_nlist(rows: int) -> int:
+    """
+    About 4·sqrt(N) inverted lists, rounded to a power of two. The rounding
+    means the recommendation only moves when the collection grows ~4x, which
+    is what keeps rebuilds rare.
+    """
+    nlist = 2 ** round(math.log2(max(1.0, 4 * math.sqrt(max(rows, 1)))))
+    return int(min(max(nlist, 16), 65536))
+
+
+def choose_index(rows: int, target_recall: float = MILVUS_TARGET_RECALL, storage: str = EMBEDDING_STORAGE) -> dict:
+    """
+    Index parameters (as passed to Collection.create_index) for a collection
+    of `rows` vectors:
+
+        small                     → FLAT (exact; brute force is cheap)
+        high recall target, ≤ max → HNSW
+        otherwise                 → IVF_FLAT, or IVF_SQ8 once the raw
+                                    vectors would not fit comfortably in memory
+
+    int8 and pq storage always use the matching quantized IVF index
+    (IVF_SQ8 / IVF_PQ); results are re-ranked at full precision anyway.
+    float16 storage lives in the field type and takes the usual choice.
+    """
+    if storage == "int8":
+        return {"index_type": "IVF_SQ8", "metric_type": METRIC, "params": {"nlist": choose_nlist(rows)}}
+    if storage == "pq":
+        return {
+            "index_type": "IVF_PQ",
+            "metric_type": METRIC,
+            "params": {"nlist": choose_nlist(rows), "m": EMBEDDING_DIM // PQ_SUBVECTOR_DIM, "nbits": 8},
+        }
+
+    if rows <= MILVUS_FLAT_MAX_ROWS:
+        return {"index_type": "FLAT", "metric_type": METRIC, "params": {}}
+
+    if target_recall >= MILVUS_HNSW_MIN_RECALL and rows <= MILVUS_HNSW_MAX_ROWS:
+        return {
+            "index_type": "HNSW",
+            "metric_type": METRIC,
+            "params": {"M": 16 if rows < 1_000_000 else 32, "efConstruction": 200},
+        }
+
+    index_type = "IVF_SQ8" if rows >= MILVUS_SQ8_MIN_ROWS else "IVF_FLAT"
+    return {"index_type": index_type, "metric_type": METRIC, "params": {"nlist": choose_nlist(rows)}}
+
+
+def index_key(index: dict) -> str:
+    """
+    Identity of an index build: type plus build parameters.
+    """
+    params = {k: int(v) for k, v in (index.get("params") or {}).items()}
+    return f"{index['index_type']}:{json.dumps(params, sort_keys=True)}"
+
+
+def default_search_params(index: dict, target_recall: float = MILVUS_TARGET_RECALL, top_k: int = 1) -> dict:
+    """
+    Heuristic nprobe / ef for an index when no calibration is available.
+    Both scale with 1 / (1 - recall): halving the allowed misses roughly
+    doubles the part of the index that has to be visited.
+    """
+    miss = max(1e-3, 1.0 - target_recall)
+    index_type = index["index_type"]
+
+    if index_type == "HNSW":
+        return {"ef": max(top_k, min(512, max(64, math.ceil(8 / miss))))}
+    if index_type.startswith("IVF"):
+        nlist = int(index["params"]["nlist"])
+        return {"nprobe": min(nlist, max(8, math.ceil(nlist * 0.002 / miss)))}
+    return {}
+
+
+# -------------------------
+# Calibration results
+# -------------------------
+def load_calibration(path: str = MILVUS_INDEX_CALIBRATION_PATH) -> dict:
+    """
+    {index_key: [{"search": {...}, "recall": r, ...}, ...]} from a file
+    written by scripts/calibrate_index.py, sweeps ordered cheapest first.
+    Missing or unreadable files give {}.
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f" Ignoring index calibration {path}: {e}")
+        return {}
+    return {index_key(entry["index"]): entry["sweep"] for entry in data.get("configs", [])}
+
+
+def calibrated_search_params(sweep: list, target_recall: float):
+    """
+    Cheapest measured search parameters reaching target_recall, or the most
+    accurate ones measured if none do. None for an empty sweep.
+    """
+    if not sweep:
+        return None
+    for point in sweep:
+        if point["recall"] >= target_recall:
+            return dict(point["search"])
+    return dict(max(sweep, key=lambda p: p["recall"])["search"])
+
+
+def recall_at_k(found_ids, exact_ids) -> float:
+    """
+    Mean fraction of the exact top-k found by an approximate search, over
+    queries (two sequences of per-query id lists).
+    """
+    total = 0.0
+    for found, exact in zip(found_ids, exact_ids):
+        if len(exact):
+            total += len(set(found) & set(exact)) / len(exact)
+    return total / max(1, len(exact_ids))
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, top_k: int, chunk: int = 256) -> np.ndarray:
+    """
+    Ground truth for calibration: row indices of the top_k cosine matches of
+    each query, best first (inputs L2-normalized).
+    """
+    k = min(top_k, len(vectors))
+    out = np.empty((len(queries), k), dtype=np.int64)
+    for start in range(0, len(queries), chunk):
+        scores = queries[start:start + chunk] @ vectors.T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        out[start:start + chunk] = np.take_along_axis(top, order, axis=1)
+    return out
+
+
+# -------------------------
+# Manager
+# -------------------------
+class MilvusIndexManager:
+    """
+    Keeps the collection's vector index matched to its size.
+
+    On attach the existing index is adopted (or the recommended one is
+    created). Every MILVUS_INDEX_CHECK_EVERY writes the row count is
+    re-read, and if choose_index() now recommends a different build the
+    index is rebuilt on a background thread. Milvus has to release a
+    collection to swap its index, so searches arriving during that window
+    wait (up to MILVUS_REBUILD_WAIT_SECONDS) for the reload.
+
+    Every API process runs a manager on the same collection. A rebuild
+    holds the lock file at lock_path, so only one process swaps the index
+    at a time, and one that finds the swap already done just adopts it.
+    The swap touches the lock file when it starts and when it ends.
+    Searches only stat the file: if its mtime moved since they last looked,
+    they wait while the lock is held, then reload what they had loaded and
+    adopt the new index. The rebuilding process's own searches wait on the
+    in-process event instead and never reload after their own swap.
+    """
+
+    def __init__(
+        self,
+        target_recall: float = MILVUS_TARGET_RECALL,
+        calibration_path: str = MILVUS_INDEX_CALIBRATION_PATH,
+        check_every: int = MILVUS_INDEX_CHECK_EVERY,
+        storage: str = EMBEDDING_STORAGE,
+        lock_path: str = MILVUS_REBUILD_LOCK_PATH,
+    ):
+        self.target_recall = target_recall
+        self.storage = storage
+        self.lock_path = lock_path
+        self.calibration = load_calibration(calibration_path)
+        self.check_every = max(1, int(check_every))
+
+        self._collection = None
+        self._reload = None
+        self._index = None
+        self._search = {}
+        self._rows = 0
+        self._writes = 0
+
+        self._lock = threading.Lock()
+        self._available = threading.Event()
+        self._available.set()
+        self._rebuild_thread = None
+        self._rebuilds = 0
+        self._last_rebuild_seconds = None
+        self._follow_lock = threading.Lock()
+        self._holding_lock = False
+        self._seen_mtime = None
+
+    # -------------------------
+    # Setup
+    # -------------------------
+    def attach(self, collection, reload=None):
+        """
+        Adopt the collection's index, creating the recommended one if it has
+        none. Call before collection.load(). After a rebuild the collection
+        is loaded again with reload() (default: collection.load).
+        """
+        self._collection = collection
+        self._reload = reload or collection.load
+        self._seen_mtime = self._lock_mtime()
+        self._rows = collection.num_entities
+
+        index = _describe_index(collection)
+        if index is None:
+            index = choose_index(self._rows, self.target_recall, self.storage)
+            collection.create_index(field_name="embedding", index_params=index)
+        self._adopt(index)
+
+    def _adopt(self, index: dict):
+        calibrated = calibrated_search_params(self.calibration.get(index_key(index)), self.target_recall)
+        with self._lock:
+            self._index = index
+            self._search = calibrated if calibrated is not None else default_search_params(index, self.target_recall)
+
+    # -------------------------
+    # Requests
+    # -------------------------
+    def search_params(self, top_k: int = 1) -> dict:
+        with self._lock:
+            params = dict(self._search)
+        if "ef" in params:
+            params["ef"] = max(params["ef"], top_k)
+        return {"metric_type": METRIC, "params": params}
+
+    def wait_available(self):
+        """
+        Block while a rebuild (in this process or another) has the
+        collection released.
+        """
+        started = time.monotonic()
+        if not self._available.wait(MILVUS_REBUILD_WAIT_SECONDS):
+            raise RuntimeError("Milvus index rebuild in progress")
+        if self.lock_path is None or self._collection is None or self._holding_lock:
+            return
+        if self._lock_mtime() == self._seen_mtime:
+            return                          # no rebuild anywhere since the last look
+
+        while self._rebuilding_elsewhere():
+            if time.monotonic() - started > MILVUS_REBUILD_WAIT_SECONDS:
+                raise RuntimeError("Milvus index rebuild in progress")
+            time.sleep(0.1)
+        self._follow(self._lock_mtime())
+
+    def _lock_mtime(self):
+        if self.lock_path is None:
+            return None
+        try:
+            return os.stat(self.lock_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _touch_lock(self):
+        os.utime(self.lock_path)
+        self._seen_mtime = self._lock_mtime()
+
+    def _rebuilding_elsewhere(self) -> bool:
+        with file_lock(self.lock_path, shared=True, blocking=False) as free:
+            return not free
+
+    def _follow(self, mtime):
+        """
+        Catch up after another process rebuilt: its release() dropped what
+        this process had loaded, and the index type may have changed.
+        """
+        with self._follow_lock:
+            if self._seen_mtime == mtime:
+                return                      # another waiting thread already did
+            self._reload()
+            index = _describe_index(self._collection)
+            if index is not None:
+                self._adopt(index)
+            self._seen_mtime = mtime
+
+    def note_writes(self, count: int = 1):
+        with self._lock:
+            self._writes += count
+            due = self._writes >= self.check_every
+            if due:
+                self._writes = 0
+        if due:
+            self.check()
+
+    # -------------------------
+    # Rebuilds
+    # -------------------------
+    def check(self, wait: bool = False) -> bool:
+        """
+        Re-read the row count and start a background rebuild if the
+        recommended index changed (wait=True blocks until it is done).
+        Returns True if a rebuild was started.
+        """
+        if self._collection is None:
+            return False
+
+        self._rows = self._collection.num_entities
+        recommended = choose_index(self._rows, self.target_recall, self.storage)
+        if self._index is not None and index_key(recommended) == index_key(self._index):
+            return False
+        return self.schedule_rebuild(recommended, wait)
+
+    def schedule_rebuild(self, index: dict, wait: bool = False) -> bool:
+        with self._lock:
+            started = self._rebuild_thread is None or not self._rebuild_thread.is_alive()
+            if started:
+                self._rebuild_thread = threading.Thread(
+                    target=self._rebuild, args=(index,), name="milvus-index-rebuild", daemon=True
+                )
+                self._rebuild_thread.start()
+            thread = self._rebuild_thread
+        if wait:
+            thread.join()
+        return started
+
+    def _rebuild(self, index: dict):
+        if self.lock_path is None:
+            self._swap_index(index)
+            return
+        with file_lock(self.lock_path):
+            self._holding_lock = True
+            try:
+                current = _describe_index(self._collection)
+                if current is not None and index_key(current) == index_key(index):
+                    # Another process rebuilt while this one waited for the lock
+                    self._reload()
+                    self._adopt(current)
+                    self._seen_mtime = self._lock_mtime()
+                    return
+                self._touch_lock()
+                try:
+                    self._swap_index(index)
+                finally:
+                    self._touch_lock()
+            finally:
+                self._holding_lock = False
+
+    def _swap_index(self, index: dict):
+        collection = self._collection
+        previous = self._index
+        print(f" Rebuilding Milvus index for {self._rows} rows: {index_key(previous)} → {index_key(index)}")
+
+        start = time.perf_counter()
+        self._available.clear()
+        try:
+            collection.release()
+            collection.drop_index()
+            collection.create_index(field_name="embedding", index_params=index)
+            utility.wait_for_index_building_complete(collection.name)
+            self._reload()
+            self._adopt(index)
+            self._rebuilds += 1
+            self._last_rebuild_seconds = time.perf_counter() - start
+            print(f"✅ Milvus index rebuilt in {self._last_rebuild_seconds:.1f}s")
+        except Exception as e:
+            print(f"ERROR: Milvus index rebuild failed: {e}")
+            self._restore(previous)
+        finally:
+            self._available.set()
+
+    def _restore(self, index: dict):
+        collection = self._collection
+        try:
+            if not collection.has_index():
+                collection.create_index(field_name="embedding", index_params=index)
+                utility.wait_for_index_building_complete(collection.name)
+            self._reload()
+        except Exception as e:
+            print(f"ERROR: Could not restore Milvus index {index_key(index)}: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            rebuilding = self._rebuild_thread is not None and self._rebuild_thread.is_alive()
+            return {
+                "index": self._index,
+                "search_params": dict(self._search),
+                "calibrated": self._index is not None and index_key(self._index) in self.calibration,
+                "rows": self._rows,
+                "recommended": choose_index(self._rows, self.target_recall, self.storage),
+                "target_recall": self.target_recall,
+                "rebuilding": rebuilding,
+                "rebuilds": self._rebuilds,
+                "last_rebuild_seconds": self._last_rebuild_seconds,
+            }
+
+
+def _describe_index(collection):
+    """
+    The collection's current index as choose_index() would write it, or
+    None if it has none.
+    """
+    if not collection.has_index():
+        return None
+    params = collection.index().params
+    return {
+        "index_type": params["index_type"],
+        "metric_type": params.get("metric_type", METRIC),
+        "params": _parse_params(params.get("params", params)),
+    }
+
+
+def _parse_params(params) -> dict:
+    # Depending on the server version, describe_index nests the build params
+    # (possibly as a JSON string) or flattens them next to index_type, with
+    # string values
+    if isinstance(params, str):
+        params = json.loads(params) if params else {}
+    return {k: int(v) for k, v in (params or {}).items() if k in BUILD_PARAMS}
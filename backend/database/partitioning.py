@@ -0,0 +1,176 @@
+# database/partitioning.py
+
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from config.settings import (
+    VECTOR_PARTITION_KEY,
+    VECTOR_PARTITION_COUNT,
+    VECTOR_MAX_LOADED_PARTITIONS,
+    VECTOR_SEARCH_WORKERS,
+)
+
+PARTITION_SCHEMES = ("none", "role", "hash")
+
+
+# -------------------------
+# Routing
+# -------------------------
+def _sanitize(value: str) -> str:
+    # Milvus partition names: letters, digits and underscores
+    return re.sub(r"[^0-9A-Za-z_]", "_", value.strip().lower()) or "default"
+
+
+def partition_name(speaker_id: str, key_value: str = None, scheme: str = VECTOR_PARTITION_KEY,
+                   count: int = VECTOR_PARTITION_COUNT):
+    """
+    Partition holding a speaker: "role_<role>" when partitioned by role,
+    "hash_<n>" (stable CRC32 of the speaker ID) when hashed. None when the
+    collection is not partitioned, or for role partitioning without a role.
+    """
+    if scheme == "role":
+        return f"role_{_sanitize(key_value)}" if key_value else None
+    if scheme == "hash":
+        return _hash_partition(zlib.crc32(speaker_id.encode('utf-8')) % count)
+    return None
+
+
+def _hash_partition(bucket: int) -> str:
+    return f"hash_{bucket:03d}"
+
+
+def hash_partitions(count: int = VECTOR_PARTITION_COUNT) -> list:
+    """
+    Every partition of the hash scheme.
+    """
+    return [_hash_partition(i) for i in range(count)]
+
+
+def scope_partitions(scope, scheme: str = VECTOR_PARTITION_KEY):
+    """
+    Partitions a 1:N search has to visit for a scope (values of the
+    partition key, e.g. roles). None means every partition.
+    """
+    if not scope:
+        return None
+    if scheme != "role":
+        raise ValueError("Scoped search needs VECTOR_PARTITION_KEY=role")
+    return sorted({partition_name("", value, scheme) for value in scope})
+
+
+def merge_top_k(per_partition: list, top_k: int) -> list:
+    """
+    Merge per-partition results ([partition][query] → best-first hits) into
+    one best-first top_k list per query.
+    """
+    if not per_partition:
+        return []
+    merged = []
+    for hits in zip(*per_partition):
+        combined = [hit for partition_hits in hits for hit in partition_hits]
+        combined.sort(key=lambda hit: hit.distance, reverse=True)
+        merged.append(combined[:top_k])
+    return merged
+
+
+# -------------------------
+# Loading
+# -------------------------
+class PartitionLoader:
+    """
+    Keeps at most max_loaded partitions in memory (0 = no limit), loading
+    on demand and releasing the least recently used. Partitions in use by
+    a running search are pinned and never released under it.
+    """
+
+    def __init__(self, load_fn, release_fn, max_loaded: int = VECTOR_MAX_LOADED_PARTITIONS):
+        self._load_fn = load_fn
+        self._release_fn = release_fn
+        self.max_loaded = max(0, int(max_loaded))
+
+        self._lock = threading.Lock()
+        self._loaded = OrderedDict()     # name → pin count, least recently used first
+        self.loads = 0
+        self.releases = 0
+
+    def loaded(self) -> list:
+        with self._lock:
+            return list(self._loaded)
+
+    def acquire(self, names):
+        """
+        Load (if needed) and pin the partitions.
+        """
+        with self._lock:
+            missing = [n for n in names if n not in self._loaded]
+            if missing:
+                self._load_fn(missing)
+                self.loads += len(missing)
+            for name in names:
+                self._loaded[name] = self._loaded.get(name, 0) + 1
+                self._loaded.move_to_end(name)
+            self._evict()
+
+    def release(self, names):
+        with self._lock:
+            for name in names:
+                if name in self._loaded:
+                    self._loaded[name] -= 1
+            self._evict()
+
+    def forget(self):
+        """
+        Drop all bookkeeping (the collection was released wholesale).
+        """
+        with self._lock:
+            self._loaded.clear()
+
+    def _evict(self):
+        if not self.max_loaded:
+            return
+        idle = [n for n, pins in self._loaded.items() if pins <= 0]
+        excess = len(self._loaded) - self.max_loaded
+        victims = idle[:max(0, excess)]
+        if victims:
+            self._release_fn(victims)
+            self.releases += len(victims)
+            for name in victims:
+                del self._loaded[name]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": list(self._loaded),
+                "max_loaded": self.max_loaded,
+                "loads": self.loads,
+                "releases": self.releases,
+            }
+
+
+class PartitionSearcher:
+    """
+    Fans a 1:N search out to several partitions in parallel (one search
+    call per partition, each pinned loaded for its duration) and merges
+    the per-partition top-k.
+    """
+
+    def __init__(self, loader: PartitionLoader, workers: int = VECTOR_SEARCH_WORKERS):
+        self.loader = loader
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="partition-search")
+
+    def search(self, search_fn, partitions: list, top_k: int) -> list:
+        """
+        search_fn(partition) → one best-first hit list per query.
+        """
+        if not partitions:
+            return []
+
+        self.loader.acquire(partitions)
+        try:
+            per_partition = list(self._executor.map(search_fn, partitions))
+        finally:
+            self.loader.release(partitions)
+        return merge_top_k(per_partition, top_k)
@@ -1,6 +1,8 @@
 # database/postgres_client.py
 
-from sqlalchemy import create_engine, Column, Integer, Float, String, DateTime
+import base64
+import json
+from sqlalchemy import create_engine, insert, select, tuple_, Column, Integer, Float, String, DateTime
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -73,6 +75,156 @@ def create_user(full_name: str, email: str, role: str, user_id: str, hashed_pass
     finally:
         session.close()
 
+def create_pending_user(full_name: str, email: str, role: str, user_id: str, hashed_password: str = None):
+    """
+    Insert a new user with voice_profile_status "pending" (first phase of
+    an enrollment). Never updates an existing row: a duplicate id or email
+    raises, so compensating with delete_user cannot remove someone else.
+    """
+    session = SessionLocal()
+    try:
+        session.add(User(
+            id=user_id,
+            full_name=full_name,
+            email=email,
+            role=role,
+            hashed_password=hashed_password,
+            voice_profile_status="pending",
+        ))
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+def set_voice_profile_status(user_id: str, status: str):
+    session = SessionLocal()
+    try:
+        updated = session.query(User).filter(User.id == user_id).update({User.voice_profile_status: status})
+        if not updated:
+            raise LookupError(f"User {user_id} not found")
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+def delete_user(user_id: str) -> bool:
+    session = SessionLocal()
+    try:
+        deleted = session.query(User).filter(User.id == user_id).delete()
+        session.commit()
+        return bool(deleted)
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+def get_pending_user_ids(created_before: datetime) -> list:
+    """
+    Users still "pending" that were created before the cutoff: enrollments
+    interrupted between their two phases.
+    """
+    session = SessionLocal()
+    try:
+        rows = session.execute(
+            select(User.id).where(User.voice_profile_status == "pending", User.created_at < created_before)
+        )
+        return [row[0] for row in rows]
+    finally:
+        session.close()
+
+def get_active_user_roles(user_ids: list) -> dict:
+    """
+    {user_id: role} for the user_ids whose voice profile is "active" (one query).
+    """
+    if not user_ids:
+        return {}
+    session = SessionLocal()
+    try:
+        rows = session.execute(
+            select(User.id, User.role).where(User.id.in_(list(user_ids)), User.voice_profile_status == "active")
+        )
+        return {user_id: role for user_id, role in rows}
+    finally:
+        session.close()
+
+def bulk_upsert_users(users: list[dict]) -> dict:
+    """
+    Insert or update many users in one statement.
+    Each dict needs id, full_name, email and role; voice_profile_status defaults to "active".
+
+    Emails are unique, so a user whose email already belongs to another ID
+    (in the table or earlier in the batch) would abort the whole statement,
+    as would an ID repeated in the batch. Such users are left out instead.
+    Returns {position in users: reason} for every user left out.
+    """
+    if not users:
+        return {}
+
+    session = SessionLocal()
+    try:
+        owners = dict(session.execute(
+            select(User.email, User.id).where(User.email.in_({u["email"] for u in users}))
+        ).all())
+    finally:
+        session.close()
+
+    skipped, seen, kept = {}, set(), []
+    for i, u in enumerate(users):
+        owner = owners.setdefault(u["email"], u["id"])
+        if owner != u["id"]:
+            skipped[i] = f"Email {u['email']} already belongs to user {owner}"
+        elif u["id"] in seen:
+            skipped[i] = f"User {u['id']} appears earlier in the batch"
+        else:
+            seen.add(u["id"])
+            kept.append(u)
+    users = kept
+    if not users:
+        return skipped
+
+    rows = [
+        {
+            "id": u["id"],
+            "full_name": u["full_name"],
+            "email": u["email"],
+            "role": u["role"],
+            "hashed_password": u.get("hashed_password"),
+            "voice_profile_status": u.get("voice_profile_status", "active"),
+            "created_at": u.get("created_at", datetime.utcnow()),
+        }
+        for u in users
+    ]
+
+    session = SessionLocal()
+    try:
+        if engine.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+            stmt = pg_insert(User).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[User.id],
+                set_={
+                    col: stmt.excluded[col]
+                    for col in ("full_name", "email", "role", "voice_profile_status")
+                },
+            )
+            session.execute(stmt)
+        else:
+            for row in rows:
+                session.merge(User(**row))
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+    return skipped
+
 def get_all_users():
     session = SessionLocal()
     try:
@@ -81,6 +233,85 @@ def get_all_users():
     finally:
         session.close()
 
+def get_user_role(user_id: str):
+    """
+    Role of one user (None if unknown); routes 1:1 lookups to a role partition.
+    """
+    session = SessionLocal()
+    try:
+        return session.execute(select(User.role).where(User.id == user_id)).scalar_one_or_none()
+    finally:
+        session.close()
+
+# Only the columns UserResponse needs (no ORM objects, no hashed_password)
+USER_LIST_COLUMNS = (
+    User.id,
+    User.full_name,
+    User.email,
+    User.role,
+    User.voice_profile_status,
+    User.created_at,
+)
+
+def encode_user_cursor(created_at: datetime, user_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), user_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_user_cursor(cursor: str):
+    try:
+        created_at, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), user_id
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def _user_list_query(role: str = None, status: str = None):
+    stmt = select(*USER_LIST_COLUMNS)
+    if role is not None:
+        stmt = stmt.where(User.role == role)
+    if status is not None:
+        stmt = stmt.where(User.voice_profile_status == status)
+    # Newest first; id breaks ties so the keyset is unique
+    return stmt.order_by(User.created_at.desc(), User.id.desc())
+
+def list_users_page(limit: int = 100, cursor: str = None, role: str = None, status: str = None):
+    """
+    Keyset-paginated user listing on (created_at, id).
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    stmt = _user_list_query(role, status)
+    if cursor:
+        created_at, user_id = decode_user_cursor(cursor)
+        stmt = stmt.where(tuple_(User.created_at, User.id) < tuple_(created_at, user_id))
+
+    session = SessionLocal()
+    try:
+        # One extra row tells us whether another page exists
+        rows = session.execute(stmt.limit(limit + 1)).mappings().all()
+    finally:
+        session.close()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_user_cursor(last["created_at"], last["id"])
+    return [dict(r) for r in rows], next_cursor
+
+def iter_users(role: str = None, status: str = None, batch_size: int = 1000):
+    """
+    Stream every matching user as a dict with a server-side cursor,
+    so memory stays constant regardless of registry size.
+    """
+    session = SessionLocal()
+    try:
+        result = session.execute(
+            _user_list_query(role, status).execution_options(yield_per=batch_size)
+        ).mappings()
+        for row in result:
+            yield dict(row)
+    finally:
+        session.close()
+
 def log_auth(speaker_id, score, decision):
     session = SessionLocal()
     log = AuthLog(
@@ -91,3 +322,32 @@ def log_auth(speaker_id, score, decision):
     session.add(log)
     session.commit()
     session.close()
+
+def log_auth_many(entries: list[tuple]):
+    """
+    Write many (speaker_id, score, decision[, timestamp]) rows with a single executemany.
+    """
+    if not entries:
+        return
+
+    now = datetime.utcnow()
+    session = SessionLocal()
+    try:
+        session.execute(
+            insert(AuthLog),
+            [
+                {
+                    "speaker_id": str(entry[0]),
+                    "score": float(entry[1]),
+                    "decision": entry[2],
+                    "timestamp": entry[3] if len(entry) > 3 else now,
+                }
+                for entry in entries
+            ],
+        )
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
@@ -0,0 +1,57 @@
+# database/vector_store.py
+#
+# Backend-agnostic entry point for speaker embedding storage.
+# Every backend module exposes the same functions:
+#
+#   init_vector_store()                                  -> connect / open the store
+#   insert_embedding(speaker_id, embedding, partition_key=None) -> insert or replace
+#   insert_embeddings(speaker_ids, embeddings, flush=True, partition_keys=None) -> bulk insert or replace
+#   flush_embeddings()                                   -> persist pending bulk writes
+#   delete_embedding(speaker_id)                         -> remove if present
+#   search_embedding(embedding, top_k=1, speaker_id=None, scope=None, partition_key=None)
+#                                                        -> hits with .id / .distance (cosine)
+#   search_embeddings(embeddings, top_k=1, scope=None)   -> one hit list per query, single round trip
+#   index_stats()                                        -> current index type, parameters and size
+#
+# VECTOR_STORE_BACKEND selects "milvus" (default) or "local" (embedded NumPy index).
+# partition_key(s) is the speaker's value of VECTOR_PARTITION_KEY (their role);
+# scope is a list of roles a 1:N search is limited to (ValueError unless the
+# store is partitioned by role).
+
+from config.settings import VECTOR_STORE_BACKEND
+
+if VECTOR_STORE_BACKEND == "local":
+    from database.local_index import (
+        init_local_index as init_vector_store,
+        insert_embedding,
+        insert_embeddings,
+        flush_embeddings,
+        delete_embedding,
+        search_embedding,
+        search_embeddings,
+        index_stats,
+    )
+elif VECTOR_STORE_BACKEND == "milvus":
+    from database.milvus_client import (
+        init_milvus as init_vector_store,
+        insert_embedding,
+        insert_embeddings,
+        flush_embeddings,
+        delete_embedding,
+        search_embedding,
+        search_embeddings,
+        index_stats,
+    )
+else:
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {VECTOR_STORE_BACKEND}")
+
+__all__ = [
+    "init_vector_store",
+    "insert_embedding",
+    "insert_embeddings",
+    "flush_embeddings",
+    "delete_embedding",
+    "search_embedding",
+    "search_embeddings",
+    "index_stats",
+]
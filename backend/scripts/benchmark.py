@@ -1,112 +1,215 @@
-
 import os
 import sys
 import glob
-import itertools
-from pathlib import Path
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 
 # Add backend to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from core.evaluation import calculate_eer, calculate_metrics
-# Assuming core_engine is available in src (project structure is a bit split)
-# We will try to import from the location seen in existing code.
-# Ideally we use the REST API logic or the Engine class.
-# Let's try to import the core model directly to avoid 'audio_loader' path issues if possible
-# But reusing VoiceAuthEngine is cleaner.
-
-# However, VoiceAuthEngine seems to be in voice_auth_project/src/core_engine.py
-# which is OUTSIDE backend?
-# Wait, list_dir of backend/ (step 6) showed `core_engine.py` is present there too?
-# Step 6: {"name":"core_engine.py"} inside backend.
-# Let's check THAT file. Step 15 showed backend/api/main.py. Step 16 showed voice_auth_project/src/core_engine.py.
-# I missed checking backend/core_engine.py.
-
-# Let's assume we use the one in backend/core_engine.py if it exists, or just use `core.speaker_model`.
-from core.speaker_model import ECAPAModel
+from core.evaluation import ScoreAccumulator
+from core.pipeline import speech_clip
 from core.preprocessing import load_audio
-from core.verification import compare_embeddings
+from config.settings import SIMILARITY_THRESHOLD, ECAPA_MODEL
+
+
+def speaker_of(path):
+    # Filename format "speakerID_sampleID.wav" (or "speakerID.wav")
+    return os.path.basename(path).split('_')[0].split('.')[0]
+
+
+# -------------------------
+# Embedding extraction (parallel decode, batched model, cached)
+# -------------------------
+def _decode(path):
+    try:
+        # Same VAD trimming as the API, so the EER reflects what is served
+        clip = speech_clip(load_audio(path))
+        if len(clip) == 0:
+            return path, None, "no speech detected"
+        return path, clip, None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def _file_key(path):
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+
+
+def load_cache(cache_path):
+    """
+    Embedding cache from a previous run: {file_key: embedding}.
+    Keys include size and mtime, so edited files are re-extracted.
+    Entries from a different model are ignored.
+    """
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    data = np.load(cache_path, allow_pickle=False)
+    if str(data["model"]) != ECAPA_MODEL:
+        return {}
+    return dict(zip(data["keys"].tolist(), data["embeddings"]))
+
+
+def save_cache(cache_path, cache):
+    if not cache_path or not cache:
+        return
+    keys = list(cache.keys())
+    tmp_path = cache_path + ".tmp.npz"
+    np.savez(tmp_path, model=ECAPA_MODEL, keys=np.array(keys), embeddings=np.stack([cache[k] for k in keys]))
+    os.replace(tmp_path, cache_path)
+
+
+def extract_embeddings(files, workers, batch_size, cache_path=None):
+    """
+    Returns (paths, matrix) where matrix is [N, D] float32, L2-normalized.
+    """
+    cache = load_cache(cache_path)
+    keys = {f: _file_key(f) for f in files}
+    missing = [f for f in files if keys[f] not in cache]
+    print(f"Embeddings: {len(files) - len(missing)} cached, {len(missing)} to extract")
+
+    if missing:
+        from core.speaker_model import ECAPAModel
+        model = ECAPAModel()
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = []
+            decoded = pool.map(_decode, missing, chunksize=16)
+            for done, (path, clip, error) in enumerate(decoded, 1):
+                if error is not None:
+                    print(f"Failed to load {path}: {error}")
+                    continue
+                pending.append((path, clip))
+                if len(pending) >= batch_size:
+                    _embed_into(model, pending, keys, cache)
+                    pending = []
+                if done % 1000 == 0:
+                    print(f"  {done}/{len(missing)} extracted")
+            _embed_into(model, pending, keys, cache)
+
+        save_cache(cache_path, cache)
+
+    paths = [f for f in files if keys[f] in cache]
+    matrix = np.stack([cache[keys[f]] for f in paths]).astype(np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    return paths, matrix
 
-def run_benchmark(audio_dir):
+
+def _embed_into(model, pending, keys, cache):
+    if not pending:
+        return
+    embs = model.extract_embeddings([clip for _, clip in pending])
+    for (path, _), emb in zip(pending, embs):
+        cache[keys[path]] = np.asarray(emb, dtype=np.float32)
+
+
+# -------------------------
+# Blockwise scoring
+# -------------------------
+def score_blocks(matrix, speaker_ids, block_size):
+    """
+    Yields (scores, labels) for every unordered pair i < j, one block at a
+    time, so memory is O(block_size²) regardless of N.
+    """
+    n = len(matrix)
+    for i0 in range(0, n, block_size):
+        i1 = min(i0 + block_size, n)
+        rows = matrix[i0:i1]
+        row_spk = speaker_ids[i0:i1, None]
+
+        for j0 in range(i0, n, block_size):
+            j1 = min(j0 + block_size, n)
+            scores = rows @ matrix[j0:j1].T
+            labels = row_spk == speaker_ids[None, j0:j1]
+
+            if j0 == i0:
+                # Diagonal block: upper triangle only, no self-pairs
+                mask = np.triu(np.ones(scores.shape, dtype=bool), k=1)
+                yield scores[mask], labels[mask]
+            else:
+                yield scores.ravel(), labels.ravel()
+
+
+def write_det(path, acc):
+    fars, frrs, thresholds = acc.det_curve()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("threshold,far,frr\n")
+        for t, far, frr in zip(thresholds, fars, frrs):
+            f.write(f"{t:.6f},{far:.8f},{frr:.8f}\n")
+
+
+def run_benchmark(audio_dir, workers=None, batch_size=16, block_size=4096, cache_path=None, scores_out=None,
+                  det_out=None, accumulator_out=None, p_target=0.01):
     print(f"Scanning {audio_dir}...")
-    files = glob.glob(os.path.join(audio_dir, "*.wav"))
+    files = sorted(glob.glob(os.path.join(audio_dir, "*.wav")))
     if not files:
         print("No wav files found.")
         return
 
     print(f"Found {len(files)} files.")
-    
-    model = ECAPAModel()
-    embeddings = {}
-    
-    # Extract all embeddings first
-    print("Extracting embeddings...")
-    for f in files:
-        try:
-            audio = load_audio(f)
-            emb = model.extract_embedding(audio)
-            embeddings[f] = emb
-        except Exception as e:
-            print(f"Failed to load {f}: {e}")
-
-    # Generate pairs
-    scores = []
-    labels = []
-    
-    keys = list(embeddings.keys())
-    
-    # itertools.combinations for unique pairs
-    # But we need positive and negative pairs.
-    # If filenames identify speakers (e.g. spk1_01.wav), we can deduce ground truth.
-    # If not, we can't automate labeling without metadata.
-    
-    # ASSUMPTION: Filename format "speakerID_sampleID.wav" or distinct filenames mean distinct speakers?
-    # User just has "speaker1.wav", "speaker2.wav".
-    # So "speaker1.wav" vs "speaker1.wav" is a positive pair (if allowed).
-    # "speaker1.wav" vs "speaker2.wav" is negative.
-    
-    # Let's do a Full Cross Join including self-comparisons?
-    # Self-comparison is always 1.0, maybe cheating?
-    # We usually want Different Samples of Same Speaker.
-    # If we only have 1 sample per speaker, we can't test True Positives (except self).
-    
+
+    started = time.perf_counter()
+    paths, matrix = extract_embeddings(files, workers or os.cpu_count() or 1, batch_size, cache_path)
+    print(f"Extraction: {time.perf_counter() - started:.1f}s")
+
+    # Integer speaker labels make the label matrix a cheap broadcast compare
+    _, speaker_ids = np.unique([speaker_of(p) for p in paths], return_inverse=True)
+
+    if scores_out:
+        os.makedirs(scores_out, exist_ok=True)
+
     print("Running comparisons...")
-    pairs = itertools.product(keys, repeat=2)
-    
-    for f1, f2 in pairs:
-        # Determine Label
-        # Heuristic: if "speaker1" in f1 and "speaker1" in f2 -> Same.
-        spk1 = os.path.basename(f1).split('_')[0].split('.')[0] # e.g. "speaker1.wav" -> "speaker1"
-        spk2 = os.path.basename(f2).split('_')[0].split('.')[0]
-        
-        is_same_speaker = (spk1 == spk2)
-        
-        # Skip self-match if strict? Actually self-match verify is useful for sanity.
-        # But for EER, we typically want distinct samples.
-        # If f1 == f2, score is 1.0.
-        
-        emb1 = embeddings[f1]
-        emb2 = embeddings[f2]
-        
-        score = compare_embeddings(emb1, emb2)
-        
-        scores.append(score)
-        labels.append(1 if is_same_speaker else 0)
-        
-        print(f"{os.path.basename(f1)} vs {os.path.basename(f2)}: {score:.4f} [{'Match' if is_same_speaker else 'Imp'}]")
+    started = time.perf_counter()
+    acc = ScoreAccumulator()
+    trials = 0
+    for chunk_idx, (scores, labels) in enumerate(score_blocks(matrix, speaker_ids, block_size)):
+        acc.add(scores, labels)
+        trials += len(scores)
+        if scores_out:
+            np.savez(
+                os.path.join(scores_out, f"scores_{chunk_idx:06d}.npz"),
+                scores=scores.astype(np.float32),
+                labels=labels.astype(np.uint8),
+            )
+    elapsed = time.perf_counter() - started
 
     print("\n--- Results ---")
-    eer, thresh = calculate_eer(scores, labels)
+    print(f"Trials: {trials} ({acc.num_targets} target, {acc.num_nontargets} impostor) "
+          f"in {elapsed:.1f}s ({trials / max(elapsed, 1e-9):.0f} trials/s)")
+    eer, thresh = acc.eer()
     print(f"EER: {eer:.4f}")
     print(f"Optimal Threshold: {thresh:.4f}")
-    
-    metrics = calculate_metrics(scores, labels, threshold=0.80) # Test default threshold
-    print(f"Metrics at 0.80: FAR={metrics['far']:.4f}, FRR={metrics['frr']:.4f}")
+
+    metrics = acc.metrics(threshold=SIMILARITY_THRESHOLD) # Test default threshold
+    print(f"Metrics at {SIMILARITY_THRESHOLD:.2f}: FAR={metrics['far']:.4f}, FRR={metrics['frr']:.4f}")
+
+    min_dcf, dcf_thresh = acc.min_dcf(p_target=p_target)
+    print(f"minDCF (p_target={p_target}): {min_dcf:.4f} at {dcf_thresh:.4f}")
+
+    if det_out:
+        write_det(det_out, acc)
+        print(f"DET curve written to {det_out}")
+    if accumulator_out:
+        # Mergeable with other runs via ScoreAccumulator.load(...).merge(...)
+        acc.save(accumulator_out)
+
 
 if __name__ == "__main__":
-    # Default audio dir assumption
-    d = "n:/PGM/Bio.VAN/voice_auth_project/audio_samples"
-    if len(sys.argv) > 1:
-        d = sys.argv[1]
-    
-    run_benchmark(d)
+    parser = argparse.ArgumentParser(description="EER benchmark over a directory of speakerID_sampleID.wav files")
+    parser.add_argument("audio_dir")
+    parser.add_argument("--workers", type=int, default=None, help="Decode processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=16, help="Clips per encode_batch call")
+    parser.add_argument("--block-size", type=int, default=4096, help="Rows per scoring block")
+    parser.add_argument("--cache", default=None, help="Embedding cache (.npz), reused between runs")
+    parser.add_argument("--scores-out", default=None, help="Directory to stream score/label chunks to")
+    parser.add_argument("--det-out", default=None, help="Write the DET curve (threshold,far,frr) as CSV")
+    parser.add_argument("--accumulator-out", default=None, help="Save the score histograms (.npz) for merging")
+    parser.add_argument("--p-target", type=float, default=0.01, help="Target prior for minDCF")
+    args = parser.parse_args()
+
+    run_benchmark(args.audio_dir, args.workers, args.batch_size, args.block_size, args.cache, args.scores_out,
+                  args.det_out, args.accumulator_out, args.p_target)
@@ -0,0 +1,226 @@
+import sys
+import os
+import csv
+import json
+import random
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.preprocessing import decode_audio_bytes
+from core.pipeline import speech_clip
+from core.anti_spoofing import liveness_detector
+from core.security import generate_speaker_id
+
+
+# -------------------------
+# Manifest / Checkpoint
+# -------------------------
+def read_manifest(path):
+    """
+    CSV:   full_name,email,role,samples[,user_id]   (samples separated by ';')
+    JSONL: {"full_name", "email", "role", "samples": [...], "user_id"?}
+
+    Sample paths are resolved relative to the manifest's directory.
+    """
+    base_dir = os.path.dirname(os.path.abspath(path))
+    rows = []
+
+    if path.lower().endswith((".jsonl", ".ndjson")):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    rows.append(json.loads(line))
+    else:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for rec in csv.DictReader(f):
+                rec["samples"] = [s for s in rec.get("samples", "").split(";") if s.strip()]
+                rows.append(rec)
+
+    for row in rows:
+        row["samples"] = [
+            s if os.path.isabs(s) else os.path.join(base_dir, s.strip())
+            for s in row["samples"]
+        ]
+        if not row.get("user_id"):
+            # Seeded by email so a re-run after a crash reuses the same ID
+            row["user_id"] = generate_speaker_id(row["full_name"], random.Random(row["email"]))
+
+    return rows
+
+
+def load_checkpoint(path):
+    done = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # torn final line from a crash
+                done[rec["row"]] = rec
+    return done
+
+
+def append_checkpoint(path, records):
+    with open(path, "a", encoding="utf-8") as f:
+        for rec in records:
+            f.write(json.dumps(rec) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+# -------------------------
+# Decode + Liveness (worker processes)
+# -------------------------
+def prepare_user(item):
+    """
+    Returns (row_index, list_of_clips, None) or (row_index, None, reason).
+    Clips carry the STFT computed for liveness, so embedding does not redo it.
+    """
+    idx, row = item
+    if not row["samples"]:
+        return idx, None, "No samples listed"
+
+    signals = []
+    for sample_path in row["samples"]:
+        try:
+            with open(sample_path, "rb") as f:
+                audio = speech_clip(decode_audio_bytes(f.read()))
+        except Exception as e:
+            return idx, None, f"{os.path.basename(sample_path)}: {e}"
+
+        if len(audio) == 0:
+            return idx, None, f"No speech detected in {os.path.basename(sample_path)}"
+
+        liveness = liveness_detector.analyze(audio)
+        if not liveness["is_live"]:
+            return idx, None, f"Spoof detected in {os.path.basename(sample_path)}: {liveness['reason']}"
+        signals.append(audio)
+
+    return idx, signals, None
+
+
+def embed_all(model, signals, batch_size):
+    """
+    Batched extraction. Clips are sorted by length first so equal-length
+    clips share a batch (the model only encodes those together).
+    """
+    order = sorted(range(len(signals)), key=lambda i: len(signals[i]))
+    out = [None] * len(signals)
+    for start in range(0, len(order), batch_size):
+        idxs = order[start:start + batch_size]
+        embs = model.extract_embeddings([signals[i] for i in idxs])
+        for i, emb in zip(idxs, embs):
+            out[i] = emb
+    return out
+
+
+# -------------------------
+# Main
+# -------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-enroll users from a manifest")
+    parser.add_argument("manifest", help="CSV or JSONL manifest")
+    parser.add_argument("--checkpoint", default=None, help="Defaults to <manifest>.checkpoint.jsonl")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Decode processes")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Users per DB write")
+    parser.add_argument("--batch-size", type=int, default=16, help="Clips per encode_batch call")
+    args = parser.parse_args()
+
+    from core.speaker_model import ECAPAModel
+    from database.postgres_client import init_db, bulk_upsert_users, log_auth_many
+    from database.vector_store import init_vector_store, insert_embeddings, flush_embeddings
+
+    checkpoint_path = args.checkpoint or args.manifest + ".checkpoint.jsonl"
+
+    rows = read_manifest(args.manifest)
+    done = load_checkpoint(checkpoint_path)
+    pending = [(i, row) for i, row in enumerate(rows) if i not in done]
+
+    print(f"Manifest: {len(rows)} users, {len(done)} already processed, {len(pending)} to go")
+    if not pending:
+        return
+
+    init_db()
+    init_vector_store()
+    model = ECAPAModel()
+
+    enrolled = rejected = 0
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        for start in range(0, len(pending), args.chunk_size):
+            chunk = pending[start:start + args.chunk_size]
+
+            # 1. Decode + liveness in parallel
+            prepared = list(pool.map(prepare_user, chunk, chunksize=8))
+
+            accepted = [(idx, sigs) for idx, sigs, reason in prepared if reason is None]
+            records = [
+                {"row": idx, "user_id": rows[idx]["user_id"], "status": "rejected", "reason": reason}
+                for idx, _, reason in prepared if reason is not None
+            ]
+
+            # 2. Batched embeddings, then per-user mean (same as /enroll)
+            flat = [sig for _, sigs in accepted for sig in sigs]
+            flat_embs = embed_all(model, flat, args.batch_size) if flat else []
+
+            users, templates = [], []
+            pos = 0
+            for idx, sigs in accepted:
+                row = rows[idx]
+                mean_embedding = np.mean(flat_embs[pos:pos + len(sigs)], axis=0)
+                pos += len(sigs)
+
+                users.append({
+                    "row": idx,
+                    "id": row["user_id"],
+                    "full_name": row["full_name"],
+                    "email": row["email"],
+                    "role": row["role"],
+                })
+                templates.append(mean_embedding.tolist())
+
+            # 3. Bulk writes (all idempotent, so a replayed chunk is harmless).
+            # A user whose email belongs to someone else is rejected, not the chunk.
+            conflicts = bulk_upsert_users(users)
+            for i, u in enumerate(users):
+                if i in conflicts:
+                    records.append({"row": u["row"], "user_id": u["id"], "status": "rejected", "reason": conflicts[i]})
+                else:
+                    records.append({"row": u["row"], "user_id": u["id"], "status": "enrolled"})
+            templates = [t for i, t in enumerate(templates) if i not in conflicts]
+            users = [u for i, u in enumerate(users) if i not in conflicts]
+            ids = [u["id"] for u in users]
+
+            insert_embeddings(ids, templates, flush=False,
+                              partition_keys=[u["role"] for u in users])
+            flush_embeddings()
+            log_auth_many([(uid, 1.0, "ENROLLED") for uid in ids])
+
+            # 4. Only now, with the vectors flushed, is the chunk durable
+            append_checkpoint(checkpoint_path, records)
+
+            enrolled += len(ids)
+            rejected += len(prepared) - len(ids)
+            elapsed = time.perf_counter() - started
+            print(f"  {start + len(chunk)}/{len(pending)} processed "
+                  f"({enrolled} enrolled, {rejected} rejected, {enrolled / elapsed:.1f} users/s)")
+
+    print(f"Done: {enrolled} enrolled, {rejected} rejected in {time.perf_counter() - started:.1f}s")
+    if rejected:
+        print(f"Rejection reasons are in {checkpoint_path}")
+
+
+if __name__ == "__main__":
+    main()
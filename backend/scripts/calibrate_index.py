@@ -0,0 +1,242 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config.settings import (
+    EMBEDDING_DIM,
+    MILVUS_COLLECTION,
+    MILVUS_TARGET_RECALL,
+    MILVUS_INDEX_CALIBRATION_PATH,
+    EMBEDDING_STORAGE,
+    FULL_PRECISION_INDEX_PATH,
+)
+from database.compression import PQ_SUBVECTOR_DIM
+from database.milvus_index import (
+    METRIC,
+    choose_index,
+    choose_nlist,
+    calibrated_search_params,
+    exact_top_k,
+    index_key,
+    recall_at_k,
+)
+
+SCRATCH_COLLECTION = f"{MILVUS_COLLECTION}_calibration"
+
+
+# -------------------------
+# Data
+# -------------------------
+def _normalize_rows(matrix):
+    return (matrix / np.linalg.norm(matrix, axis=1, keepdims=True)).astype(np.float32)
+
+
+def load_collection_vectors(limit=None):
+    """
+    Every enrolled embedding in the live collection (or the first `limit`).
+    With compressed storage the float32 tier is read instead.
+    """
+    if EMBEDDING_STORAGE != "float32":
+        from database.local_index import LocalVectorIndex
+        return LocalVectorIndex(FULL_PRECISION_INDEX_PATH).vectors(limit)
+
+    from pymilvus import Collection
+
+    collection = Collection(MILVUS_COLLECTION)
+    collection.load()
+    iterator = collection.query_iterator(batch_size=5000, limit=limit or -1, output_fields=["embedding"])
+    vectors = []
+    while True:
+        batch = iterator.next()
+        if not batch:
+            break
+        vectors.extend(row["embedding"] for row in batch)
+    iterator.close()
+    return _normalize_rows(np.asarray(vectors, dtype=np.float32))
+
+
+def synthetic_vectors(rows, dim=EMBEDDING_DIM, seed=0):
+    """
+    Stand-in for a collection that has not reached the size being planned
+    for: speaker embeddings cluster loosely, so vectors are drawn around
+    sqrt(N) random centres rather than uniformly.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(max(1, int(np.sqrt(rows))), dim)).astype(np.float32)
+    assign = rng.integers(0, len(centres), rows)
+    return _normalize_rows(centres[assign] + 0.8 * rng.normal(size=(rows, dim)).astype(np.float32))
+
+
+def make_queries(vectors, count, noise, seed=1):
+    # A fresh utterance of an enrolled speaker: their template plus noise
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(vectors), size=min(count, len(vectors)), replace=False)
+    return _normalize_rows(vectors[picks] + noise * rng.normal(size=(len(picks), vectors.shape[1])).astype(np.float32))
+
+
+# -------------------------
+# Candidates
+# -------------------------
+def candidate_configs(rows, top_k, extra_nlists=()):
+    """
+    (index params, search param sweep ordered cheapest first) for every
+    index type the manager can choose.
+    """
+    configs = [({"index_type": "FLAT", "metric_type": METRIC, "params": {}}, [{}])]
+
+    for nlist in sorted({choose_nlist(rows), *extra_nlists}):
+        nprobes = [p for p in (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024) if p < nlist] + [min(nlist, 1024)]
+        for index_type in ("IVF_FLAT", "IVF_SQ8", "IVF_PQ"):
+            params = {"nlist": nlist}
+            if index_type == "IVF_PQ":
+                params.update(m=EMBEDDING_DIM // PQ_SUBVECTOR_DIM, nbits=8)
+            index = {"index_type": index_type, "metric_type": METRIC, "params": params}
+            configs.append((index, [{"nprobe": p} for p in nprobes]))
+
+    hnsw = {"index_type": "HNSW", "metric_type": METRIC, "params": {"M": 16 if rows < 1_000_000 else 32, "efConstruction": 200}}
+    efs = sorted({max(top_k, ef) for ef in (16, 32, 64, 128, 256, 512)})
+    configs.append((hnsw, [{"ef": ef} for ef in efs]))
+    return configs
+
+
+# -------------------------
+# Measurement
+# -------------------------
+def create_scratch_collection(vectors, batch_size=10000):
+    from pymilvus import Collection, CollectionSchema, DataType, FieldSchema, utility
+
+    if utility.has_collection(SCRATCH_COLLECTION):
+        utility.drop_collection(SCRATCH_COLLECTION)
+
+    schema = CollectionSchema([
+        FieldSchema(name="row", dtype=DataType.INT64, is_primary=True, auto_id=False),
+        FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=vectors.shape[1]),
+    ], description="Index calibration scratch copy")
+    collection = Collection(name=SCRATCH_COLLECTION, schema=schema)
+
+    for start in range(0, len(vectors), batch_size):
+        block = vectors[start:start + batch_size]
+        collection.insert([list(range(start, start + len(block))), block.tolist()])
+    collection.flush()
+    return collection
+
+
+def build_index(collection, index):
+    from pymilvus import utility
+
+    collection.release()
+    if collection.has_index():
+        collection.drop_index()
+    started = time.perf_counter()
+    collection.create_index(field_name="embedding", index_params=index)
+    utility.wait_for_index_building_complete(collection.name)
+    collection.load()
+    return time.perf_counter() - started
+
+
+def measure(collection, queries, exact, top_k, search, latency_queries):
+    """
+    Recall@k over all queries (batched), latency from single-query searches
+    as the API issues them.
+    """
+    param = {"metric_type": METRIC, "params": search}
+
+    found = []
+    for start in range(0, len(queries), 256):
+        results = collection.search(
+            data=queries[start:start + 256].tolist(), anns_field="embedding",
+            param=param, limit=top_k, consistency_level="Strong",
+        )
+        found.extend([hit.id for hit in hits] for hits in results)
+
+    latencies = []
+    for query in queries[:latency_queries]:
+        started = time.perf_counter()
+        collection.search(data=[query.tolist()], anns_field="embedding", param=param, limit=top_k)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "search": search,
+        "recall": round(recall_at_k(found, exact.tolist()), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure recall against exact search and latency for each Milvus index configuration"
+    )
+    parser.add_argument("--synthetic", type=int, default=0, help="Calibrate on N synthetic vectors instead of the live collection")
+    parser.add_argument("--limit", type=int, default=None, help="Use at most this many vectors from the collection")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--latency-queries", type=int, default=200, help="Single-query searches timed per setting")
+    parser.add_argument("--query-noise", type=float, default=0.3, help="Noise added to sampled templates to form queries")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, action="append", default=[], help="Extra nlist values to try (repeatable)")
+    parser.add_argument("--target-recall", type=float, default=MILVUS_TARGET_RECALL)
+    parser.add_argument("--out", default=MILVUS_INDEX_CALIBRATION_PATH, help="Calibration file read by the API")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch collection afterwards")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", default="19530")
+    args = parser.parse_args()
+
+    from pymilvus import connections, utility
+    connections.connect(alias="default", host=args.host, port=args.port)
+
+    vectors = synthetic_vectors(args.synthetic) if args.synthetic else load_collection_vectors(args.limit)
+    rows = len(vectors)
+    if rows == 0:
+        print("No vectors to calibrate on")
+        return
+
+    queries = make_queries(vectors, args.queries, args.query_noise)
+    exact = exact_top_k(vectors, queries, args.top_k)
+    print(f"Calibrating on {rows} vectors, {len(queries)} queries, recall@{args.top_k}")
+
+    collection = create_scratch_collection(vectors)
+    results = []
+    try:
+        for index, sweep in candidate_configs(rows, args.top_k, args.nlist):
+            build_seconds = build_index(collection, index)
+            points = [measure(collection, queries, exact, args.top_k, s, args.latency_queries) for s in sweep]
+            results.append({"index": index, "build_seconds": round(build_seconds, 2), "sweep": points})
+
+            print(f"\n{index_key(index)}  (build {build_seconds:.1f}s)")
+            for p in points:
+                print(f"  {json.dumps(p['search']):<18} recall {p['recall']:.4f}  p50 {p['p50_ms']:.2f} ms  p95 {p['p95_ms']:.2f} ms")
+    finally:
+        if not args.keep:
+            collection.release()
+            utility.drop_collection(SCRATCH_COLLECTION)
+
+    # What the manager would run at this size, with the measured parameters
+    chosen = choose_index(rows, args.target_recall)
+    for entry in results:
+        if index_key(entry["index"]) == index_key(chosen):
+            search = calibrated_search_params(entry["sweep"], args.target_recall)
+            print(f"\nAt {rows} rows and recall ≥ {args.target_recall}: {index_key(chosen)} with {search}")
+
+    report = {
+        "rows": rows,
+        "source": "synthetic" if args.synthetic else MILVUS_COLLECTION,
+        "top_k": args.top_k,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "configs": results,
+    }
+    tmp_path = args.out + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, args.out)
+    print(f"Calibration written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+from collections import defaultdict
+
+import numpy as np
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config.settings import EMBEDDING_DIM, RERANK_CANDIDATES, SIMILARITY_THRESHOLD
+from database.compression import STORAGE_TYPES, bytes_per_vector
+from database.local_index import LocalVectorIndex
+
+
+def _normalize_rows(matrix):
+    return (matrix / np.linalg.norm(matrix, axis=1, keepdims=True)).astype(np.float32)
+
+
+# -------------------------
+# Trials
+# -------------------------
+def trials_from_benchmark_cache(path, impostor_fraction=0.2, seed=0):
+    """
+    Enrollment templates and probe utterances from the embedding cache the
+    benchmark writes (--cache). Each enrolled speaker's template is the mean
+    of half their utterances and the other half are genuine probes; a
+    share of speakers is held out entirely and only probes (impostors).
+    """
+    data = np.load(path, allow_pickle=False)
+    by_speaker = defaultdict(list)
+    for key, emb in zip(data["keys"].tolist(), data["embeddings"]):
+        speaker = os.path.basename(key.split("|")[0]).split('_')[0].split('.')[0]
+        by_speaker[speaker].append(emb)
+
+    rng = np.random.default_rng(seed)
+    speakers = sorted(s for s, embs in by_speaker.items() if len(embs) >= 2)
+    held_out = set(rng.choice(speakers, int(len(speakers) * impostor_fraction), replace=False))
+
+    ids, templates, probes = [], [], []
+    for speaker in speakers:
+        embs = _normalize_rows(np.asarray(by_speaker[speaker], dtype=np.float32))
+        if speaker in held_out:
+            probes.extend(embs)
+            continue
+        half = len(embs) // 2
+        ids.append(speaker)
+        templates.append(embs[:half].mean(axis=0))
+        probes.extend(embs[half:])
+    return ids, _normalize_rows(np.asarray(templates)), _normalize_rows(np.asarray(probes))
+
+
+def synthetic_trials(speakers, probes, dim=EMBEDDING_DIM, noise=0.6, seed=0):
+    """
+    Clustered random templates; probes are noisy copies of enrolled ones
+    plus the same number of unenrolled vectors.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(max(1, int(np.sqrt(speakers))), dim))
+    templates = _normalize_rows(centres[rng.integers(0, len(centres), speakers)] + 0.8 * rng.normal(size=(speakers, dim)))
+    picks = rng.integers(0, speakers, probes // 2)
+    genuine = templates[picks] + noise * rng.normal(size=(len(picks), dim)) / np.sqrt(dim)
+    impostor = centres[rng.integers(0, len(centres), probes - len(picks))] + 0.8 * rng.normal(size=(probes - len(picks), dim))
+    ids = [f"spk{i}" for i in range(speakers)]
+    return ids, templates, _normalize_rows(np.concatenate([genuine, impostor]))
+
+
+# -------------------------
+# Measurement
+# -------------------------
+def decisions(index, probes, threshold, batch_size=256):
+    """
+    1:N decision per probe as /verify makes it: the best match if its score
+    clears the threshold, else None. Also returns the top scores.
+    """
+    accepted, scores = [], []
+    for start in range(0, len(probes), batch_size):
+        for hits in index.search_many(list(probes[start:start + batch_size]), top_k=1):
+            best = hits[0]
+            accepted.append(best.id if best.distance >= threshold else None)
+            scores.append(best.distance)
+    return accepted, np.asarray(scores)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare compressed-storage decisions against float32 and report memory per million speakers. "
+                    "Measures the local NumPy index (VECTOR_STORE_BACKEND=local); Milvus candidate generation "
+                    "uses its own index types and is not measured here."
+    )
+    parser.add_argument("--embeddings", default=None, help="Embedding cache written by benchmark.py --cache")
+    parser.add_argument("--synthetic-speakers", type=int, default=20000)
+    parser.add_argument("--synthetic-probes", type=int, default=2000)
+    parser.add_argument("--rerank", type=int, default=RERANK_CANDIDATES, help="Candidates re-ranked at full precision")
+    parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD)
+    parser.add_argument("--tolerance", type=float, default=0.001, help="Largest acceptable share of changed decisions")
+    parser.add_argument("--json-out", default=None)
+    args = parser.parse_args()
+
+    if args.embeddings:
+        ids, templates, probes = trials_from_benchmark_cache(args.embeddings)
+    else:
+        ids, templates, probes = synthetic_trials(args.synthetic_speakers, args.synthetic_probes)
+    print(f"{len(ids)} enrolled speakers, {len(probes)} probes, threshold {args.threshold}, re-rank top {args.rerank}\n")
+
+    report = {"speakers": len(ids), "probes": len(probes), "threshold": args.threshold, "rerank": args.rerank, "storage": {}}
+    baseline = baseline_scores = None
+    failed = False
+
+    print(f"{'storage':<8} {'B/vector':>8} {'MB per 1M':>10} {'saving':>7} {'changed':>9} {'max |Δscore|':>13}")
+    for storage in STORAGE_TYPES:
+        with tempfile.TemporaryDirectory() as workdir:
+            index = LocalVectorIndex(workdir, initial_capacity=len(ids), storage=storage, rerank_k=args.rerank)
+            index.upsert_many(ids, templates)
+            accepted, scores = decisions(index, probes, args.threshold)
+            del index
+
+        if baseline is None:
+            baseline, baseline_scores = accepted, scores
+
+        changed = float(np.mean([a != b for a, b in zip(accepted, baseline)]))
+        delta = float(np.max(np.abs(scores - baseline_scores))) if len(scores) else 0.0
+        per_vector = bytes_per_vector(storage, EMBEDDING_DIM)
+        per_million = per_vector * 1e6 / 2**20
+        saving = 1 - per_vector / bytes_per_vector("float32", EMBEDDING_DIM)
+
+        print(f"{storage:<8} {per_vector:>8} {per_million:>10.1f} {saving:>7.0%} {changed:>9.4%} {delta:>13.2e}")
+        report["storage"][storage] = {
+            "bytes_per_vector": per_vector,
+            "mb_per_million": round(per_million, 1),
+            "saving": round(saving, 3),
+            "decisions_changed": changed,
+            "max_score_delta": delta,
+        }
+        failed |= changed > args.tolerance
+
+    print("\nScores are re-ranked at full precision, so 1:1 decisions are unchanged by construction;")
+    print("the float32 tier costs the full vector size on disk rather than in memory.")
+    print("These figures are for the local NumPy index; with Milvus the candidates come from its own")
+    print("IVF_SQ8 / IVF_PQ / FLOAT16_VECTOR index and recall there is not measured by this script.")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if failed:
+        print(f"\nFAIL: some storage type changed more than {args.tolerance:.2%} of decisions")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
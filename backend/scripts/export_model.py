@@ -0,0 +1,32 @@
+import os
+import sys
+import time
+import argparse
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.speaker_model import ECAPAModel
+from core.compiled_model import export_pipeline
+from config.settings import COMPILED_MODEL_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the ECAPA embedding pipeline as TorchScript")
+    parser.add_argument("--out", default=COMPILED_MODEL_PATH, help=f"Artifact path (default: {COMPILED_MODEL_PATH})")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    model = ECAPAModel(use_compiled=False, quantized=False)
+    print(f"Loaded SpeechBrain model in {time.perf_counter() - started:.1f}s")
+
+    export_pipeline(model.model, model.frontend, args.out)
+    print(f"✅ Wrote {args.out}")
+
+    started = time.perf_counter()
+    ECAPAModel(use_compiled=True, quantized=False)
+    print(f"Compiled pipeline loads in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+import os
+import sys
+import io
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+
+import numpy as np
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Add backend to path
+sys.path.append(BACKEND_DIR)
+
+SAMPLE_RATE = 16000
+
+
+# -------------------------
+# Synthetic corpus
+# -------------------------
+def speaker_profile(rng):
+    """
+    Voice parameters for one synthetic speaker: pitch, formants, speaking rate.
+    """
+    return {
+        "f0": float(rng.uniform(90, 240)),
+        "formants": sorted(rng.uniform([300, 900, 2000], [900, 2200, 3500]).tolist()),
+        "rate": float(rng.uniform(3.0, 5.5)),  # syllables per second
+    }
+
+
+def synth_utterance(profile, seconds, rng):
+    """
+    Speech-like signal: a glottal harmonic source with pitch drift, shaped by
+    three formant resonators, gated into syllables with pauses, plus short
+    fricative noise bursts and a low noise floor.
+    """
+    from scipy.signal import iirpeak, lfilter
+
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+
+    f0 = profile["f0"] * (1 + 0.08 * np.sin(2 * np.pi * rng.uniform(0.2, 0.6) * t + rng.uniform(0, 2 * np.pi)))
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    source = sum(np.sin(k * phase) / k for k in range(1, int(4000 // profile["f0"])))
+
+    voiced = np.zeros(n)
+    for formant in profile["formants"]:
+        b, a = iirpeak(formant / (SAMPLE_RATE / 2), Q=formant / 100.0)
+        voiced += lfilter(b, a, source)
+
+    # Syllable envelope with a ~0.4 s pause roughly every 1.5 s
+    envelope = (0.5 - 0.5 * np.cos(2 * np.pi * profile["rate"] * t)) ** 2
+    pause_starts = np.arange(rng.uniform(1.0, 2.0), seconds, 1.5)
+    for start in pause_starts:
+        envelope[int(start * SAMPLE_RATE):int((start + 0.4) * SAMPLE_RATE)] = 0.0
+
+    fricatives = np.zeros(n)
+    for start in rng.uniform(0, seconds - 0.1, size=int(seconds * 1.5)):
+        s0 = int(start * SAMPLE_RATE)
+        burst = rng.normal(0, 1, int(0.06 * SAMPLE_RATE))
+        fricatives[s0:s0 + len(burst)] += np.diff(burst, prepend=0.0)[:n - s0] * 0.15
+
+    signal = voiced * envelope + fricatives + rng.normal(0, 1e-3, n)
+    return (0.5 * signal / np.max(np.abs(signal))).astype(np.float32)
+
+
+def to_wav(samples):
+    import soundfile as sf
+
+    buf = io.BytesIO()
+    sf.write(buf, samples, SAMPLE_RATE, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+
+def build_corpus(num_speakers, seconds, seed):
+    """
+    Deterministic corpus: per speaker, 3 enrollment clips plus one genuine
+    verification clip; each speaker is also used as an impostor claim
+    against the next one.
+    """
+    rng = np.random.default_rng(seed)
+    speakers = []
+    for i in range(num_speakers):
+        profile = speaker_profile(rng)
+        speakers.append({
+            "name": f"Load Tester {i:05d}",
+            "email": f"loadtest{i:05d}@example.com",
+            "enroll": [to_wav(synth_utterance(profile, seconds, rng)) for _ in range(3)],
+            "verify": to_wav(synth_utterance(profile, seconds, rng)),
+        })
+    return speakers
+
+
+# -------------------------
+# In-process stand-ins
+# -------------------------
+def configure_stand_ins(workdir):
+    """
+    Point the app at SQLite (behind postgres_client) and the local
+    memory-mapped vector store (instead of Milvus), both under workdir.
+    Must run before anything imports config.settings.
+    """
+    os.environ["POSTGRES_URL"] = f"sqlite:///{os.path.join(workdir, 'loadtest.db')}"
+    os.environ["VECTOR_STORE_BACKEND"] = "local"
+    os.environ["LOCAL_INDEX_PATH"] = os.path.join(workdir, "vector_index")
+    os.environ["AUDIT_SPILL_PATH"] = os.path.join(workdir, "audit_spill.jsonl")
+    os.environ["EMBEDDING_CACHE_DIR"] = ""  # memory tier only; never touch a real cache
+
+
+def install_untrained_model():
+    """
+    Replace ECAPAModel's weights with a randomly initialized ECAPA-TDNN of
+    the published spkrec-ecapa-voxceleb architecture: same compute per clip
+    as the real model, so throughput numbers carry over, but scores do not.
+    """
+    import torch
+    from speechbrain.lobes.features import Fbank
+    from speechbrain.processing.features import InputNormalization
+    from speechbrain.lobes.models.ECAPA_TDNN import ECAPA_TDNN
+    import core.speaker_model as speaker_model
+
+    class _UntrainedECAPA:
+        def __init__(self):
+            torch.manual_seed(0)
+            self.mods = torch.nn.ModuleDict({
+                "compute_features": Fbank(n_mels=80),
+                "mean_var_norm": InputNormalization(norm_type="sentence", std_norm=False),
+                "embedding_model": ECAPA_TDNN(
+                    80, channels=[1024, 1024, 1024, 1024, 3072], lin_neurons=192
+                ),
+            }).eval()
+
+        def encode_batch(self, wavs, wav_lens=None):
+            if wav_lens is None:
+                wav_lens = torch.ones(wavs.shape[0])
+            feats = self.mods.compute_features(wavs)
+            feats = self.mods.mean_var_norm(feats, wav_lens)
+            return self.mods.embedding_model(feats, wav_lens)
+
+    base = speaker_model.ECAPAModel
+
+    class UntrainedECAPAModel(base):
+        def __init__(self, *args, **kwargs):
+            super().__init__(use_compiled=False, quantized=False, sb_model=_UntrainedECAPA())
+
+    speaker_model.ECAPAModel = UntrainedECAPAModel
+
+
+def start_server(app, port):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# -------------------------
+# Traffic
+# -------------------------
+def parse_stage_metrics(text):
+    """
+    {stage: (sum_seconds, count)} from the /metrics exposition.
+    """
+    stages = {}
+    for line in text.splitlines():
+        for suffix, pos in (("_sum", 0), ("_count", 1)):
+            prefix = f"biovan_stage_seconds{suffix}{{stage=\""
+            if line.startswith(prefix):
+                stage = line[len(prefix):line.index("\"}")]
+                entry = stages.setdefault(stage, [0.0, 0])
+                entry[pos] = float(line.rsplit(" ", 1)[1])
+    return stages
+
+
+async def run_phase(client, jobs, concurrency):
+    """
+    Run coroutine factories with bounded concurrency.
+    Returns (report, responses): latency percentiles, errors, throughput and
+    per-stage means from /metrics; responses are JSON bodies in job order.
+    """
+    before = parse_stage_metrics((await client.get("/metrics")).text)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors, results = [], 0, [None] * len(jobs)
+
+    async def one(i, job):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await job()
+                ok = response.status_code == 200
+            except Exception:
+                response, ok = None, False
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+            results[i] = response.json() if ok else None
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i, job) for i, job in enumerate(jobs)))
+    wall = time.perf_counter() - started
+
+    after = parse_stage_metrics((await client.get("/metrics")).text)
+    stages = {}
+    for stage, (total, count) in after.items():
+        prev_total, prev_count = before.get(stage, (0.0, 0))
+        if count > prev_count:
+            stages[stage] = {"count": int(count - prev_count), "mean_ms": 1000 * (total - prev_total) / (count - prev_count)}
+
+    lat = np.array(latencies) * 1000
+    report = {
+        "requests": len(jobs),
+        "errors": errors,
+        "wall_seconds": wall,
+        "throughput_rps": len(jobs) / wall if wall else 0.0,
+        "p50_ms": float(np.percentile(lat, 50)) if len(lat) else 0.0,
+        "p95_ms": float(np.percentile(lat, 95)) if len(lat) else 0.0,
+        "p99_ms": float(np.percentile(lat, 99)) if len(lat) else 0.0,
+        "stages": stages,
+    }
+    return report, results
+
+
+def print_report(name, report):
+    print(f"\n--- {name} ---")
+    print(f"{report['requests']} requests, {report['errors']} errors in {report['wall_seconds']:.1f}s "
+          f"({report['throughput_rps']:.2f} req/s)")
+    print(f"latency p50={report['p50_ms']:.0f}ms p95={report['p95_ms']:.0f}ms p99={report['p99_ms']:.0f}ms")
+    for stage, s in sorted(report["stages"].items(), key=lambda kv: -kv[1]["mean_ms"] * kv[1]["count"]):
+        print(f"  {stage:<16} {s['mean_ms']:9.2f} ms  x{s['count']}")
+
+
+async def drive(base_url, corpus, concurrency):
+    import httpx
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        while (await client.get("/ready")).status_code != 200:
+            await asyncio.sleep(0.2)
+
+        def enroll_job(spk):
+            files = [(f"sample_{k + 1}", (f"s{k + 1}.wav", clip, "audio/wav")) for k, clip in enumerate(spk["enroll"])]
+            data = {"full_name": spk["name"], "email": spk["email"], "role": "user"}
+            return lambda: client.post("/enroll", data=data, files=files)
+
+        enroll_report, enrolled = await run_phase(client, [enroll_job(s) for s in corpus], concurrency)
+        ids = [r["user_id"] if r else None for r in enrolled]
+
+        # Genuine claims, then each speaker claiming the next one's identity
+        claims = [(spk["verify"], ids[i], True) for i, spk in enumerate(corpus) if ids[i]]
+        claims += [(spk["verify"], ids[(i + 1) % len(ids)], False)
+                   for i, spk in enumerate(corpus) if ids[(i + 1) % len(ids)] and len(ids) > 1]
+
+        def verify_job(clip, speaker_id):
+            return lambda: client.post("/verify", params={"speaker_id": speaker_id},
+                                       files={"file": ("v.wav", clip, "audio/wav")})
+
+        verify_report, verified = await run_phase(client, [verify_job(c, sid) for c, sid, _ in claims], concurrency)
+
+        genuine = [r["verified"] for r, (_, _, g) in zip(verified, claims) if r and g]
+        impostor = [r["verified"] for r, (_, _, g) in zip(verified, claims) if r and not g]
+        verify_report["genuine_accept_rate"] = float(np.mean(genuine)) if genuine else None
+        verify_report["impostor_accept_rate"] = float(np.mean(impostor)) if impostor else None
+
+    return {"enroll": enroll_report, "verify": verify_report}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline /enroll + /verify load test with SQLite and local vector store stand-ins")
+    parser.add_argument("--speakers", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=6.0, help="Length of each synthetic clip")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model", choices=["real", "untrained"], default="real",
+                        help="untrained: random ECAPA weights, same compute (for boxes without the checkpoint)")
+    parser.add_argument("--workdir", default=None, help="Where SQLite and the vector index live (default: temp dir)")
+    parser.add_argument("--json-out", default=None, help="Write the report as JSON (for comparing runs)")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="biovan_loadtest_")
+    configure_stand_ins(workdir)
+    if args.model == "untrained":
+        # Worker processes would load the real model, so stay in-process
+        os.environ["WORKER_POOL_ENABLED"] = "false"
+
+    # App imports resolve relative paths (pretrained_models/...) from backend/
+    os.chdir(BACKEND_DIR)
+    if args.model == "untrained":
+        install_untrained_model()
+
+    print(f"Generating corpus: {args.speakers} speakers x 4 clips of {args.seconds}s (seed {args.seed})")
+    corpus = build_corpus(args.speakers, args.seconds, args.seed)
+
+    from api.main import app
+
+    port = free_port()
+    server, thread = start_server(app, port)
+    print(f"App running on 127.0.0.1:{port}, state in {workdir}")
+
+    try:
+        report = asyncio.run(drive(f"http://127.0.0.1:{port}", corpus, args.concurrency))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=30)
+
+    report["config"] = vars(args)
+    print_report("POST /enroll", report["enroll"])
+    print_report("POST /verify", report["verify"])
+    print(f"genuine accept rate: {report['verify']['genuine_accept_rate']}, "
+          f"impostor accept rate: {report['verify']['impostor_accept_rate']}")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
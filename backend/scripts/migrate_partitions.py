@@ -0,0 +1,78 @@
+import os
+import sys
+import argparse
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config.settings import VECTOR_PARTITION_KEY
+from database.postgres_client import get_user_role
+import database.milvus_client as milvus
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Move speakers enrolled before partitioning was enabled out of _default into their partitions"
+    )
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="Only count what would move")
+    args = parser.parse_args()
+
+    if not milvus.PARTITIONED:
+        print("VECTOR_PARTITION_KEY is none: nothing to migrate")
+        return
+
+    collection = milvus.init_milvus()
+    if milvus.LEGACY_PARTITION not in milvus._partitions:
+        print(f"{milvus.LEGACY_PARTITION} is empty: nothing to migrate")
+        return
+
+    moved = skipped = 0
+    milvus._partition_loader.acquire([milvus.LEGACY_PARTITION])
+    try:
+        iterator = collection.query_iterator(
+            batch_size=args.batch_size,
+            output_fields=["speaker_id", "embedding"],
+            partition_names=[milvus.LEGACY_PARTITION],
+            consistency_level="Strong",
+        )
+        # Collected first: moving rows while iterating _default would shift the iterator
+        rows = []
+        while True:
+            batch = iterator.next()
+            if not batch:
+                break
+            rows.extend(batch)
+        iterator.close()
+    finally:
+        milvus._partition_loader.release([milvus.LEGACY_PARTITION])
+
+    for start in range(0, len(rows), args.batch_size):
+        batch = rows[start:start + args.batch_size]
+        ids, embeddings, keys = [], [], []
+        for row in batch:
+            sid = row["speaker_id"]
+            key = get_user_role(sid) if VECTOR_PARTITION_KEY == "role" else None
+            if VECTOR_PARTITION_KEY == "role" and not key:
+                print(f"Skipping {sid}: no role in Postgres")
+                skipped += 1
+                continue
+            # The float32 tier holds the exact vector when the field is compressed
+            full = milvus._full_tier().get(sid) if milvus.COMPRESSED else None
+            ids.append(sid)
+            embeddings.append(full if full is not None else row["embedding"])
+            keys.append(key)
+
+        if ids and not args.dry_run:
+            # Deletes by id (including the _default copy), then inserts into the partitions
+            milvus.insert_embeddings(ids, embeddings, flush=False, partition_keys=keys)
+        moved += len(ids)
+        print(f"  {min(start + len(batch), len(rows))}/{len(rows)} rows")
+
+    if not args.dry_run:
+        milvus.flush_embeddings()
+    print(f"{'Would move' if args.dry_run else 'Moved'} {moved} speakers, skipped {skipped}")
+
+
+if __name__ == "__main__":
+    main()
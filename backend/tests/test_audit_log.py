@@ -0,0 +1,100 @@
+import sys
+import os
+
+# Adjust path to find backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.audit_log import AuditLogWriter
+
+
+def test_rows_are_batched_and_drained_on_stop(tmp_path):
+    batches = []
+    writer = AuditLogWriter(
+        batch_size=4,
+        flush_interval=60,                  # only size or shutdown can flush
+        spill_path=str(tmp_path / "spill.jsonl"),
+        writer=lambda rows: batches.append(list(rows)),
+    )
+    writer.start()
+    for i in range(10):
+        writer.log(f"spk{i}", 0.9, "VERIFIED")
+    writer.stop()
+
+    assert [len(b) for b in batches][:2] == [4, 4]
+    assert sum(len(b) for b in batches) == 10
+    assert writer.stats()["written"] == 10
+
+
+def test_failed_batches_spill_and_replay(tmp_path):
+    spill = str(tmp_path / "spill.jsonl")
+
+    def down(rows):
+        raise ConnectionError("postgres down")
+
+    writer = AuditLogWriter(batch_size=2, flush_interval=60, spill_path=spill, writer=down)
+    writer.start()
+    for i in range(3):
+        writer.log(f"spk{i}", 0.5, "REJECTED")
+    writer.stop()
+    assert writer.stats()["spilled"] == 3
+    assert os.path.exists(spill)
+
+    replayed = []
+    recovered = AuditLogWriter(batch_size=2, spill_path=spill, writer=replayed.extend)
+    recovered.replay_spilled()
+    assert [row[0] for row in replayed] == ["spk0", "spk1", "spk2"]
+    assert not os.path.exists(spill)
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    writer = AuditLogWriter(max_queue=2, spill_path=str(tmp_path / "spill.jsonl"), writer=lambda rows: None)
+    for i in range(5):
+        writer.log(f"spk{i}", 0.1, "REJECTED")   # writer thread not started
+    assert writer.stats()["dropped"] == 3
+
+
+def spill_rows(spill, count):
+    def down(rows):
+        raise ConnectionError("postgres down")
+
+    writer = AuditLogWriter(batch_size=count, flush_interval=60, spill_path=spill, writer=down)
+    writer.start()
+    for i in range(count):
+        writer.log(f"spk{i}", 0.5, "REJECTED")
+    writer.stop()
+
+
+def test_an_interrupted_replay_keeps_only_the_rows_not_yet_written(tmp_path):
+    spill = str(tmp_path / "spill.jsonl")
+    spill_rows(spill, 5)
+
+    written = []
+
+    def flaky(rows):
+        if written:
+            raise ConnectionError("postgres went away again")
+        written.extend(rows)
+
+    AuditLogWriter(batch_size=2, spill_path=spill, writer=flaky).replay_spilled()
+    assert [row[0] for row in written] == ["spk0", "spk1"]
+
+    rest = []
+    AuditLogWriter(batch_size=2, spill_path=spill, writer=rest.extend).replay_spilled()
+    assert [row[0] for row in rest] == ["spk2", "spk3", "spk4"]
+    assert not os.path.exists(spill)
+
+
+def test_the_writer_replays_spills_once_postgres_is_back(tmp_path):
+    spill = str(tmp_path / "spill.jsonl")
+    writer = AuditLogWriter(batch_size=1, flush_interval=60, spill_path=spill, writer=lambda rows: None)
+    writer.start()
+
+    spill_rows(spill, 2)                       # e.g. another process, while Postgres was down
+    rows = []
+    writer._writer = rows.extend
+    writer.log("live", 0.9, "VERIFIED")
+    writer.stop()
+
+    assert [row[0] for row in rows] == ["live", "spk0", "spk1"]
+    assert writer.stats()["replayed"] == 2
+    assert not os.path.exists(spill)
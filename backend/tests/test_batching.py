@@ -0,0 +1,65 @@
+import sys
+import os
+import threading
+import numpy as np
+
+# Adjust path to find backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.batching import EmbeddingBatcher
+
+
+class FakeModel:
+    """Stands in for ECAPAModel: embedding is [len(clip), first sample]."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def extract_embeddings(self, audios):
+        self.batch_sizes.append(len(audios))
+        return [[float(len(a)), float(a[0])] for a in audios]
+
+
+def test_concurrent_clips_share_a_batch():
+    model = FakeModel()
+    batcher = EmbeddingBatcher(model, max_batch_size=4, max_wait_ms=200)
+
+    clips = [np.full(100 + i, float(i)) for i in range(4)]
+    results = [None] * len(clips)
+    barrier = threading.Barrier(len(clips))
+
+    def worker(i):
+        barrier.wait()
+        results[i] = batcher.submit(clips[i]).result(timeout=5)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(clips))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.stop()
+
+    # Every caller gets its own embedding back
+    assert results == [[100.0 + i, float(i)] for i in range(4)]
+    assert sum(model.batch_sizes) == 4
+    assert max(model.batch_sizes) > 1
+
+    stats = batcher.stats()
+    assert stats["queue_wait_seconds"]["count"] == 4
+    assert stats["batch_size"]["count"] == len(model.batch_sizes)
+
+
+def test_model_error_propagates_to_every_caller():
+    class BrokenModel:
+        def extract_embeddings(self, audios):
+            raise RuntimeError("boom")
+
+    batcher = EmbeddingBatcher(BrokenModel(), max_batch_size=2, max_wait_ms=1)
+    future = batcher.submit(np.ones(10))
+    try:
+        future.result(timeout=5)
+        assert False, "expected the model error to propagate"
+    except RuntimeError as e:
+        assert str(e) == "boom"
+    finally:
+        batcher.stop()
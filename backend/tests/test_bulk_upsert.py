@@ -0,0 +1,42 @@
+import sys
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Adjust path to find backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database.postgres_client as pg
+
+
+@pytest.fixture
+def db(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    pg.Base.metadata.create_all(engine)
+    monkeypatch.setattr(pg, "engine", engine)
+    monkeypatch.setattr(pg, "SessionLocal", sessionmaker(bind=engine))
+    return pg
+
+
+def _user(uid, email, name="Ann"):
+    return {"id": uid, "full_name": name, "email": email, "role": "staff"}
+
+
+def test_email_conflicts_skip_the_user_not_the_batch(db):
+    assert db.bulk_upsert_users([_user("aaa0000001", "ann@example.com")]) == {}
+
+    skipped = db.bulk_upsert_users([
+        _user("bbb0000001", "ann@example.com"),          # email owned by aaa0000001
+        _user("ccc0000001", "cat@example.com"),
+        _user("ddd0000001", "cat@example.com"),          # email taken earlier in the batch
+        _user("ccc0000001", "cat@example.com", "Cat"),   # same id twice
+        _user("aaa0000001", "ann@example.com", "Anna"),  # an update of the owner is fine
+    ])
+
+    assert sorted(skipped) == [0, 2, 3]
+    assert "aaa0000001" in skipped[0]
+    users = {u.id: u.full_name for u in db.get_all_users()}
+    assert users == {"aaa0000001": "Anna", "ccc0000001": "Ann"}
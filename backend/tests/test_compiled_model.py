@@ -0,0 +1,74 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+import torch
+
+# Adjust path to find backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from speechbrain.lobes.features import Fbank
+from speechbrain.lobes.models.ECAPA_TDNN import ECAPA_TDNN
+from speechbrain.processing.features import InputNormalization
+
+import core.speaker_model as speaker_model
+from config.settings import SAMPLE_RATE
+from core.compiled_model import export_pipeline, load_pipeline
+from core.features import AudioClip
+
+
+class SmallECAPA:
+    """Untrained, narrow ECAPA-TDNN with the published front end."""
+
+    def __init__(self):
+        torch.manual_seed(0)
+        self.mods = torch.nn.ModuleDict({
+            "compute_features": Fbank(n_mels=80),
+            "mean_var_norm": InputNormalization(norm_type="sentence", std_norm=False),
+            "embedding_model": ECAPA_TDNN(80, channels=[32, 32, 32, 32, 96], lin_neurons=192),
+        }).eval()
+
+    def encode_batch(self, wavs, wav_lens=None):
+        if wav_lens is None:
+            wav_lens = torch.ones(wavs.shape[0])
+        feats = self.mods.compute_features(wavs)
+        feats = self.mods.mean_var_norm(feats, wav_lens)
+        return self.mods.embedding_model(feats, wav_lens)
+
+
+def clip(seconds, seed):
+    return AudioClip(np.random.default_rng(seed).normal(0, 0.1, int(SAMPLE_RATE * seconds)).astype(np.float32))
+
+
+@pytest.mark.parametrize("batch_size", [1, 2])
+def test_compiled_pipeline_handles_other_batch_sizes(tmp_path, monkeypatch, batch_size):
+    monkeypatch.setattr(speaker_model, "EMBEDDING_CACHE_ENABLED", False)
+    eager = speaker_model.ECAPAModel(use_compiled=False, quantized=False, sb_model=SmallECAPA())
+
+    path = str(tmp_path / "pipeline.pt")
+    export_pipeline(eager.model, eager.frontend, path)   # traced on a batch of 3
+    assert load_pipeline(path) is not None
+
+    monkeypatch.setattr(speaker_model, "COMPILED_MODEL_PATH", path)
+    compiled = speaker_model.ECAPAModel(use_compiled=True, quantized=False)
+    assert compiled.compiled is not None
+
+    clips = [clip(2.0 + 1.3 * i, seed=i) for i in range(batch_size)]
+    expected = eager._compute_embeddings(clips)
+    actual = compiled._compute_embeddings(clips)
+
+    assert len(actual) == batch_size
+    assert all(len(e) == 192 for e in actual)
+    assert np.allclose(actual, expected, atol=1e-4)
+
+
+def test_mixed_length_batch_matches_each_clip_alone(monkeypatch):
+    monkeypatch.setattr(speaker_model, "EMBEDDING_CACHE_ENABLED", False)
+    model = speaker_model.ECAPAModel(use_compiled=False, quantized=False, sb_model=SmallECAPA())
+
+    clips = [clip(1.5, seed=0), clip(3.0, seed=1), clip(1.5, seed=2)]
+    batched = model.extract_embeddings(clips)
+    alone = [model.extract_embedding(c) for c in clips]
+
+    assert np.allclose(batched, alone, atol=1e-5)
@@ -0,0 +1,139 @@
+import sys
+import os
+import numpy as np
+
+# Adjust path to find backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.embedding_cache import EmbeddingCache, KEY_BYTES
+
+DIM = 8
+
+
+def _vec(seed):
+    v = np.random.default_rng(seed).normal(size=DIM).astype(np.float32)
+    return v / np.linalg.norm(v)
+
+
+def test_memory_tier_is_a_bounded_lru():
+    cache = EmbeddingCache("model", dim=DIM, max_entries=2)
+    samples = [np.full(100, i, dtype=np.float32) for i in range(3)]
+    keys = [cache.key(s) for s in samples]
+
+    cache.put(keys[0], _vec(0))
+    cache.put(keys[1], _vec(1))
+    assert cache.get(keys[0]) is not None       # 0 is now most recent
+    cache.put(keys[2], _vec(2))                 # evicts 1
+
+    assert cache.get(keys[1]) is None
+    np.testing.assert_array_equal(cache.get(keys[2]), _vec(2))
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["memory_entries"]) == (2, 1, 2)
+    assert stats["memory_bytes"] == 2 * DIM * 4
+
+
+def test_key_depends_on_samples_and_model():
+    samples = np.linspace(-1, 1, 1600, dtype=np.float32)
+    a = EmbeddingCache("model", dim=DIM)
+    b = EmbeddingCache("model:compiled:0123456789abcdef", dim=DIM)
+
+    assert len(a.key(samples)) == KEY_BYTES
+    assert a.key(samples) == a.key(samples.astype(np.float64))
+    assert a.key(samples) != a.key(samples[:-1])
+    assert a.key(samples) != b.key(samples)
+
+
+def test_disk_tier_survives_reopen_and_drops_torn_keys(tmp_path):
+    cache = EmbeddingCache("model", dim=DIM, max_entries=1, cache_dir=str(tmp_path), shard_rows=4)
+    keys = [cache.key(np.full(10, i, dtype=np.float32)) for i in range(3)]
+    for i, k in enumerate(keys):
+        cache.put(k, _vec(i))
+
+    # A crash mid-write leaves part of a key behind
+    keys_file = tmp_path / cache._model_tag / "shard_000000.keys"
+    with open(keys_file, "ab") as f:
+        f.write(b"\x01\x02\x03")
+
+    # Opening leaves it alone; the next write overwrites it
+    reopened = EmbeddingCache("model", dim=DIM, max_entries=1, cache_dir=str(tmp_path), shard_rows=4)
+    for i, k in enumerate(keys):
+        np.testing.assert_array_equal(reopened.get(k), _vec(i))
+    assert reopened.stats()["disk_hits"] == 3
+    assert os.path.getsize(keys_file) == 3 * KEY_BYTES + 3
+
+    extra = reopened.key(np.full(10, 9, dtype=np.float32))
+    reopened.put(extra, _vec(9))
+    assert os.path.getsize(keys_file) == 4 * KEY_BYTES
+    again = EmbeddingCache("model", dim=DIM, max_entries=1, cache_dir=str(tmp_path), shard_rows=4)
+    np.testing.assert_array_equal(again.get(extra), _vec(9))
+
+
+def test_processes_sharing_a_directory_never_claim_the_same_row(tmp_path):
+    # Separate instances on one directory behave like separate processes
+    a = EmbeddingCache("m", dim=DIM, max_entries=1, cache_dir=str(tmp_path), shard_rows=3)
+    b = EmbeddingCache("m", dim=DIM, max_entries=1, cache_dir=str(tmp_path), shard_rows=3)
+    keys = [a.key(np.full(10, i, dtype=np.float32)) for i in range(7)]
+    for i, k in enumerate(keys):
+        (a if i % 2 else b).put(k, _vec(i))
+
+    # Each sees the other's writes, and a reopen finds every vector under its own key
+    np.testing.assert_array_equal(a.get(keys[0]), _vec(0))
+    np.testing.assert_array_equal(b.get(keys[1]), _vec(1))
+    reopened = EmbeddingCache("m", dim=DIM, max_entries=1, cache_dir=str(tmp_path), shard_rows=3)
+    for i, k in enumerate(keys):
+        np.testing.assert_array_equal(reopened.get(k), _vec(i))
+    assert reopened.stats()["disk_entries"] == 7
+
+
+def test_disk_tier_evicts_oldest_shards_past_its_size_limit(tmp_path):
+    shard_rows = 2
+    shard_bytes = shard_rows * DIM * 4
+    cache = EmbeddingCache("model", dim=DIM, max_entries=1, cache_dir=str(tmp_path),
+                           disk_max_bytes=2 * shard_bytes, shard_rows=shard_rows)
+    keys = [cache.key(np.full(10, i, dtype=np.float32)) for i in range(7)]
+    for i, k in enumerate(keys):
+        cache.put(k, _vec(i))
+
+    # 7 rows need 4 shards; only the newest 2 fit, so rows 0-3 are gone
+    model_dir = tmp_path / cache._model_tag
+    assert sorted(os.listdir(model_dir)) == [
+        "shard_000002.f32", "shard_000002.keys", "shard_000003.f32", "shard_000003.keys",
+    ]
+    stats = cache.stats()
+    assert stats["disk_entries"] == 3 and stats["disk_bytes"] == 2 * shard_bytes
+
+    assert all(cache.get(k) is None for k in keys[:4])
+    for i in range(4, 6):
+        np.testing.assert_array_equal(cache.get(keys[i]), _vec(i))
+
+
+def test_a_model_change_discards_other_models_shards(tmp_path):
+    old = EmbeddingCache("model", dim=DIM, cache_dir=str(tmp_path))
+    key = old.key(np.zeros(10, dtype=np.float32))
+    old.put(key, _vec(0))
+    (tmp_path / "unrelated").mkdir()
+
+    new = EmbeddingCache("model:int8", dim=DIM, cache_dir=str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == sorted([new._model_tag, "unrelated", "cache.lock"])
+    assert new.get(new.key(np.zeros(10, dtype=np.float32))) is None
+
+
+def test_compiled_pipeline_gets_its_own_cache_namespace(tmp_path, monkeypatch):
+    import core.speaker_model as speaker_model
+
+    artifact = tmp_path / "pipeline.pt"
+    artifact.write_bytes(b"export 1")
+    monkeypatch.setattr(speaker_model, "COMPILED_MODEL_PATH", str(artifact))
+
+    model = speaker_model.ECAPAModel.__new__(speaker_model.ECAPAModel)
+    model.compiled, model.quantized = None, False
+    eager = model.cache_id()
+    model.quantized = True
+    int8 = model.cache_id()
+    model.compiled, model.quantized = object(), False
+    compiled = model.cache_id()
+    artifact.write_bytes(b"export 2")
+    recompiled = model.cache_id()
+
+    assert len({eager, int8, compiled, recompiled}) == 4
+    assert compiled.startswith(speaker_model.ECAPA_MODEL + ":compiled:")
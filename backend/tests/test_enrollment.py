@@ -0,0 +1,147 @@
+import sys
+import os
+
+import pytest
+
+# Adjust path to find backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database.enrollment as enrollment
+from database.enrollment import EnrollmentCommitError, commit_enrollment
+
+
+@pytest.fixture
+def stores(monkeypatch):
+    """
+    In-memory users / vectors behind the functions commit_enrollment calls.
+    fail names a step to raise in ("create", "insert", "activate", "delete_vector").
+    """
+    state = {"users": {}, "vectors": {}, "fail": set()}
+
+    def step(name):
+        if name in state["fail"]:
+            raise RuntimeError(f"{name} down")
+
+    def create_pending_user(full_name, email, role, user_id, hashed_password=None):
+        step("create")
+        state["users"][user_id] = "pending"
+
+    def set_voice_profile_status(user_id, status):
+        step("activate")
+        state["users"][user_id] = status
+
+    def insert_embedding(speaker_id, embedding, partition_key=None):
+        # Lands, then errors: the rollback still has to remove it
+        state["vectors"][speaker_id] = embedding
+        step("insert")
+
+    def delete_embedding(speaker_id):
+        step("delete_vector")
+        state["vectors"].pop(speaker_id, None)
+
+    monkeypatch.setattr(enrollment, "create_pending_user", create_pending_user)
+    monkeypatch.setattr(enrollment, "set_voice_profile_status", set_voice_profile_status)
+    monkeypatch.setattr(enrollment, "delete_user", lambda user_id: state["users"].pop(user_id, None) is not None)
+    monkeypatch.setattr(enrollment, "insert_embedding", insert_embedding)
+    monkeypatch.setattr(enrollment, "delete_embedding", delete_embedding)
+    monkeypatch.setattr(enrollment, "get_pending_user_ids",
+                        lambda cutoff: [u for u, status in state["users"].items() if status == "pending"])
+    return state
+
+
+def test_commit_lands_both(stores):
+    commit_enrollment("abc1234567", "Ann", "ann@example.com", "staff", [0.1] * 192)
+    assert stores["users"] == {"abc1234567": "active"}
+    assert "abc1234567" in stores["vectors"]
+
+
+@pytest.mark.parametrize("failing, stage", [("create", "prepare"), ("insert", "vector"), ("activate", "commit")])
+def test_failure_rolls_back_everything(stores, failing, stage):
+    stores["fail"].add(failing)
+    with pytest.raises(EnrollmentCommitError) as info:
+        commit_enrollment("abc1234567", "Ann", "ann@example.com", "staff", [0.1] * 192)
+
+    assert info.value.stage == stage
+    assert info.value.orphans == []
+    assert stores["users"] == {} and stores["vectors"] == {}
+
+
+def test_failed_compensation_leaves_pending_row_for_recovery(stores):
+    stores["fail"].update({"activate", "delete_vector"})
+    with pytest.raises(EnrollmentCommitError) as info:
+        commit_enrollment("abc1234567", "Ann", "ann@example.com", "staff", [0.1] * 192)
+
+    # The user row is kept as the marker, not deleted under an orphan vector
+    assert info.value.orphans == ["vector", "user"]
+    assert stores["users"] == {"abc1234567": "pending"}
+
+    stores["fail"].clear()
+    assert enrollment.recover_pending_enrollments(timeout_seconds=0) == 1
+    assert stores["users"] == {} and stores["vectors"] == {}
+
+
+def test_searches_only_return_active_profiles(stores, monkeypatch):
+    from database.common import SearchHit
+
+    stores["users"].update({"act0000001": "active", "pen0000001": "pending", "act0000002": "active"})
+    queried = []
+
+    def get_active_user_roles(ids):
+        queried.append(sorted(ids))
+        return {u: "staff" for u in ids if stores["users"].get(u) == "active"}
+
+    monkeypatch.setattr(enrollment, "get_active_user_roles", get_active_user_roles)
+    monkeypatch.setattr(enrollment, "active_profiles", enrollment.ActiveProfileCache(ttl=60))
+
+    hits = [SearchHit("pen0000001", 0.95), SearchHit("act0000001", 0.9), SearchHit("gone000001", 0.85),
+            SearchHit("act0000002", 0.8)]
+    assert [h.id for h in enrollment.active_hits(hits)] == ["act0000001", "act0000002"]
+    assert enrollment.active_hits([]) == []
+
+    # Active profiles are cached; the pending one is checked again and shows up once committed
+    stores["users"]["pen0000001"] = "active"
+    assert [h.id for h in enrollment.active_hits(hits)] == ["pen0000001", "act0000001", "act0000002"]
+    assert queried[-1] == ["gone000001", "pen0000001"]
+    assert enrollment.active_role("act0000001") == "staff"
+    assert len(queried) == 2
+
+
+def test_cached_profiles_expire(stores, monkeypatch):
+    import time
+
+    monkeypatch.setattr(enrollment, "get_active_user_roles", lambda ids: {u: "staff" for u in ids if u in stores["users"]})
+    monkeypatch.setattr(enrollment, "active_profiles", enrollment.ActiveProfileCache(ttl=0.05))
+
+    stores["users"]["act0000001"] = "active"
+    assert enrollment.active_role("act0000001") == "staff"
+
+    del stores["users"]["act0000001"]                # removed by another process
+    assert enrollment.active_role("act0000001") == "staff"
+    time.sleep(0.06)
+    assert enrollment.active_role("act0000001") is None
+
+
+def test_reaper_recovers_periodically_and_survives_outages(stores, monkeypatch):
+    import time
+
+    stores["users"]["abc1234567"] = "pending"
+    stores["vectors"]["abc1234567"] = [0.1] * 192
+    reaper = enrollment.PendingEnrollmentReaper(interval=0.01, timeout_seconds=0)
+
+    def postgres_down(cutoff):
+        raise RuntimeError("pg down")
+
+    list_pending = enrollment.get_pending_user_ids
+    monkeypatch.setattr(enrollment, "get_pending_user_ids", postgres_down)
+    assert reaper.run_once() == 0                        # logged, not raised
+    monkeypatch.setattr(enrollment, "get_pending_user_ids", list_pending)
+
+    reaper.start()
+    try:
+        deadline = time.monotonic() + 2
+        while reaper.passes < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        reaper.stop()
+    assert reaper.passes >= 2 and reaper.recovered == 1
+    assert stores["users"] == {} and stores["vectors"] == {}
@@ -0,0 +1,57 @@
+import sys
+import os
+import numpy as np
+
+# Adjust path to find backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.evaluation import ScoreAccumulator, calculate_eer, calculate_metrics
+
+
+def _trials(n, seed):
+    rng = np.random.default_rng(seed)
+    labels = rng.random(n) < 0.1
+    scores = np.where(labels, rng.normal(0.7, 0.1, n), rng.normal(0.2, 0.15, n))
+    return np.clip(scores, -1, 1), labels.astype(int)
+
+
+def test_streamed_and_merged_match_exact_eer():
+    scores, labels = _trials(20000, 0)
+    eer, threshold = calculate_eer(scores, labels)
+
+    # Two "processes" each see half the trials, in batches
+    parts = [ScoreAccumulator(), ScoreAccumulator()]
+    for i, start in enumerate(range(0, len(scores), 1000)):
+        parts[i % 2].add(scores[start:start + 1000], labels[start:start + 1000])
+    acc = parts[0] + parts[1]
+
+    acc_eer, acc_threshold = acc.eer()
+    assert abs(acc_eer - eer) < 1e-3
+    assert abs(acc_threshold - threshold) < 1e-3
+
+    exact = calculate_metrics(scores, labels, threshold=0.5)
+    approx = acc.metrics(threshold=0.5)
+    assert abs(exact["far"] - approx["far"]) < 1e-3
+    assert abs(exact["frr"] - approx["frr"]) < 1e-3
+
+
+def test_min_dcf_and_det_curve(tmp_path):
+    scores, labels = _trials(5000, 1)
+    acc = ScoreAccumulator()
+    acc.add(scores, labels)
+
+    # Brute force over every observed score as a threshold
+    p_target = 0.05
+    best = min(
+        (0.05 * np.mean(scores[labels == 1] < t) + 0.95 * np.mean(scores[labels == 0] >= t)) / 0.05
+        for t in np.unique(scores)
+    )
+    min_dcf, _ = acc.min_dcf(p_target=p_target)
+    assert abs(min_dcf - best) < 0.02
+
+    fars, frrs, thresholds = acc.det_curve()
+    assert np.all(np.diff(thresholds) > 0)
+    assert np.all(np.diff(fars) <= 0) and np.all(np.diff(frrs) >= 0)
+
+    acc.save(tmp_path / "acc.npz")
+    assert ScoreAccumulator.load(tmp_path / "acc.npz").eer() == acc.eer()
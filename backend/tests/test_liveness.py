@@ -1,4 +1,3 @@
-
 import sys
 import os
 import numpy as np
@@ -7,38 +6,44 @@ import numpy as np
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from core.anti_spoofing import liveness_detector
-# We use librosa directly here to match preprocessing.py behavior if we can import it, 
-# else we mock it or use wavfile.
-import librosa
+from config.settings import SAMPLE_RATE
+
+
+def _voiced(seconds=2.0, f0=140.0, seed=0):
+    """
+    Deterministic speech-like signal: harmonics up to 4 kHz with syllable-rate
+    amplitude modulation and a little broadband noise.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    source = sum(np.sin(2 * np.pi * k * f0 * t) / np.sqrt(k) for k in range(1, int(4000 // f0)))
+    envelope = 0.5 - 0.5 * np.cos(2 * np.pi * 4.0 * t)
+    signal = source * envelope + 0.01 * rng.normal(size=len(t))
+    return (0.3 * signal / np.max(np.abs(signal))).astype(np.float32)
+
 
 def test_liveness():
-    sample_path = "n:/PGM/Bio.VAN/voice_auth_project/audio_samples/speaker1.wav"
-    
-    if not os.path.exists(sample_path):
-        print(f"Sample not found: {sample_path}")
-        # Try to find any wav
-        return
-
-    print(f"Testing liveness on: {sample_path}")
-    audio, sr = librosa.load(sample_path, sr=16000, mono=True)
-    
-    result = liveness_detector.analyze(audio, sr)
-    print("Result:", result)
-    
-    # Test silence
-    print("\nTesting Silence:")
-    silence = np.zeros(16000)
-    res_silence = liveness_detector.analyze(silence)
-    print("Silence Result:", res_silence)
-
-    # Test White Noise (should be high variance)
-    print("\nTesting White Noise:")
-    noise = np.random.normal(0, 0.1, 16000)
-    res_noise = liveness_detector.analyze(noise)
-    print("Noise Result:", res_noise)
-
-if __name__ == "__main__":
-    try:
-        test_liveness()
-    except Exception as e:
-        print(f"Error: {e}")
+    result = liveness_detector.analyze(_voiced())
+    assert result["is_live"], result
+
+    # Silence
+    res_silence = liveness_detector.analyze(np.zeros(SAMPLE_RATE))
+    assert not res_silence["is_live"]
+    assert res_silence["reason"] == "Audio too silent"
+
+    # Empty input
+    assert liveness_detector.analyze(np.zeros(0))["reason"] == "Empty audio"
+
+    # White noise has plenty of energy and high-frequency content
+    noise = np.random.default_rng(1).normal(0, 0.1, SAMPLE_RATE)
+    assert liveness_detector.analyze(noise)["is_live"]
+
+
+def test_muffled_audio_is_flagged():
+    # A low fundamental with no harmonics: almost nothing above 3 kHz
+    t = np.arange(2 * SAMPLE_RATE) / SAMPLE_RATE
+    muffled = (0.3 * np.sin(2 * np.pi * 120 * t)).astype(np.float32)
+
+    result = liveness_detector.analyze(muffled)
+    assert not result["is_live"]
+    assert result["reason"] == "Muffled Audio (possible replay)"
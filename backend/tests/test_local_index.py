@@ -0,0 +1,143 @@
+import sys
+import os
+import json
+import numpy as np
+
+# Adjust path to find backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.local_index import LocalVectorIndex
+
+
+def _random_embeddings(n, dim=192, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def test_search_matches_brute_force_cosine(tmp_path):
+    embs = _random_embeddings(50)
+    index = LocalVectorIndex(str(tmp_path), initial_capacity=8)  # forces growth
+    index.upsert_many([f"spk{i}" for i in range(50)], embs)
+
+    query = embs[7] + 0.1 * _random_embeddings(1, seed=1)[0]
+    normed = embs / np.linalg.norm(embs, axis=1, keepdims=True)
+    expected = normed @ (query / np.linalg.norm(query))
+
+    hits = index.search(query, top_k=5)
+    assert [h.id for h in hits] == [f"spk{i}" for i in np.argsort(-expected)[:5]]
+    assert hits[0].id == "spk7"
+    assert np.isclose(index.score("spk7", query), expected[7], atol=1e-5)
+
+
+def test_upsert_delete_and_reopen(tmp_path):
+    embs = _random_embeddings(3)
+    index = LocalVectorIndex(str(tmp_path))
+    for i, e in enumerate(embs):
+        index.upsert(f"spk{i}", e)
+
+    index.upsert("spk1", embs[2])       # replace
+    assert index.delete("spk0")          # tombstone record
+    assert not index.delete("missing")
+    assert len(index) == 2
+
+    reopened = LocalVectorIndex(str(tmp_path))
+    assert "spk0" not in reopened
+    assert np.isclose(reopened.score("spk1", embs[2]), 1.0, atol=1e-5)
+    assert np.isclose(reopened.score("spk2", embs[2]), 1.0, atol=1e-5)
+    assert reopened.score("spk0", embs[0]) is None
+
+
+def test_torn_log_record_is_ignored_and_overwritten(tmp_path):
+    embs = _random_embeddings(3)
+    index = LocalVectorIndex(str(tmp_path))
+    index.upsert_many(["spk0", "spk1"], embs[:2])
+
+    # A crash in the middle of appending a record
+    with open(index._file("log"), "ab") as f:
+        f.write(b"+spk")
+
+    reopened = LocalVectorIndex(str(tmp_path))
+    assert len(reopened) == 2 and "spk" not in reopened
+    reopened.upsert("spk2", embs[2])
+    assert [h.id for h in LocalVectorIndex(str(tmp_path)).search(embs[2], top_k=3)][0] == "spk2"
+    assert len(LocalVectorIndex(str(tmp_path))) == 3
+
+
+def test_deletes_and_replacements_compact_into_a_new_generation(tmp_path):
+    embs = _random_embeddings(20, seed=4)
+    ids = [f"spk{i}" for i in range(20)]
+    index = LocalVectorIndex(str(tmp_path), initial_capacity=8, compact_ratio=0.25, compact_min_rows=10)
+    index.upsert_many(ids, embs)
+    index.upsert("spk3", embs[4])                       # replace: spk3's old row is dead
+    for sid in ids[10:15]:
+        index.delete(sid)
+
+    assert index._generation == 1
+    assert index.memory_stats()["dead_rows"] == 0
+    # Other processes may still map generation 0; the next handle to open the index removes it
+    assert "embeddings_000000.f32" in os.listdir(tmp_path)
+
+    reopened = LocalVectorIndex(str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["embeddings_000001.f32", "embeddings_000001.log", "index.json", "index.lock"]
+    assert len(reopened) == 15 and "spk12" not in reopened
+    assert np.isclose(reopened.score("spk3", embs[4]), 1.0, atol=1e-5)
+    assert reopened.search(embs[17])[0].id == "spk17"
+
+
+def test_processes_sharing_a_path_see_each_others_writes(tmp_path):
+    # Two handles on one path stand in for two API workers
+    embs = _random_embeddings(40, seed=5)
+    ids = [f"spk{i}" for i in range(40)]
+    a = LocalVectorIndex(str(tmp_path), initial_capacity=8, storage="int8", compact_min_rows=16)
+    b = LocalVectorIndex(str(tmp_path), initial_capacity=8, storage="int8", compact_min_rows=16)
+
+    a.upsert_many(ids[:10], embs[:10])
+    b.upsert_many(ids[10:30], embs[10:30])          # b must append after a's rows, growing the file
+    a.upsert("spk5", embs[31])
+    assert len(a) == len(b) == 30
+    assert np.isclose(b.score("spk5", embs[31]), 1.0, atol=1e-5)
+    assert a.search(embs[20])[0].id == "spk20"
+    assert b.search(embs[3])[0].id == "spk3"
+
+    for sid in ids[:12]:                            # a compacts; b follows to the new generation
+        a.delete(sid)
+    assert a._generation == 1
+    assert b.search(embs[25])[0].id == "spk25" and b._generation == 1
+    assert "spk3" not in b and len(b) == 18
+
+
+def test_index_from_before_the_log_is_upgraded(tmp_path):
+    embs = _random_embeddings(2)
+    normed = embs / np.linalg.norm(embs, axis=1, keepdims=True)
+    normed.tofile(tmp_path / "embeddings.f32")
+    with open(tmp_path / "index.json", "w") as f:
+        json.dump({"dim": 192, "ids": ["spk0", "spk1"]}, f)
+
+    index = LocalVectorIndex(str(tmp_path))
+    assert np.isclose(index.score("spk1", embs[1]), 1.0, atol=1e-5)
+    assert not os.path.exists(tmp_path / "embeddings.f32")
+
+
+def test_compressed_storage_reranks_to_float32_results(tmp_path):
+    embs = _random_embeddings(1200, seed=2)      # enough rows to train PQ
+    ids = [f"spk{i}" for i in range(len(embs))]
+    queries = embs[:40] + 0.3 * _random_embeddings(40, seed=3)
+
+    exact = LocalVectorIndex(str(tmp_path / "float32"))
+    exact.upsert_many(ids, embs)
+    expected = exact.search_many(list(queries), top_k=3)
+
+    for storage in ("float16", "int8", "pq"):
+        index = LocalVectorIndex(str(tmp_path / storage), storage=storage, rerank_k=20)
+        index.upsert_many(ids, embs)
+        for got, want in zip(index.search_many(list(queries), top_k=3), expected):
+            assert [h.id for h in got] == [h.id for h in want]
+            assert np.allclose([h.distance for h in got], [h.distance for h in want], atol=1e-5)
+
+        # Reopening rebuilds the compact codes from the float32 file (and the saved PQ codebook)
+        reopened = LocalVectorIndex(str(tmp_path / storage), storage=storage)
+        assert reopened.search(queries[0])[0].id == expected[0][0].id
+
+        # Tombstoned rows never come back as candidates
+        reopened.delete(expected[0][0].id)
+        assert expected[0][0].id not in [h.id for h in reopened.search(queries[0], top_k=3)]
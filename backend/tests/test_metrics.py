@@ -0,0 +1,30 @@
+import sys
+import os
+
+# Adjust path to find backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.metrics import LabeledHistogram, Counter, REGISTRY, render_prometheus, stage_timer
+
+
+def test_prometheus_text_format():
+    hist = LabeledHistogram("test_stage_seconds", "stage", buckets=(0.1, 1.0), help="Test stages")
+    errors = Counter("test_errors_total", labels=("backend",))
+    try:
+        hist.observe("decode", 0.05)
+        hist.observe("decode", 0.5)
+        errors.inc(backend="postgres")
+        timings = {}
+        with stage_timer("embed", timings):
+            pass
+
+        text = render_prometheus()
+        assert "# TYPE test_stage_seconds histogram" in text
+        assert 'test_stage_seconds_bucket{stage="decode",le="0.1"} 1' in text
+        assert 'test_stage_seconds_bucket{stage="decode",le="+Inf"} 2' in text
+        assert 'test_stage_seconds_count{stage="decode"} 2' in text
+        assert 'test_errors_total{backend="postgres"} 1' in text
+        assert set(timings) == {"embed"}
+    finally:
+        REGISTRY.remove(hist)
+        REGISTRY.remove(errors)
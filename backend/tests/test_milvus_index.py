@@ -0,0 +1,163 @@
+import sys
+import os
+import json
+import numpy as np
+import pytest
+
+# Adjust path to find backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.milvus_index import (
+    MilvusIndexManager,
+    choose_index,
+    choose_nlist,
+    exact_top_k,
+    recall_at_k,
+)
+
+
+def test_index_choice_follows_collection_size():
+    assert choose_index(300)["index_type"] == "FLAT"
+    assert choose_index(500_000, target_recall=0.99)["index_type"] == "HNSW"
+    assert choose_index(500_000, target_recall=0.9)["index_type"] == "IVF_FLAT"
+    assert choose_index(50_000_000, target_recall=0.9)["index_type"] == "IVF_SQ8"
+
+    # Power of two near 4·sqrt(N), only moving when N grows ~4x
+    assert choose_nlist(1_000_000) == 4096
+    assert choose_nlist(1_200_000) == 4096
+    assert choose_nlist(4_000_000) == 8192
+
+
+def test_exact_top_k_and_recall():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, 16)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    exact = exact_top_k(vectors, vectors[:5], top_k=3)
+    assert exact[:, 0].tolist() == [0, 1, 2, 3, 4]
+    assert recall_at_k(exact.tolist(), exact.tolist()) == 1.0
+    assert recall_at_k([[row[0], -1, -2] for row in exact], exact.tolist()) == 1 / 3
+
+
+class _FakeCollection:
+    name = "fake"
+
+    def __init__(self, rows, index=None):
+        self.num_entities = rows
+        self._index = index
+        self.created = []
+
+    def has_index(self):
+        return self._index is not None
+
+    def index(self):
+        return type("Index", (), {"params": self._index})()
+
+    def create_index(self, field_name, index_params):
+        self._index = index_params
+        self.created.append(index_params["index_type"])
+
+    def drop_index(self):
+        self._index = None
+
+    def release(self):
+        pass
+
+    def load(self):
+        pass
+
+
+def test_manager_uses_calibration_and_rebuilds_on_growth(tmp_path, monkeypatch):
+    import database.milvus_index as milvus_index
+    monkeypatch.setattr(milvus_index.utility, "wait_for_index_building_complete", lambda name: None)
+
+    ivf = {"index_type": "IVF_FLAT", "metric_type": "COSINE", "params": {"nlist": 1024}}
+    calibration = tmp_path / "calibration.json"
+    calibration.write_text(json.dumps({"configs": [{"index": ivf, "sweep": [
+        {"search": {"nprobe": 8}, "recall": 0.90},
+        {"search": {"nprobe": 32}, "recall": 0.97},
+        {"search": {"nprobe": 64}, "recall": 0.99},
+    ]}]}))
+
+    # An old fixed IVF index on a small collection, reported the way Milvus flattens it
+    collection = _FakeCollection(300, {"index_type": "IVF_FLAT", "metric_type": "COSINE", "nlist": "1024"})
+    manager = MilvusIndexManager(target_recall=0.95, calibration_path=str(calibration), check_every=10,
+                                 lock_path=str(tmp_path / "rebuild.lock"))
+    manager.attach(collection)
+    assert manager.search_params()["params"] == {"nprobe": 32}
+
+    # 300 rows should be exact search
+    assert manager.check(wait=True)
+    assert collection.created == ["FLAT"]
+    assert manager.search_params()["params"] == {}
+
+    # Crossing the FLAT limit is noticed after check_every writes
+    collection.num_entities = 200_000
+    manager.note_writes(10)
+    manager._rebuild_thread.join()
+    assert collection.created == ["FLAT", "IVF_FLAT"]
+    assert manager.stats()["rebuilds"] == 2
+
+
+def test_other_processes_wait_for_a_rebuild_and_follow_it(tmp_path, monkeypatch):
+    import threading
+    import time
+    import database.milvus_index as milvus_index
+
+    monkeypatch.setattr(milvus_index.utility, "wait_for_index_building_complete", lambda name: None)
+    lock_path = str(tmp_path / "rebuild.lock")
+    flat = {"index_type": "FLAT", "metric_type": "COSINE", "params": {}}
+    ivf = {"index_type": "IVF_FLAT", "metric_type": "COSINE", "params": {"nlist": 2048}}
+    collection = _FakeCollection(200_000, dict(flat))
+
+    # Two API processes on one collection (separate lock handles conflict like separate processes)
+    reloads = []
+    holding = threading.Event()
+
+    def slow_reload_in_a():
+        reloads.append("a")
+        holding.set()
+        time.sleep(0.3)
+
+    a = MilvusIndexManager(target_recall=0.95, calibration_path=str(tmp_path / "none.json"), lock_path=lock_path)
+    b = MilvusIndexManager(target_recall=0.95, calibration_path=str(tmp_path / "none.json"), lock_path=lock_path)
+    a.attach(collection, reload=slow_reload_in_a)
+    b.attach(collection, reload=lambda: reloads.append("b"))
+    assert b.search_params()["params"] == {}
+
+    # Without a rebuild anywhere, searches only stat the lock file
+    def no_probe():
+        raise AssertionError("probed the lock with no rebuild in sight")
+    b._rebuilding_elsewhere = no_probe
+    b.wait_available()
+    del b._rebuilding_elsewhere
+
+    # While a's rebuild holds the lock, b's searches wait; afterwards b reloads and adopts IVF
+    a.schedule_rebuild(ivf)
+    holding.wait()
+    b.wait_available()
+    assert reloads == ["a", "b"]
+    assert b.stats()["index"]["index_type"] == "IVF_FLAT" and "nprobe" in b.search_params()["params"]
+
+    # a's own searches never mistake its rebuild for another process's
+    a._rebuild_thread.join()
+    a.wait_available()
+    b.wait_available()
+    assert reloads == ["a", "b"]
+
+    # A rebuild b queued before noticing finds the swap already made and skips it
+    collection.created.clear()
+    b.schedule_rebuild(dict(ivf), wait=True)
+    assert collection.created == [] and b.stats()["rebuilds"] == 0
+
+
+def test_float16_storage_is_refused_on_servers_without_float16_vectors(monkeypatch):
+    import database.milvus_client as milvus
+
+    monkeypatch.setattr(milvus, "_VECTOR_DTYPE", milvus.DataType.FLOAT16_VECTOR)
+    monkeypatch.setattr(milvus.utility, "get_server_version", lambda: "v2.3.3")
+    with pytest.raises(ValueError, match="2.4"):
+        milvus._check_server_version()
+
+    monkeypatch.setattr(milvus.utility, "get_server_version", lambda: "v2.4.15")
+    milvus._check_server_version()
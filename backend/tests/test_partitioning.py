@@ -0,0 +1,179 @@
+import sys
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+# Adjust path to find backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.common import SearchHit
+from database.partitioning import (
+    PartitionLoader,
+    PartitionSearcher,
+    merge_top_k,
+    partition_name,
+    scope_partitions,
+)
+
+
+def test_routing():
+    assert partition_name("spk1", "Admin", scheme="role") == "role_admin"
+    assert partition_name("spk1", "field agent", scheme="role") == "role_field_agent"
+    assert partition_name("spk1", None, scheme="role") is None
+    assert partition_name("spk1", scheme="hash", count=16) == partition_name("spk1", "ignored", scheme="hash", count=16)
+    assert partition_name("spk1", scheme="none") is None
+
+    assert scope_partitions(["admin", "Admin", "user"], scheme="role") == ["role_admin", "role_user"]
+    assert scope_partitions(None, scheme="hash") is None
+    with pytest.raises(ValueError):
+        scope_partitions(["admin"], scheme="hash")
+
+
+def test_merge_top_k_across_partitions():
+    a = [[SearchHit("a1", 0.9), SearchHit("a2", 0.5)], [SearchHit("a3", 0.2)]]
+    b = [[SearchHit("b1", 0.7)], [SearchHit("b2", 0.8), SearchHit("b3", 0.1)]]
+    merged = merge_top_k([a, b], top_k=2)
+    assert [[h.id for h in hits] for hits in merged] == [["a1", "b1"], ["b2", "a3"]]
+
+
+def test_loader_releases_least_recently_used_idle_partitions():
+    loaded, released = [], []
+    loader = PartitionLoader(loaded.extend, released.extend, max_loaded=2)
+
+    loader.acquire(["p1"]); loader.release(["p1"])
+    loader.acquire(["p2"]); loader.release(["p2"])
+    loader.acquire(["p1"]); loader.release(["p1"])   # p1 is now the most recent
+    loader.acquire(["p3"])                            # evicts p2, keeps p3 pinned
+    assert loaded == ["p1", "p2", "p3"]
+    assert released == ["p2"]
+
+    # Pinned partitions survive even when over the limit
+    loader.acquire(["p4"])
+    assert "p3" in loader.loaded() and "p4" in loader.loaded()
+    loader.release(["p3", "p4"])
+    assert len(loader.loaded()) == 2
+
+
+def test_fan_out_searches_partitions_in_parallel():
+    loader = PartitionLoader(lambda names: None, lambda names: None, max_loaded=0)
+    searcher = PartitionSearcher(loader, workers=4)
+    barrier = threading.Barrier(3, timeout=5)
+
+    def search(partition):
+        barrier.wait()    # only passes if all three partitions are searched concurrently
+        return [[SearchHit(f"{partition}-best", {"p1": 0.3, "p2": 0.9, "p3": 0.6}[partition])]]
+
+    results = searcher.search(search, ["p1", "p2", "p3"], top_k=2)
+    assert [h.id for h in results[0]] == ["p2-best", "p3-best"]
+
+
+class FakeCollection:
+    """Primary-key queries against {partition: {speaker_id: vector}}."""
+
+    def __init__(self, partitions):
+        self.data = partitions
+        self.queried = []
+
+    @property
+    def partitions(self):
+        return [SimpleNamespace(name=name, num_entities=len(rows)) for name, rows in self.data.items()]
+
+    def query(self, expr, output_fields, partition_names=None, consistency_level=None):
+        self.queried.append(partition_names)
+        names = partition_names or list(self.data)
+        return [{"embedding": vectors[sid]}
+                for name in names for vectors in [self.data.get(name, {})] for sid in vectors if f'"{sid}"' in expr]
+
+
+@pytest.fixture
+def partitioned_milvus(monkeypatch):
+    import database.milvus_client as milvus
+
+    collection = FakeCollection({})
+    monkeypatch.setattr(milvus, "PARTITIONED", True)
+    monkeypatch.setattr(milvus, "partition_name", lambda sid, key=None: partition_name(sid, key, scheme="role"))
+    monkeypatch.setattr(milvus, "COMPRESSED", False)
+    monkeypatch.setattr(milvus, "init_milvus", lambda: collection)
+    monkeypatch.setattr(milvus.index_manager, "wait_available", lambda *a, **k: None)
+    monkeypatch.setattr(milvus, "_partition_loader", PartitionLoader(lambda names: None, lambda names: None))
+    monkeypatch.setattr(milvus, "_partitions", set())
+    return milvus, collection
+
+
+def test_one_to_one_lookup_finds_speakers_left_in_default(partitioned_milvus):
+    milvus, collection = partitioned_milvus
+    legacy = partition_name("legacy0001", "staff", scheme="role")
+    collection.data = {"_default": {"legacy0001": [1.0, 0.0]}, legacy: {}}
+    milvus._partitions.update({"_default", legacy})
+
+    assert milvus.get_embedding("legacy0001", partition_key="staff") == [1.0, 0.0]
+    assert sorted(collection.queried[-1]) == sorted([legacy, "_default"])
+
+    # Once migrated (no _default rows), only the speaker's own partition is queried
+    milvus._partitions.discard("_default")
+    collection.data = {legacy: {"legacy0001": [1.0, 0.0]}}
+    assert milvus.get_embedding("legacy0001", partition_key="staff") == [1.0, 0.0]
+    assert collection.queried[-1] == [legacy]
+
+
+def test_partitions_created_elsewhere_are_picked_up(partitioned_milvus, monkeypatch):
+    milvus, collection = partitioned_milvus
+    monkeypatch.setattr(milvus, "VECTOR_PARTITION_REFRESH_SECONDS", 60)
+    collection.data = {"_default": {}, "role_staff": {"a": [1.0]}}
+    milvus._refresh_partitions(collection, force=True)
+    assert milvus._partitions == {"role_staff"}          # empty _default is not searched
+
+    # Another process enrolls the first admin
+    collection.data["role_admin"] = {"b": [1.0]}
+    milvus._refresh_partitions(collection)
+    assert "role_admin" not in milvus._partitions        # within the refresh interval
+
+    monkeypatch.setattr(milvus, "_partitions_refreshed_at", time.monotonic() - 61)
+    milvus._refresh_partitions(collection)
+    assert milvus._partitions == {"role_staff", "role_admin"}
+
+    # A 1:1 lookup for an unknown partition refreshes immediately
+    collection.data["role_guest"] = {"c": [0.5]}
+    assert milvus.get_embedding("c", partition_key="guest") == [0.5]
+
+
+class LaggingCollection(FakeCollection):
+    """Rows are only visible to Strong reads, like a just-enrolled speaker."""
+
+    def __init__(self, partitions):
+        super().__init__(partitions)
+        self.levels = []
+
+    def query(self, expr, output_fields, partition_names=None, consistency_level=None):
+        self.levels.append(consistency_level)
+        if consistency_level != "Strong":
+            return []
+        return super().query(expr, output_fields, partition_names, consistency_level)
+
+
+def test_fresh_enrollments_are_read_strong_from_any_process(monkeypatch, tmp_path):
+    import database.milvus_client as milvus
+
+    collection = LaggingCollection({"_default": {"new0000001": [1.0, 0.0]}})
+    monkeypatch.setattr(milvus, "PARTITIONED", False)
+    monkeypatch.setattr(milvus, "COMPRESSED", False)
+    monkeypatch.setattr(milvus, "init_milvus", lambda: collection)
+    monkeypatch.setattr(milvus.index_manager, "wait_available", lambda *a, **k: None)
+    monkeypatch.setattr(milvus, "MILVUS_WRITE_MARKER_PATH", str(tmp_path / "milvus_last_write"))
+    monkeypatch.setattr(milvus, "_last_write_at", 0.0)
+
+    # A 1:1 miss at the default level is retried Strong
+    assert milvus.get_embedding("new0000001") == [1.0, 0.0]
+    assert collection.levels == [milvus.MILVUS_CONSISTENCY_LEVEL, "Strong"]
+    assert milvus.get_embedding("unknown001") is None
+
+    # Another process just wrote: reads here go Strong straight away
+    (tmp_path / "milvus_last_write").touch()
+    assert milvus._read_consistency() == "Strong"
+    old = time.time() - milvus.MILVUS_STRONG_READ_WINDOW - 1
+    os.utime(tmp_path / "milvus_last_write", (old, old))
+    assert milvus._read_consistency() == milvus.MILVUS_CONSISTENCY_LEVEL
+    assert milvus._read_consistency("Eventually") == "Eventually"
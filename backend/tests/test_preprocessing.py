@@ -0,0 +1,115 @@
+import sys
+import os
+import io
+import asyncio
+import importlib
+import tempfile
+
+import numpy as np
+import pytest
+import soundfile as sf
+from fastapi import HTTPException
+
+# Adjust path to find backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import core.preprocessing as preprocessing
+from core.preprocessing import AudioDecodeError, AudioTooLarge, decode_audio_bytes
+from config.settings import SAMPLE_RATE
+
+
+def _wav(samples, sr=SAMPLE_RATE, fmt="WAV"):
+    buf = io.BytesIO()
+    sf.write(buf, samples, sr, format=fmt, subtype="FLOAT" if fmt == "WAV" else None)
+    return buf.getvalue()
+
+
+def _tone(seconds, sr=SAMPLE_RATE):
+    t = np.arange(int(seconds * sr)) / sr
+    return (0.3 * np.sin(2 * np.pi * 220.0 * t)).astype(np.float32)
+
+
+def test_native_wav_at_the_model_rate_is_not_resampled(monkeypatch):
+    def no_resample(*args, **kwargs):
+        raise AssertionError("resampled a 16 kHz clip")
+
+    monkeypatch.setattr(preprocessing.librosa, "resample", no_resample)
+    tone = _tone(1.0)
+    audio = decode_audio_bytes(_wav(tone))
+    assert audio.dtype == np.float32
+    np.testing.assert_array_equal(audio, tone)
+
+
+def test_native_stereo_flac_is_downmixed_and_resampled():
+    left, right = _tone(1.0, 44100), np.zeros(44100, dtype=np.float32)
+    audio = decode_audio_bytes(_wav(np.stack([left, right], axis=1), sr=44100, fmt="FLAC"))
+    assert audio.dtype == np.float32 and audio.ndim == 1
+    assert abs(len(audio) - SAMPLE_RATE) <= 1
+    assert np.abs(audio).max() == pytest.approx(0.15, abs=0.01)
+
+
+def test_native_duration_is_checked_before_samples_are_read(monkeypatch):
+    monkeypatch.setattr(preprocessing, "MAX_AUDIO_DURATION", 2.0)
+    monkeypatch.setattr(preprocessing.sf, "read", lambda *a, **k: pytest.fail("samples were read"))
+    with pytest.raises(AudioTooLarge, match="longer than 2s"):
+        decode_audio_bytes(_wav(_tone(3.0)))
+
+
+def test_oversized_and_empty_uploads_are_refused_before_decoding(monkeypatch):
+    monkeypatch.setattr(preprocessing, "MAX_UPLOAD_BYTES", 1000)
+    with pytest.raises(AudioTooLarge, match="1000 bytes"):
+        decode_audio_bytes(b"\0" * 1001)
+    with pytest.raises(AudioDecodeError, match="Empty"):
+        decode_audio_bytes(b"")
+
+
+def test_unsupported_containers_fall_back_to_librosa_and_clean_up(monkeypatch):
+    seen = []
+
+    def fake_load(path, **kwargs):
+        with open(path, "rb") as f:
+            seen.append((path, f.read(), kwargs["duration"]))
+        return _tone(1.0), SAMPLE_RATE
+
+    monkeypatch.setattr(preprocessing.librosa, "load", fake_load)
+    audio = decode_audio_bytes(b"\x1a\x45\xdf\xa3 webm bytes")
+
+    np.testing.assert_array_equal(audio, _tone(1.0))
+    (path, data, duration), = seen
+    assert data == b"\x1a\x45\xdf\xa3 webm bytes"
+    assert duration == preprocessing.MAX_AUDIO_DURATION + 1.0
+    assert os.path.dirname(path) == tempfile.gettempdir() and not os.path.exists(path)
+
+    # Decoding stops just past the limit, which is then reported
+    monkeypatch.setattr(preprocessing, "MAX_AUDIO_DURATION", 0.5)
+    with pytest.raises(AudioTooLarge):
+        decode_audio_bytes(b"\x1a\x45\xdf\xa3 webm bytes")
+
+
+def test_undecodable_uploads_raise_audio_decode_error():
+    with pytest.raises(AudioDecodeError, match="Could not decode"):
+        decode_audio_bytes(b"this is not audio" * 100)
+
+    # A WAV header that claims a zero sample rate
+    header = bytearray(_wav(_tone(0.1)))
+    header[24:28] = (0).to_bytes(4, "little")
+    with pytest.raises(AudioDecodeError):
+        decode_audio_bytes(bytes(header))
+
+
+def test_decode_errors_map_to_413_and_400(monkeypatch):
+    import config.settings as settings
+
+    # Pool mode: importing the API builds no in-process model
+    monkeypatch.setattr(settings, "WORKER_POOL_ENABLED", True)
+    main = importlib.import_module("api.main")
+    monkeypatch.setattr(main, "worker_pool", None)
+
+    monkeypatch.setattr(preprocessing, "MAX_AUDIO_DURATION", 2.0)
+    with pytest.raises(HTTPException) as too_long:
+        asyncio.run(main.analyze_upload(_wav(_tone(3.0))))
+    assert too_long.value.status_code == 413
+
+    with pytest.raises(HTTPException) as garbage:
+        asyncio.run(main.analyze_upload(b"this is not audio" * 100))
+    assert garbage.value.status_code == 400
@@ -0,0 +1,83 @@
+import sys
+import os
+import numpy as np
+import pytest
+import torch
+
+# Adjust path to find backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from speechbrain.lobes.models.ECAPA_TDNN import ECAPA_TDNN
+
+import core.quantization as quantization
+import core.speaker_model as speaker_model
+from core.quantization import _ConvAsLinear, quantize_embedding_model, reference_eer
+
+
+def test_conv_as_linear_matches_the_convolution():
+    torch.manual_seed(0)
+    conv = torch.nn.Conv1d(8, 6, kernel_size=3, dilation=2)
+    x = torch.randn(2, 8, 40)
+    with torch.no_grad():
+        torch.testing.assert_close(_ConvAsLinear(conv)(x), conv(x), atol=1e-5, rtol=1e-5)
+    assert not _ConvAsLinear.supports(torch.nn.Conv1d(8, 6, 3, stride=2))
+
+
+def test_quantized_copy_stays_close_and_leaves_the_original_alone():
+    torch.manual_seed(0)
+    model = ECAPA_TDNN(40, channels=[32, 32, 32, 32, 96], lin_neurons=64).eval()
+    feats = torch.randn(3, 120, 40)
+    with torch.no_grad():
+        before = model(feats)
+        quantized = quantize_embedding_model(model)
+        after = quantized(feats)
+        assert torch.equal(model(feats), before)
+
+    assert any(isinstance(m, torch.ao.nn.quantized.dynamic.Linear) for m in quantized.modules())
+    cos = torch.nn.functional.cosine_similarity(before.squeeze(1), after.squeeze(1))
+    assert cos.min() > 0.98
+
+
+def test_reference_eer_scores_every_pair():
+    speakers = np.array(["a", "a", "b", "b"])
+    separable = lambda clips: [[1.0, 0.0] if c < 2 else [0.0, 1.0] for c in clips]
+    swapped = lambda clips: [[1.0, 0.0] if c in (0, 2) else [0.0, 1.0] for c in clips]
+    # Batching does not change the result; same-speaker pairs scoring higher lowers it
+    assert reference_eer(separable, list(range(4)), speakers, batch_size=3) == \
+        reference_eer(separable, list(range(4)), speakers)
+    assert reference_eer(separable, list(range(4)), speakers) < reference_eer(swapped, list(range(4)), speakers)
+
+
+class _Model:
+    def __init__(self):
+        self.float_model = torch.nn.Linear(2, 2)
+        self.mods = torch.nn.ModuleDict({"embedding_model": self.float_model})
+
+
+def _gate(monkeypatch, tmp_path, speakers, float_eer, int8_eer):
+    monkeypatch.setattr(quantization, "load_reference_set", lambda d: (list(range(len(speakers))), np.array(speakers)))
+    monkeypatch.setattr(quantization, "quantize_embedding_model", lambda m: torch.nn.Identity())
+
+    model = speaker_model.ECAPAModel.__new__(speaker_model.ECAPAModel)
+    model.model = _Model()
+    mods = model.model.mods
+    monkeypatch.setattr(quantization, "reference_eer", lambda fn, clips, spk: (
+        int8_eer if isinstance(mods.embedding_model, torch.nn.Identity) else float_eer))
+    enabled = model._enable_quantized(reference_dir=str(tmp_path), tolerance=0.005)
+    return enabled, mods.embedding_model is model.model.float_model
+
+
+@pytest.mark.parametrize("int8_eer, enabled", [(0.054, True), (0.056, False)])
+def test_gate_keeps_int8_only_within_tolerance(tmp_path, monkeypatch, int8_eer, enabled):
+    assert _gate(monkeypatch, tmp_path, ["a", "a", "b", "b"], 0.05, int8_eer) == (enabled, not enabled)
+
+
+def test_gate_needs_a_usable_reference_set(tmp_path, monkeypatch):
+    # No directory, one speaker, or no speaker with two clips: stay float32
+    model = speaker_model.ECAPAModel.__new__(speaker_model.ECAPAModel)
+    model.model = _Model()
+    assert model._enable_quantized(reference_dir=None) is False
+    assert model._enable_quantized(reference_dir=str(tmp_path / "missing")) is False
+
+    assert _gate(monkeypatch, tmp_path, ["a", "a", "a"], 0.0, 0.0) == (False, True)
+    assert _gate(monkeypatch, tmp_path, ["a", "b", "c"], 0.0, 0.0) == (False, True)
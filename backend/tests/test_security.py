@@ -0,0 +1,26 @@
+import sys
+import os
+import json
+import random
+
+# Adjust path to find backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.security import generate_speaker_id, is_valid_speaker_id
+from database.milvus_client import _id_literal
+
+
+def test_generated_ids_pass_validation_and_injections_do_not():
+    rng = random.Random(0)
+    for name in ("Ada Lovelace", "Li", "", "Zoë O'Brien"):
+        assert is_valid_speaker_id(generate_speaker_id(name, rng))
+
+    for bad in ('abc" or speaker_id != "', "abc' || 1==1", "abcdefghij\n", "short", None):
+        assert not is_valid_speaker_id(bad)
+
+
+def test_id_literal_cannot_be_broken_out_of():
+    for sid in ('abc" or speaker_id != "x', 'back\\slash', "plainID123"):
+        literal = _id_literal(sid)
+        assert literal.startswith('"') and literal.endswith('"')
+        assert json.loads(literal) == sid        # same escaping rules as a JSON string
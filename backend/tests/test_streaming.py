@@ -0,0 +1,57 @@
+import sys
+import os
+import numpy as np
+
+# Adjust path to find backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.streaming import RingBuffer, StreamingDecision, decode_pcm16
+
+
+def test_ring_buffer_keeps_most_recent_samples_in_order():
+    buf = RingBuffer(10)
+    stream = np.arange(27, dtype=np.float32)
+
+    for start in range(0, 27, 4):
+        end = min(start + 4, 27)
+        buf.append(stream[start:end])
+        expected = stream[max(0, end - 10):end]
+        assert np.array_equal(buf.window(), expected)
+
+    assert buf.total == 27
+    assert len(buf) == 10
+
+
+def test_decode_pcm16_drops_split_sample():
+    data = np.array([0, 16384, -32768], dtype="<i2").tobytes() + b"\x01"
+    assert np.allclose(decode_pcm16(data), [0.0, 0.5, -1.0])
+
+
+def test_decision_needs_consecutive_confident_windows():
+    decision = StreamingDecision(threshold=0.8, margin=0.05, confirmations=2, min_seconds=2.0)
+
+    assert decision.update(0.95, True, 1.0) is None      # too early
+    assert decision.update(0.95, True, 2.0) is None
+    assert decision.update(0.82, True, 2.5) is None      # inside the margin resets
+    assert decision.update(0.90, True, 3.0) is None
+    assert decision.update(0.90, True, 3.5) is True
+
+
+def test_decision_accepts_early_only_with_verify_length_speech():
+    decision = StreamingDecision(threshold=0.8, margin=0.05, confirmations=2, min_seconds=2.0, accept_min_seconds=3.0)
+
+    assert decision.update(0.95, True, 2.0) is None
+    assert decision.update(0.95, True, 2.5) is None      # confident, but shorter than /verify allows
+    assert decision.update(0.95, True, 3.0) is None      # first window that counts
+    assert decision.update(0.95, True, 3.5) is True
+
+    rejecting = StreamingDecision(threshold=0.8, margin=0.05, confirmations=2, min_seconds=2.0, accept_min_seconds=3.0)
+    assert rejecting.update(0.10, True, 2.0) is None
+    assert rejecting.update(0.10, True, 2.5) is False    # rejects need only min_seconds
+
+
+def test_decision_never_accepts_early_without_liveness():
+    decision = StreamingDecision(threshold=0.8, margin=0.05, confirmations=1, min_seconds=0.0)
+    assert decision.update(0.99, False, 3.0) is None
+    assert decision.update(0.10, False, 3.5) is False
+    assert decision.final(0.99, False) is False
@@ -0,0 +1,38 @@
+import sys
+import os
+import numpy as np
+
+# Adjust path to find backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.preprocessing import trim_silence
+from config.settings import SAMPLE_RATE
+
+
+def _tone(seconds, amplitude=0.3, freq=220.0):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def _silence(seconds, rng):
+    return (1e-4 * rng.normal(size=int(seconds * SAMPLE_RATE))).astype(np.float32)
+
+
+def test_trims_leading_trailing_and_long_pauses():
+    rng = np.random.default_rng(0)
+    signal = np.concatenate([
+        _silence(1.0, rng), _tone(1.0), _silence(2.0, rng), _tone(1.0), _silence(1.0, rng)
+    ])
+
+    speech = trim_silence(signal, max_speech_seconds=None)
+
+    # 2 s of tone plus at most the hangover padding around each segment
+    assert 2.0 <= len(speech) / SAMPLE_RATE <= 2.7
+
+
+def test_silence_only_and_speech_cap():
+    rng = np.random.default_rng(1)
+    assert len(trim_silence(_silence(3.0, rng))) == 0
+
+    capped = trim_silence(_tone(5.0), max_speech_seconds=2.0)
+    assert len(capped) == 2 * SAMPLE_RATE
@@ -0,0 +1,168 @@
+import sys
+import os
+import asyncio
+import importlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from fastapi import HTTPException
+
+# Adjust path to find backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import core.worker_pool as worker_pool
+from core.worker_pool import AudioWorkerPool, PoolSaturated, PoolUnavailable, PipelineTimeout
+
+
+@pytest.fixture
+def blocking_pool(monkeypatch):
+    """
+    A pool whose jobs run on threads and block until released, so the
+    admission count can be observed without spawning model processes.
+    """
+    release = threading.Event()
+
+    def job(data, min_duration):
+        release.wait(5)
+        return {"data": data}
+
+    monkeypatch.setattr(worker_pool, "_run_job", job)
+    pool = AudioWorkerPool(size=1, queue_depth=1, timeout=5)
+    pool._executor = ThreadPoolExecutor(max_workers=pool.capacity)
+    yield pool, release
+    release.set()
+    pool._executor.shutdown(wait=True)
+
+
+def test_requests_beyond_capacity_are_refused(blocking_pool):
+    pool, release = blocking_pool
+
+    async def scenario():
+        admitted = [asyncio.ensure_future(pool.run(b"clip", None)) for _ in range(pool.capacity)]
+        await asyncio.sleep(0.05)
+        assert pool.stats()["admitted"] == 2
+        with pytest.raises(PoolSaturated):
+            await pool.run(b"one too many", None)
+
+        release.set()
+        results = await asyncio.gather(*admitted)
+        assert results == [{"data": b"clip"}] * 2
+        assert pool.stats()["admitted"] == 0
+        return await pool.run(b"again", None)
+
+    assert asyncio.run(scenario()) == {"data": b"again"}
+
+
+def test_a_timed_out_job_keeps_its_slot_until_it_finishes(blocking_pool):
+    pool, release = blocking_pool
+    pool.timeout = 0.05
+
+    async def scenario():
+        with pytest.raises(PipelineTimeout, match="0.05s"):
+            await pool.run(b"slow", None)
+        # The worker is still busy with it
+        assert pool.stats()["admitted"] == 1
+
+        release.set()
+        for _ in range(100):
+            if pool.stats()["admitted"] == 0:
+                return
+            await asyncio.sleep(0.01)
+        raise AssertionError("slot was never released")
+
+    asyncio.run(scenario())
+
+
+def test_pool_errors_map_to_503_with_retry_after_and_504(monkeypatch):
+    import config.settings as settings
+
+    # Pool mode: importing the API builds no in-process model
+    monkeypatch.setattr(settings, "WORKER_POOL_ENABLED", True)
+    main = importlib.import_module("api.main")
+
+    class FailingPool:
+        def __init__(self, error):
+            self.error = error
+
+        async def run(self, data, min_duration=None):
+            raise self.error
+
+    monkeypatch.setattr(main, "worker_pool", FailingPool(PoolSaturated("saturated")))
+    with pytest.raises(HTTPException) as saturated:
+        asyncio.run(main.analyze_upload(b"clip"))
+    assert saturated.value.status_code == 503
+    assert saturated.value.headers == {"Retry-After": str(settings.WORKER_RETRY_AFTER_SECONDS)}
+
+    monkeypatch.setattr(main, "worker_pool", FailingPool(PipelineTimeout("timed out")))
+    with pytest.raises(HTTPException) as timed_out:
+        asyncio.run(main.analyze_upload(b"clip"))
+    assert timed_out.value.status_code == 504
+
+    monkeypatch.setattr(main, "worker_pool", FailingPool(PoolUnavailable("crashed")))
+    with pytest.raises(HTTPException) as unavailable:
+        asyncio.run(main.analyze_upload(b"clip"))
+    assert unavailable.value.status_code == 503
+
+
+class CrashingExecutor:
+    """Executor whose jobs fail the way ProcessPoolExecutor's do after a worker dies."""
+
+    def __init__(self, crashes):
+        self.crashes = crashes
+        self._broken = False
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        future = Future()
+        if fn is worker_pool._ping:
+            future.set_result(True)
+        elif self.crashes:
+            self._broken = "A child process terminated abruptly"
+            future.set_exception(BrokenProcessPool(self._broken))
+        else:
+            future.set_result({"data": args[0]})
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def pool_with_executors(monkeypatch, *executors):
+    spawned = iter(executors)
+    pool = AudioWorkerPool(size=1, queue_depth=1, timeout=5)
+    monkeypatch.setattr(pool, "_new_executor", lambda: next(spawned))
+    pool.start()
+    return pool
+
+
+def test_a_broken_pool_is_rebuilt_and_the_request_retried(monkeypatch):
+    broken, fresh = CrashingExecutor(crashes=True), CrashingExecutor(crashes=False)
+    pool = pool_with_executors(monkeypatch, broken, fresh)
+
+    assert asyncio.run(pool.run(b"clip", None)) == {"data": b"clip"}
+    assert broken.shut_down
+    assert pool._executor is fresh
+    assert pool.ready
+    assert pool.stats()["admitted"] == 0
+
+
+def test_a_pool_that_breaks_again_is_unavailable(monkeypatch):
+    pool = pool_with_executors(monkeypatch, CrashingExecutor(crashes=True), CrashingExecutor(crashes=True),
+                               CrashingExecutor(crashes=False))
+
+    with pytest.raises(PoolUnavailable):
+        asyncio.run(pool.run(b"clip", None))
+    assert pool.stats()["admitted"] == 0
+
+
+def test_ready_reports_and_rebuilds_a_broken_pool(monkeypatch):
+    broken, fresh = CrashingExecutor(crashes=False), CrashingExecutor(crashes=False)
+    pool = pool_with_executors(monkeypatch, broken, fresh)
+    assert pool.ready
+
+    broken._broken = "A child process terminated abruptly"   # a worker died while idle
+    assert not pool.ready
+    assert pool._executor is fresh
+    assert pool.ready
@@ -1,6 +1,27 @@
 # core/config.py
 
+import os
+
 SAMPLE_RATE = 16000
 MIN_DURATION_SEC = 3.0
 SIMILARITY_THRESHOLD = 0.80
 MODEL_PATH = "pretrained_models/ecapa"
+MODEL_SOURCE = "speechbrain/spkrec-ecapa-voxceleb"
+EMBEDDING_DIM = 192
+
+# Batched verification (VoiceAuthEngine.verify_many)
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "32"))          # clips per encode_batch call
+VERIFY_CHUNK_PAIRS = int(os.getenv("VERIFY_CHUNK_PAIRS", "1024"))  # pairs per yielded chunk
+DECODE_WORKERS = int(os.getenv("DECODE_WORKERS", str(os.cpu_count() or 2)))
+
+# Embedding cache (keyed by decoded samples + MODEL_SOURCE)
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_ENTRIES = int(os.getenv("EMBEDDING_CACHE_ENTRIES", "10000"))
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR")  # unset = memory tier only
+EMBEDDING_CACHE_DISK_BYTES = int(os.getenv("EMBEDDING_CACHE_DISK_BYTES", str(1024 * 1024 * 1024)))
+EMBEDDING_CACHE_SHARD_ROWS = int(os.getenv("EMBEDDING_CACHE_SHARD_ROWS", "16384"))
+
+# Speaker template store (core.template_store)
+TEMPLATE_STORE_PATH = os.getenv("TEMPLATE_STORE_PATH", "models/templates")
+TEMPLATE_STORE_COMPACT_RATIO = float(os.getenv("TEMPLATE_STORE_COMPACT_RATIO", "0.25"))  # dead share that triggers compaction
+TEMPLATE_STORE_COMPACT_MIN_ROWS = int(os.getenv("TEMPLATE_STORE_COMPACT_MIN_ROWS", "1024"))
@@ -3,9 +3,55 @@
 import numpy as np
 import torch
 from core.model import get_verifier
+from core.config import (
+    MODEL_SOURCE,
+    EMBEDDING_DIM,
+    BATCH_SIZE,
+    EMBEDDING_CACHE_ENABLED,
+    EMBEDDING_CACHE_ENTRIES,
+    EMBEDDING_CACHE_DIR,
+    EMBEDDING_CACHE_DISK_BYTES,
+    EMBEDDING_CACHE_SHARD_ROWS,
+)
+from core.embedding_cache import EmbeddingCache
+
+_CACHE = None
+
+
+def get_embedding_cache():
+    global _CACHE
+
+    if _CACHE is None and EMBEDDING_CACHE_ENABLED:
+        # The engine only runs the eager float32 model, so the checkpoint
+        # name is the whole namespace
+        _CACHE = EmbeddingCache(
+            MODEL_SOURCE,
+            dim=EMBEDDING_DIM,
+            max_entries=EMBEDDING_CACHE_ENTRIES,
+            cache_dir=EMBEDDING_CACHE_DIR,
+            disk_max_bytes=EMBEDDING_CACHE_DISK_BYTES,
+            shard_rows=EMBEDDING_CACHE_SHARD_ROWS,
+        )
+
+    return _CACHE
+
+
+def embedding_cache_stats() -> dict:
+    cache = get_embedding_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
 
 
 def extract_embedding(signal: np.ndarray) -> np.ndarray:
+    cache = get_embedding_cache()
+    key = None
+    if cache is not None:
+        key = cache.key(signal)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached.copy()
+
     verifier = get_verifier()
 
     with torch.no_grad():
@@ -17,4 +63,76 @@ def extract_embedding(signal: np.ndarray) -> np.ndarray:
     if norm == 0 or np.isnan(norm):
         raise ValueError("Invalid embedding norm detected")
 
-    return embedding / norm
+    embedding = embedding / norm
+
+    if cache is not None:
+        cache.put(key, embedding)
+
+    return embedding
+
+
+def _normalize_rows(embeddings: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    if np.any(norms == 0) or np.isnan(norms).any():
+        raise ValueError("Invalid embedding norm detected")
+    return embeddings / norms
+
+
+def _equal_length_batches(indices: list, signals: list, batch_size: int):
+    """
+    Split indices into batches of at most batch_size clips that all have
+    the same length, so no batch needs padding.
+    """
+    batch = []
+    for i in sorted(indices, key=lambda i: len(signals[i])):
+        if batch and (len(batch) == batch_size or len(signals[i]) != len(signals[batch[0]])):
+            yield batch
+            batch = []
+        batch.append(i)
+    if batch:
+        yield batch
+
+
+def extract_embeddings(signals: list, batch_size: int = BATCH_SIZE) -> np.ndarray:
+    """
+    Normalized embeddings [N, EMBEDDING_DIM] for many signals.
+
+    Cache hits are served directly; the rest go through encode_batch in
+    batches of clips with the same length. Padding would change the
+    result (the model's convolutions see the zeros past a clip's end), so
+    grouping by length keeps every embedding identical to
+    extract_embedding's and safe to share the cache with it. Clips of
+    distinct lengths are encoded one at a time.
+    """
+    cache = get_embedding_cache()
+    out = np.empty((len(signals), EMBEDDING_DIM), dtype=np.float32)
+
+    keys = [None] * len(signals)
+    missing = []
+    for i, signal in enumerate(signals):
+        if cache is not None:
+            keys[i] = cache.key(signal)
+            cached = cache.get(keys[i])
+            if cached is not None:
+                out[i] = cached
+                continue
+        missing.append(i)
+
+    if not missing:
+        return out
+
+    verifier = get_verifier()
+
+    for batch in _equal_length_batches(missing, signals, batch_size):
+        wavs = torch.from_numpy(np.stack([np.asarray(signals[i], dtype=np.float32) for i in batch]))
+
+        with torch.no_grad():
+            embeddings = verifier.encode_batch(wavs).reshape(len(batch), -1).cpu().numpy()
+        embeddings = _normalize_rows(embeddings)
+
+        for row, i in enumerate(batch):
+            out[i] = embeddings[row]
+            if cache is not None:
+                cache.put(keys[i], embeddings[row])
+
+    return out
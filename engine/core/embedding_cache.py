@@ -0,0 +1,265 @@
+# core/embedding_cache.py
+#
+# Shared by backend/ and engine/ (identical copies; the packages do not
+# import each other). Configuration is passed in by the caller.
+
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from core.locking import file_lock
+
+KEY_BYTES = 16
+LOCK_FILE = "cache.lock"
+
+
+class _DiskTier:
+    """
+    Append-only shards of float32 embeddings, memory-mapped.
+
+    Each shard is a pair of files: shard_N.f32 (preallocated [rows, dim]
+    matrix) and shard_N.keys (KEY_BYTES per written row, appended after the
+    vector is flushed, so a torn write is simply never indexed). When the
+    total size passes max_bytes, the oldest shard is deleted.
+
+    Several processes may share the directory (pool workers, trial
+    workers). Writes hold lock_path and first read what the others
+    appended, so a row is only ever claimed once: a key's row is its
+    position in the .keys file, never a private counter. Written rows are
+    never rewritten, so reads need no lock; a miss rescans for keys other
+    processes added.
+    """
+
+    def __init__(self, path: str, dim: int, max_bytes: int, shard_rows: int, lock_path: str):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.dim = dim
+        self.max_bytes = max_bytes
+        self.shard_rows = shard_rows
+        self.shard_bytes = shard_rows * dim * 4
+        self._lock_path = lock_path
+
+        self._index = {}        # key -> (shard_id, row)
+        self._shards = {}       # shard_id -> memmap
+        self._indexed = {}      # shard_id -> rows of its .keys file read so far
+
+        self._scan()
+        if not self._shards:
+            with file_lock(self._lock_path):
+                self._scan()
+                if not self._shards:
+                    self._new_shard(0)
+
+    def _matrix_path(self, sid):
+        return os.path.join(self.path, f"shard_{sid:06d}.f32")
+
+    def _keys_path(self, sid):
+        return os.path.join(self.path, f"shard_{sid:06d}.keys")
+
+    def _shard_ids(self) -> list:
+        return sorted(
+            int(name[len("shard_"):-len(".keys")])
+            for name in os.listdir(self.path)
+            if name.startswith("shard_") and name.endswith(".keys")
+        )
+
+    def _scan(self):
+        """
+        Pick up shards and keys written (and shards evicted) by any process.
+        A partial key at the end of a .keys file is left for the next
+        writer to overwrite.
+        """
+        on_disk = self._shard_ids()
+        for sid in set(self._shards) - set(on_disk):
+            self._forget(sid)
+        for sid in on_disk:
+            if self._indexed.get(sid, 0) >= self.shard_rows:
+                continue                # full shards never change
+            try:
+                with open(self._keys_path(sid), "rb") as f:
+                    f.seek(self._indexed.get(sid, 0) * KEY_BYTES)
+                    raw = f.read()
+                if sid not in self._shards:
+                    self._open(sid)
+            except FileNotFoundError:
+                continue                # evicted while we looked
+            start = self._indexed.get(sid, 0)
+            rows = min(len(raw) // KEY_BYTES, self.shard_rows - start)
+            for i in range(rows):
+                self._index[raw[i * KEY_BYTES:(i + 1) * KEY_BYTES]] = (sid, start + i)
+            self._indexed[sid] = start + rows
+
+    def _open(self, sid):
+        self._shards[sid] = np.memmap(
+            self._matrix_path(sid), dtype=np.float32, mode="r+", shape=(self.shard_rows, self.dim)
+        )
+
+    def _forget(self, sid):
+        del self._shards[sid]
+        del self._indexed[sid]
+        self._index = {k: v for k, v in self._index.items() if v[0] != sid}
+
+    def _new_shard(self, sid):
+        # Matrix first: a shard is visible once its .keys file exists
+        with open(self._matrix_path(sid), "wb") as f:
+            f.truncate(self.shard_bytes)
+        open(self._keys_path(sid), "wb").close()
+        self._indexed[sid] = 0
+        self._open(sid)
+        return sid
+
+    def _evict_oldest(self):
+        # Other processes keep reading an evicted shard's mapping until their next scan
+        oldest = min(self._shards)
+        self._forget(oldest)
+        for p in (self._keys_path(oldest), self._matrix_path(oldest)):
+            if os.path.exists(p):
+                os.remove(p)
+
+    @property
+    def bytes_used(self):
+        return len(self._shards) * self.shard_bytes
+
+    def __len__(self):
+        return len(self._index)
+
+    def get(self, key, rescan: bool = True):
+        loc = self._index.get(key)
+        if loc is None and rescan:
+            self._scan()
+            loc = self._index.get(key)
+        if loc is None:
+            return None
+        sid, row = loc
+        return np.array(self._shards[sid][row])
+
+    def put(self, key, embedding):
+        with file_lock(self._lock_path):
+            self._scan()
+            if key in self._index:
+                return
+            sid = max(self._shards)
+            if self._indexed[sid] >= self.shard_rows:
+                sid = self._new_shard(sid + 1)
+                while self.bytes_used > self.max_bytes and len(self._shards) > 1:
+                    self._evict_oldest()
+
+            row = self._indexed[sid]
+            self._shards[sid][row] = embedding
+            self._shards[sid].flush()
+            with open(self._keys_path(sid), "r+b") as f:
+                # Overwrites a partial key left by a crash
+                f.seek(row * KEY_BYTES)
+                f.truncate()
+                f.write(key)
+            self._indexed[sid] = row + 1
+            self._index[key] = (sid, row)
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache.
+
+    Keys hash the decoded float32 samples together with the model identifier,
+    so identical audio hits regardless of filename and a model change misses
+    everything. Tier 1 is a bounded in-memory LRU; tier 2 (when cache_dir is
+    set) is a set of memory-mapped shards on disk. Disk shards live under a
+    per-model subdirectory, and shards left by other models are removed.
+
+    model_id must change whenever the embeddings would: it names the
+    checkpoint and any variant computing it differently (compiled, int8).
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        dim: int,
+        max_entries: int = 10000,
+        cache_dir: str = None,
+        disk_max_bytes: int = 1024 * 1024 * 1024,
+        shard_rows: int = 16384,
+    ):
+        self.model_id = model_id
+        self.max_entries = max(1, int(max_entries))
+        self._model_tag = hashlib.blake2b(model_id.encode(), digest_size=8).hexdigest()
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._disk = None
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            lock_path = os.path.join(cache_dir, LOCK_FILE)
+            with file_lock(lock_path):
+                self._drop_other_models(cache_dir)
+            self._disk = _DiskTier(os.path.join(cache_dir, self._model_tag), dim, disk_max_bytes, shard_rows,
+                                   lock_path)
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _drop_other_models(self, cache_dir):
+        # Under the cache lock, so no writer is mid-way through a shard being removed
+        for name in os.listdir(cache_dir):
+            full = os.path.join(cache_dir, name)
+            is_model_dir = len(name) == len(self._model_tag) and all(c in "0123456789abcdef" for c in name)
+            if is_model_dir and name != self._model_tag and os.path.isdir(full):
+                shutil.rmtree(full, ignore_errors=True)
+
+    def key(self, samples: np.ndarray) -> bytes:
+        h = hashlib.blake2b(digest_size=KEY_BYTES)
+        h.update(self._model_tag.encode())
+        h.update(np.ascontiguousarray(samples, dtype=np.float32).tobytes())
+        return h.digest()
+
+    def get(self, key: bytes):
+        with self._lock:
+            emb = self._memory.get(key)
+            if emb is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return emb
+
+            if self._disk is not None:
+                emb = self._disk.get(key)
+                if emb is not None:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    self._remember(key, emb)
+                    return emb
+
+            self.misses += 1
+            return None
+
+    def put(self, key: bytes, embedding):
+        emb = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            self._remember(key, emb)
+            if self._disk is not None:
+                self._disk.put(key, emb)
+
+    def _remember(self, key, emb):
+        self._memory[key] = emb
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model_id": self.model_id,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": sum(e.nbytes for e in self._memory.values()),
+                "disk_entries": len(self._disk) if self._disk is not None else 0,
+                "disk_bytes": self._disk.bytes_used if self._disk is not None else 0,
+            }
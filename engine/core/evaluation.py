@@ -0,0 +1,250 @@
+# core/evaluation.py
+#
+# Also used by the engine's trial scoring: engine/core/evaluation.py is an
+# identical copy, since the two packages do not import each other.
+
+import numpy as np
+
+def calculate_eer(scores, labels):
+    """
+    Calculate Equal Error Rate (EER) and the optimal threshold.
+    
+    Args:
+        scores (list or np.array): List of similarity scores (higher is better match).
+        labels (list or np.array): List of ground truth labels (1 for match, 0 for non-match).
+        
+    Returns:
+        tuple: (eer, threshold)
+    """
+    scores = np.array(scores)
+    labels = np.array(labels)
+    
+    # Sort scores to iterate through thresholds
+    sorted_indices = np.argsort(scores)
+    scores_sorted = scores[sorted_indices]
+    labels_sorted = labels[sorted_indices]
+    
+    # Calculate FRR and FAR for all possible thresholds
+    # Threshold T:
+    #   Predict 1 if score >= T
+    #   Predict 0 if score < T
+    
+    # Efficient calculation using cumsum
+    # Total positives (true matches)
+    P = np.sum(labels)
+    # Total negatives (impostors)
+    N = len(labels) - P
+    
+    if P == 0 or N == 0:
+        return 0.0, 0.5 # Edge case
+        
+    # As threshold increases (moving from left to right in sorted scores):
+    # - We reject more (so False Rejections increase)
+    # - We accept fewer false ones (so False Acceptances decrease)
+    
+    # Current False Rejections (Type II)
+    # At index i, threshold is scores_sorted[i].
+    # Items < index i are rejected.
+    # Among rejected, sum(labels[:i]) are True Positives that got rejected.
+    frrs = np.cumsum(labels_sorted) / P
+    
+    # Current False Acceptances (Type I)
+    # Items >= index i are accepted.
+    # Among accepted, sum(1-labels[i:]) are True Negatives that got accepted.
+    # But easier: Total Negatives - Negatives Rejected
+    # Negatives Rejected at i = (i) - sum(labels[:i]) -- wait, index i is size of set rejected
+    # i is count of rejected items. sum(labels[:i]) is count of positives rejected.
+    # So count of negatives rejected = i - sum(labels[:i]).
+    # Remaining negatives = N - (i - sum(labels[:i])).
+    # FAR = Remaining Neg / N
+    
+    negatives_rejected = np.arange(len(labels)) - np.cumsum(labels_sorted)
+    fars = (N - negatives_rejected) / N
+    
+    # Find EER where FAR ~= FRR
+    diffs = np.abs(fars - frrs)
+    min_idx = np.argmin(diffs)
+    
+    eer = (fars[min_idx] + frrs[min_idx]) / 2
+    threshold = scores_sorted[min_idx]
+    
+    return eer, threshold
+
+def calculate_metrics(scores, labels, threshold=None):
+    """
+    Calculate FAR and FRR at a specific threshold.
+    """
+    scores = np.array(scores)
+    labels = np.array(labels)
+    
+    if threshold is None:
+        _, threshold = calculate_eer(scores, labels)
+        
+    predictions = (scores >= threshold).astype(int)
+    
+    # False Acceptances: Label 0, Pred 1
+    fa = np.sum((labels == 0) & (predictions == 1))
+    N = np.sum(labels == 0)
+    far = fa / N if N > 0 else 0.0
+    
+    # False Rejections: Label 1, Pred 0
+    fr = np.sum((labels == 1) & (predictions == 0))
+    P = np.sum(labels == 1)
+    frr = fr / P if P > 0 else 0.0
+    
+    return {
+        "far": float(far),
+        "frr": float(frr),
+        "threshold": float(threshold)
+    }
+
+class ScoreAccumulator:
+    """
+    Bounded-memory alternative to calculate_eer / calculate_metrics for
+    streamed trials. Scores are binned into fixed-width histograms over
+    [low, high] (one for targets, one for non-targets), so memory does not
+    depend on the number of trials. Thresholds resolve to bin edges; scores
+    outside [low, high] count in the outermost bins.
+
+    Accumulators with the same binning can be merged, so trials can be
+    split across processes and combined at the end (see merge / save / load).
+    """
+
+    def __init__(self, bins=20000, low=-1.0, high=1.0):
+        self.bins = bins
+        self.low = low
+        self.high = high
+        self.edges = np.linspace(low, high, bins + 1)
+        self.target_counts = np.zeros(bins, dtype=np.int64)
+        self.nontarget_counts = np.zeros(bins, dtype=np.int64)
+
+    def _bin(self, scores):
+        idx = ((np.asarray(scores, dtype=np.float64) - self.low) / (self.high - self.low) * self.bins)
+        return np.clip(idx.astype(np.int64), 0, self.bins - 1)
+
+    def add(self, scores, labels):
+        """
+        Add a batch of trials (labels: 1 for match, 0 for non-match).
+        """
+        idx = self._bin(scores)
+        labels = np.asarray(labels).astype(bool)
+        self.target_counts += np.bincount(idx[labels], minlength=self.bins)
+        self.nontarget_counts += np.bincount(idx[~labels], minlength=self.bins)
+
+    def _check_compatible(self, other):
+        if (self.bins, self.low, self.high) != (other.bins, other.low, other.high):
+            raise ValueError("Cannot merge accumulators with different binning")
+
+    def merge(self, other):
+        """
+        Add another accumulator's trials into this one. Returns self.
+        """
+        self._check_compatible(other)
+        self.target_counts += other.target_counts
+        self.nontarget_counts += other.nontarget_counts
+        return self
+
+    def __add__(self, other):
+        self._check_compatible(other)
+        out = ScoreAccumulator(self.bins, self.low, self.high)
+        return out.merge(self).merge(other)
+
+    def save(self, path):
+        np.savez(
+            path,
+            bins=self.bins,
+            low=self.low,
+            high=self.high,
+            target_counts=self.target_counts,
+            nontarget_counts=self.nontarget_counts,
+        )
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        acc = cls(int(data["bins"]), float(data["low"]), float(data["high"]))
+        acc.target_counts += data["target_counts"]
+        acc.nontarget_counts += data["nontarget_counts"]
+        return acc
+
+    @property
+    def num_targets(self):
+        return int(self.target_counts.sum())
+
+    @property
+    def num_nontargets(self):
+        return int(self.nontarget_counts.sum())
+
+    def error_rates(self):
+        """
+        FAR and FRR at every bin edge (accept if score >= edge).
+        """
+        P, N = self.num_targets, self.num_nontargets
+        # Targets below edge k are rejected; non-targets at/above edge k are accepted
+        rejected_targets = np.concatenate([[0], np.cumsum(self.target_counts)])
+        accepted_nontargets = N - np.concatenate([[0], np.cumsum(self.nontarget_counts)])
+        frrs = rejected_targets / P if P else np.zeros(self.bins + 1)
+        fars = accepted_nontargets / N if N else np.zeros(self.bins + 1)
+        return fars, frrs
+
+    def eer(self):
+        """
+        Same contract as calculate_eer: (eer, threshold).
+        """
+        if self.num_targets == 0 or self.num_nontargets == 0:
+            return 0.0, 0.5 # Edge case
+
+        fars, frrs = self.error_rates()
+        min_idx = np.argmin(np.abs(fars - frrs))
+        return float((fars[min_idx] + frrs[min_idx]) / 2), float(self.edges[min_idx])
+
+    def metrics(self, threshold=None):
+        """
+        Same contract as calculate_metrics.
+        """
+        if threshold is None:
+            _, threshold = self.eer()
+
+        fars, frrs = self.error_rates()
+        k = int(np.clip(np.searchsorted(self.edges, threshold, side="left"), 0, self.bins))
+        return {
+            "far": float(fars[k]),
+            "frr": float(frrs[k]),
+            "threshold": float(threshold)
+        }
+
+    def det_curve(self):
+        """
+        DET curve as (fars, frrs, thresholds), one point per bin edge where
+        either rate changes, ordered by increasing threshold. Plot on normal
+        deviate axes (scipy.stats.norm.ppf) for the usual DET view.
+        """
+        fars, frrs = self.error_rates()
+        keep = np.ones(len(fars), dtype=bool)
+        keep[1:] = (np.diff(fars) != 0) | (np.diff(frrs) != 0)
+        return fars[keep], frrs[keep], self.edges[keep]
+
+    def min_dcf(self, p_target=0.01, c_miss=1.0, c_fa=1.0):
+        """
+        Minimum normalized detection cost over all thresholds:
+            DCF = c_miss * p_target * FRR + c_fa * (1 - p_target) * FAR,
+        divided by the cost of the best trivial system.
+        Returns (min_dcf, threshold).
+        """
+        if self.num_targets == 0 or self.num_nontargets == 0:
+            return 0.0, 0.5 # Edge case
+
+        fars, frrs = self.error_rates()
+        dcf = c_miss * p_target * frrs + c_fa * (1 - p_target) * fars
+        dcf /= min(c_miss * p_target, c_fa * (1 - p_target))
+        min_idx = int(np.argmin(dcf))
+        return float(dcf[min_idx]), float(self.edges[min_idx])
+
+    def threshold_at_far(self, target_far: float) -> dict:
+        """
+        Lowest threshold whose FAR is at or below target_far, with the FRR
+        paid for it.
+        """
+        fars, frrs = self.error_rates()
+        k = int(np.argmax(fars <= target_far))
+        return {"far": float(fars[k]), "frr": float(frrs[k]), "threshold": float(self.edges[k])}
@@ -1,6 +1,7 @@
 # core/model.py
 
 from speechbrain.pretrained import SpeakerRecognition
+from core.config import MODEL_SOURCE, MODEL_PATH
 
 _VERIFIER = None
 
@@ -10,8 +11,8 @@ def get_verifier():
 
     if _VERIFIER is None:
         _VERIFIER = SpeakerRecognition.from_hparams(
-            source="speechbrain/spkrec-ecapa-voxceleb",
-            savedir="pretrained_models/ecapa"
+            source=MODEL_SOURCE,
+            savedir=MODEL_PATH
         )
 
     return _VERIFIER
@@ -0,0 +1,457 @@
+# core/template_store.py
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from core.config import (
+    EMBEDDING_DIM,
+    TEMPLATE_STORE_PATH,
+    TEMPLATE_STORE_COMPACT_RATIO,
+    TEMPLATE_STORE_COMPACT_MIN_ROWS,
+)
+from core.locking import file_lock
+
+_STORE = None
+
+
+def get_template_store():
+    global _STORE
+
+    if _STORE is None:
+        _STORE = TemplateStore(TEMPLATE_STORE_PATH)
+
+    return _STORE
+
+
+class TemplateStore:
+    """
+    Append-only store of normalized speaker templates.
+
+    One generation of the store is three files:
+
+        templates_N.f32   preallocated [capacity, dim] float32 matrix, memory-mapped
+        templates_N.ids   one newline-terminated UTF-8 id per written row
+        templates_N.dead  tombstone bitmap, one bit per row
+
+    store.json names the current generation. A row becomes visible when
+    its id record is appended, which happens only after the vector is
+    flushed, so a torn write is never indexed. Replacing a speaker appends
+    a new row and then tombstones the old one; if a crash lands between
+    the two, the later row wins. Compaction writes the live rows to the
+    next generation and switches store.json in one os.replace.
+
+    Opening never modifies the store: files are mapped read-only, and a
+    torn id record or a replace that lost its tombstone is only resolved
+    in memory. Writes hold store.lock across processes; the first write of
+    a handle also persists those repairs and deletes generations other
+    than the current one, which is safe because a compaction holds the
+    same lock until store.json names its generation. Reads catch up with
+    other processes' writes and switch generation after a compaction.
+
+    Scoring a probe against every template is one matrix-vector product
+    over the written rows, with tombstoned rows masked out.
+    """
+
+    META_FILE = "store.json"
+    LOCK_FILE = "store.lock"
+
+    def __init__(
+        self,
+        path: str,
+        dim: int = EMBEDDING_DIM,
+        initial_capacity: int = 1024,
+        compact_ratio: float = TEMPLATE_STORE_COMPACT_RATIO,
+        compact_min_rows: int = TEMPLATE_STORE_COMPACT_MIN_ROWS,
+    ):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.dim = dim
+        self.compact_ratio = compact_ratio
+        self.compact_min_rows = compact_min_rows
+        self._meta_path = os.path.join(path, self.META_FILE)
+        self._lock_path = os.path.join(path, self.LOCK_FILE)
+        self._lock = threading.RLock()
+        self._write_depth = 0
+        self._writable = False
+        self._cleaned = False
+
+        if not os.path.exists(self._meta_path):
+            with file_lock(self._lock_path):
+                if not os.path.exists(self._meta_path):
+                    self._generation = 0
+                    self._create_generation(0, max(8, initial_capacity))
+                    self._save_meta()
+
+        self._reload()
+
+    # -------------------------
+    # Files
+    # -------------------------
+    def _file(self, ext: str, generation: int = None) -> str:
+        generation = self._generation if generation is None else generation
+        return os.path.join(self.path, f"templates_{generation:06d}.{ext}")
+
+    def _create_generation(self, generation: int, capacity: int):
+        with open(self._file("f32", generation), "wb") as f:
+            f.truncate(capacity * self.dim * 4)
+        with open(self._file("dead", generation), "wb") as f:
+            f.truncate(-(-capacity // 8))
+        open(self._file("ids", generation), "wb").close()
+
+    def _read_meta(self) -> dict:
+        with open(self._meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["dim"] != self.dim:
+            raise ValueError(f"Template store at {self.path} has dim {meta['dim']}, expected {self.dim}")
+        return meta
+
+    def _meta_stamp(self):
+        # os.replace gives store.json a new inode whenever the generation changes
+        st = os.stat(self._meta_path)
+        return st.st_ino, st.st_mtime_ns
+
+    def _save_meta(self):
+        tmp_path = self._meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "generation": self._generation}, f)
+        os.replace(tmp_path, self._meta_path)
+
+    def _reload(self, attempts: int = 3):
+        for attempt in range(attempts):
+            stamp = self._meta_stamp()
+            self._generation = self._read_meta()["generation"]
+            try:
+                self._load()
+            except FileNotFoundError:
+                # Compacted away by another process between the two reads
+                if attempt == attempts - 1:
+                    raise
+                continue
+            self._stamp = stamp
+            return
+
+    def _open(self):
+        # The bitmap is never shorter than the matrix needs: _grow extends it first
+        mode = "r+" if self._writable else "r"
+        self._capacity = os.path.getsize(self._file("f32")) // (self.dim * 4)
+        self._matrix = np.memmap(self._file("f32"), dtype=np.float32, mode=mode, shape=(self._capacity, self.dim))
+        self._dead = np.memmap(self._file("dead"), dtype=np.uint8, mode=mode, shape=(-(-self._capacity // 8),))
+
+    def _load(self):
+        self._open()
+        self._ids = []                                      # row -> speaker_id
+        self._rows = {}                                     # speaker_id -> live row
+        self._alive = np.zeros(self._capacity, dtype=bool)
+        self._replaced = set()                              # rows replaced but not yet tombstoned on disk
+        self._ids_offset = 0
+        self._dead_seen = np.zeros(0, dtype=np.uint8)       # bitmap as of the last _sync
+        self._sync()
+
+    def _sync(self):
+        """
+        Read id records and tombstones written since the last call. A
+        record without its newline is torn by a crash (or still being
+        written) and is left for the next writer to overwrite.
+        """
+        start = len(self._ids)
+        if os.path.getsize(self._file("ids")) != self._ids_offset:
+            with open(self._file("ids"), "rb") as f:
+                f.seek(self._ids_offset)
+                raw = f.read()
+            end = raw.rfind(b"\n") + 1
+            self._ids.extend(raw[:end].decode("utf-8").split("\n")[:-1])
+            self._ids_offset += end
+        n = len(self._ids)
+
+        if n > self._capacity:
+            # Grown by another process
+            self._open()
+        if len(self._alive) < self._capacity:
+            self._alive = np.concatenate([self._alive, np.zeros(self._capacity - len(self._alive), dtype=bool)])
+
+        # Tombstones only ever get set, so new ones are the bits not seen
+        # before (rows this handle appended were seen clear)
+        dead = np.array(self._dead[:-(-n // 8)])
+        seen = np.zeros_like(dead)
+        seen[:len(self._dead_seen)] = self._dead_seen[:len(dead)]
+        newly = dead & ~seen
+        for byte in np.flatnonzero(newly):
+            for bit in range(8):
+                row = byte * 8 + bit
+                if newly[byte] >> bit & 1 and row < start:
+                    self._drop(row)
+        self._dead_seen = dead
+
+        first = start // 8
+        bits = np.unpackbits(dead[first:], bitorder="little")
+        for row in range(start, n):
+            if bits[row - first * 8]:
+                continue
+            sid = self._ids[row]
+            previous = self._rows.get(sid)
+            if previous is not None:
+                # Replace interrupted before the old row was tombstoned
+                self._alive[previous] = False
+                self._replaced.add(previous)
+            self._rows[sid] = row
+            self._alive[row] = True
+
+    def _drop(self, row: int):
+        # A row tombstoned by another process (or already by this one)
+        self._alive[row] = False
+        self._replaced.discard(row)
+        sid = self._ids[row]
+        if self._rows.get(sid) == row:
+            del self._rows[sid]
+
+    def _refresh(self):
+        """
+        Catch up with writes made through other processes.
+        """
+        if self._meta_stamp() != self._stamp:
+            if self._read_meta()["generation"] != self._generation:
+                self._reload()
+                return
+            self._stamp = self._meta_stamp()
+        self._sync()
+
+    @contextmanager
+    def _writing(self):
+        # Thread lock, then the cross-process lock, then catch up so the
+        # next free row and the tombstones are current
+        with self._lock:
+            if self._write_depth:
+                self._write_depth += 1
+                try:
+                    yield
+                finally:
+                    self._write_depth -= 1
+                return
+            with file_lock(self._lock_path):
+                self._write_depth = 1
+                try:
+                    if not self._writable:
+                        self._writable = True
+                        self._reload()
+                    else:
+                        self._refresh()
+                    self._repair()
+                    yield
+                finally:
+                    self._write_depth = 0
+
+    def _repair(self):
+        # Writer-only cleanup of what opening found but left alone
+        if self._replaced:
+            for row in self._replaced:
+                self._tombstone(row)
+            self._dead.flush()
+            self._replaced.clear()
+        if not self._cleaned:
+            self._remove_stale_generations()
+            self._cleaned = True
+
+    def _remove_stale_generations(self):
+        for name in os.listdir(self.path):
+            if not name.startswith("templates_"):
+                continue
+            try:
+                generation = int(name[len("templates_"):].split(".")[0])
+            except ValueError:
+                continue
+            if generation != self._generation:
+                os.remove(os.path.join(self.path, name))
+
+    def _grow(self, min_capacity: int):
+        new_capacity = max(self._capacity * 2, min_capacity)
+        self._matrix.flush()
+        self._dead.flush()
+        del self._matrix, self._dead
+        with open(self._file("dead"), "r+b") as f:
+            f.truncate(-(-new_capacity // 8))
+        with open(self._file("f32"), "r+b") as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self._alive = np.concatenate([self._alive, np.zeros(new_capacity - self._capacity, dtype=bool)])
+        self._open()
+
+    def _tombstone(self, row: int):
+        self._dead[row >> 3] |= np.uint8(1 << (row & 7))
+        self._alive[row] = False
+
+    # -------------------------
+    # Writes
+    # -------------------------
+    def put(self, speaker_id: str, template):
+        self.put_many([speaker_id], [template])
+
+    def put_many(self, speaker_ids, templates):
+        """
+        Append or replace many templates with a single flush. Templates are
+        L2-normalized on the way in.
+        """
+        speaker_ids = list(speaker_ids)
+        vectors = np.asarray(templates, dtype=np.float32).reshape(len(speaker_ids), self.dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        if np.any(norms == 0) or np.isnan(norms).any():
+            raise ValueError("Invalid template norm detected")
+        vectors = vectors / norms
+
+        for sid in speaker_ids:
+            if not sid or "\n" in sid:
+                raise ValueError(f"Invalid speaker_id: {sid!r}")
+
+        with self._writing():
+            start = len(self._ids)
+            if start + len(speaker_ids) > self._capacity:
+                self._grow(start + len(speaker_ids))
+
+            # 1. Vectors, 2. id records (the commit point), 3. tombstones
+            self._matrix[start:start + len(vectors)] = vectors
+            self._matrix.flush()
+            with open(self._file("ids"), "r+b") as f:
+                # Overwrites a torn record left at the end
+                f.seek(self._ids_offset)
+                f.truncate()
+                f.write("".join(f"{sid}\n" for sid in speaker_ids).encode("utf-8"))
+                self._ids_offset = f.tell()
+
+            for offset, sid in enumerate(speaker_ids):
+                row = start + offset
+                previous = self._rows.get(sid)
+                if previous is not None:
+                    self._tombstone(previous)
+                self._ids.append(sid)
+                self._rows[sid] = row
+                self._alive[row] = True
+            self._dead.flush()
+
+            self._maybe_compact()
+
+    def delete(self, speaker_id: str) -> bool:
+        with self._writing():
+            row = self._rows.pop(speaker_id, None)
+            if row is None:
+                return False
+            self._tombstone(row)
+            self._dead.flush()
+            self._maybe_compact()
+            return True
+
+    def _maybe_compact(self):
+        dead = len(self._ids) - len(self._rows)
+        if len(self._ids) >= self.compact_min_rows and dead > self.compact_ratio * len(self._ids):
+            self.compact()
+
+    def compact(self, block: int = 65536):
+        """
+        Rewrite the live rows densely into a new generation and drop the old
+        one. Other processes switch over on their next read.
+        """
+        with self._writing():
+            live = np.flatnonzero(self._alive[:len(self._ids)])
+            old_generation, generation = self._generation, self._generation + 1
+            capacity = max(8, len(live) * 2)
+            self._create_generation(generation, capacity)
+
+            matrix = np.memmap(self._file("f32", generation), dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+            for start in range(0, len(live), block):
+                rows = live[start:start + block]
+                matrix[start:start + len(rows)] = self._matrix[rows]
+            matrix.flush()
+            del matrix
+
+            with open(self._file("ids", generation), "wb") as f:
+                f.write("".join(f"{self._ids[row]}\n" for row in live).encode("utf-8"))
+
+            del self._matrix, self._dead
+            self._generation = generation
+            self._save_meta()
+            self._reload()
+
+            for ext in ("f32", "ids", "dead"):
+                os.remove(self._file(ext, old_generation))
+
+    # -------------------------
+    # Reads
+    # -------------------------
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._rows)
+
+    def __contains__(self, speaker_id):
+        with self._lock:
+            self._refresh()
+            return speaker_id in self._rows
+
+    def ids(self) -> list:
+        with self._lock:
+            self._refresh()
+            return list(self._rows)
+
+    def get(self, speaker_id: str):
+        with self._lock:
+            self._refresh()
+            row = self._rows.get(speaker_id)
+            return None if row is None else np.array(self._matrix[row])
+
+    def vectors(self, speaker_ids) -> np.ndarray:
+        """
+        Templates [n, dim] for the given speakers, in order (KeyError for an
+        unknown speaker). Rows are read in file order.
+        """
+        with self._lock:
+            self._refresh()
+            rows = np.fromiter((self._rows[sid] for sid in speaker_ids), dtype=np.int64)
+            order = np.argsort(rows)
+            out = np.empty((len(rows), self.dim), dtype=np.float32)
+            out[order] = self._matrix[rows[order]]
+            return out
+
+    def score(self, speaker_id: str, probe) -> float:
+        """
+        Cosine score of a normalized probe against one speaker (None when
+        the speaker is not enrolled).
+        """
+        with self._lock:
+            self._refresh()
+            row = self._rows.get(speaker_id)
+            if row is None:
+                return None
+            return float(np.dot(self._matrix[row], np.asarray(probe, dtype=np.float32)))
+
+    def search(self, probe, top_k: int = 1) -> list:
+        """
+        Best-first [(speaker_id, score)] of a normalized probe against every
+        live template.
+        """
+        probe = np.asarray(probe, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            self._refresh()
+            n = len(self._ids)
+            if not self._rows or top_k <= 0:
+                return []
+            scores = self._matrix[:n] @ probe
+            scores[~self._alive[:n]] = -np.inf
+
+            k = min(top_k, len(self._rows))
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+            return [(self._ids[row], float(scores[row])) for row in best]
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refresh()
+            return {
+                "path": self.path,
+                "generation": self._generation,
+                "templates": len(self._rows),
+                "rows": len(self._ids),
+                "dead_rows": len(self._ids) - len(self._rows),
+                "capacity": self._capacity,
+                "matrix_bytes": self._capacity * self.dim * 4,
+            }
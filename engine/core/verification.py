@@ -12,3 +12,11 @@ def compare_embeddings(emb1: np.ndarray, emb2: np.ndarray) -> float:
 
     # Cosine similarity (safe because embeddings are normalized)
     return float(np.dot(emb1, emb2))
+
+
+def score_pairs(embeddings: np.ndarray, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """
+    Cosine similarity for many pairs at once: rows left[i] and right[i] of
+    a matrix of normalized embeddings, gathered and dotted in one pass.
+    """
+    return np.einsum("ij,ij->i", embeddings[left], embeddings[right])
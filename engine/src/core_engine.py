@@ -1,17 +1,37 @@
 
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+import numpy as np
+
 from src.utils.audio_loader import load_audio
 from core.validation import validate_audio
-from core.embedding import extract_embedding
-from core.verification import compare_embeddings
+from core.embedding import extract_embedding, extract_embeddings
+from core.verification import compare_embeddings, score_pairs
 from core.decision import decision_from_score
-from core.config import SIMILARITY_THRESHOLD
+from core.config import SIMILARITY_THRESHOLD, BATCH_SIZE, VERIFY_CHUNK_PAIRS, DECODE_WORKERS
+
+
+def _load_valid(filename: str, roots=None):
+    # (filename, signal, None) or (filename, None, error message)
+    try:
+        signal, sr = load_audio(filename, roots)
+        validate_audio(signal, sr)
+        return filename, signal, None
+    except Exception as e:
+        return filename, None, str(e)
 
 
 class VoiceAuthEngine:
+    def __init__(self, audio_roots=None):
+        # Directories relative filenames are resolved against (default: audio_samples)
+        self.audio_roots = audio_roots
+
     def verify(self, file1: str, file2: str) -> dict:
         # Load
-        sig1, sr1 = load_audio(file1)
-        sig2, sr2 = load_audio(file2)
+        sig1, sr1 = load_audio(file1, self.audio_roots)
+        sig2, sr2 = load_audio(file2, self.audio_roots)
 
         # Validate
         validate_audio(sig1, sr1)
@@ -32,3 +52,76 @@ class VoiceAuthEngine:
             "threshold": SIMILARITY_THRESHOLD,
             "verified": decision
         }
+
+    def verify_many(
+        self,
+        pairs,
+        batch_size: int = BATCH_SIZE,
+        workers: int = DECODE_WORKERS,
+        chunk_size: int = VERIFY_CHUNK_PAIRS,
+    ):
+        """
+        Verify an iterable of (file1, file2) pairs, yielding one result per
+        pair in input order as each chunk of chunk_size pairs completes.
+
+        Per chunk, files not seen before are decoded and validated in
+        parallel, embedded in batches of equal-length clips, and every pair
+        is scored with one gather-and-dot. Embeddings are kept for the whole
+        call (~0.8 KB per unique file), so each file is decoded and embedded
+        once however many pairs use it.
+
+        Results are the ones verify() gives, plus "file1" / "file2". A file
+        that cannot be loaded or fails validation only fails its own pairs,
+        whose results carry "error" instead of a score.
+        """
+        pairs = iter(pairs)
+        embedded = {}     # file -> normalized embedding
+        failed = {}       # file -> error message
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            while True:
+                chunk = list(islice(pairs, chunk_size))
+                if not chunk:
+                    return
+
+                # 1. Decode + validate only files not seen in earlier chunks
+                new = list(dict.fromkeys(
+                    f for pair in chunk for f in pair if f not in embedded and f not in failed
+                ))
+                loaded = list(pool.map(partial(_load_valid, roots=self.audio_roots), new))
+                failed.update({f: error for f, _, error in loaded if error is not None})
+                valid = [(f, signal) for f, signal, error in loaded if error is None]
+
+                # 2. One batched embedding pass over the new signals
+                if valid:
+                    embeddings = extract_embeddings([signal for _, signal in valid], batch_size)
+                    embedded.update(zip((f for f, _ in valid), embeddings))
+                del loaded, valid
+
+                # 3. Score every scorable pair of the chunk at once
+                scorable = [i for i, (a, b) in enumerate(chunk) if a in embedded and b in embedded]
+                scores = {}
+                if scorable:
+                    files = list(dict.fromkeys(f for i in scorable for f in chunk[i]))
+                    row = {f: j for j, f in enumerate(files)}
+                    matrix = np.stack([embedded[f] for f in files])
+                    left = np.array([row[chunk[i][0]] for i in scorable])
+                    right = np.array([row[chunk[i][1]] for i in scorable])
+                    scores = dict(zip(scorable, score_pairs(matrix, left, right)))
+
+                for i, (file1, file2) in enumerate(chunk):
+                    if i in scores:
+                        score = float(scores[i])
+                        yield {
+                            "file1": file1,
+                            "file2": file2,
+                            "score": round(score, 4),
+                            "threshold": SIMILARITY_THRESHOLD,
+                            "verified": decision_from_score(score, SIMILARITY_THRESHOLD),
+                        }
+                    else:
+                        yield {
+                            "file1": file1,
+                            "file2": file2,
+                            "error": failed.get(file1) or failed.get(file2),
+                        }
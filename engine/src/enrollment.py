@@ -1,23 +1,24 @@
-import os
 import numpy as np
 from typing import List
 
 from core.validation import validate_audio
 from core.embedding import extract_embedding
+from core.template_store import TemplateStore, get_template_store
 from src.utils.audio_loader import load_audio
 
 
 def enroll_speaker(
     speaker_id: str,
     audio_files: List[str],
-    output_dir: str = "models"
+    store: TemplateStore = None
 ):
     """
     Enroll a speaker by averaging embeddings from multiple audio samples.
 
     - Uses shared ECAPA-TDNN model
     - Enforces validation rules
-    - Stores ONLY normalized embeddings (.npy)
+    - Stores ONLY normalized embeddings, in the shared template store
+      (re-enrolling a speaker replaces their template)
     """
 
     if len(audio_files) == 0:
@@ -43,12 +44,12 @@ def enroll_speaker(
     speaker_template = speaker_template / norm
 
     # Persist template
-    os.makedirs(output_dir, exist_ok=True)
-    template_path = os.path.join(output_dir, f"{speaker_id}.npy")
-    np.save(template_path, speaker_template)
+    if store is None:
+        store = get_template_store()
+    store.put(speaker_id, speaker_template)
 
     return {
         "speaker_id": speaker_id,
         "num_samples": len(audio_files),
-        "template_path": template_path
+        "template_store": store.path
     }
@@ -1,15 +1,74 @@
 # main.py
+#
+#   python -m src.main verify enroll.wav test.wav
+#   python -m src.main trials trials.txt --root /data/voxceleb1/wav --out scores.txt --workers 8
 
-from src.core_engine import VoiceAuthEngine
+import argparse
 import logging
+import os
+
+from core.config import BATCH_SIZE
+from src.utils.audio_loader import AUDIO_DIR
+
 logging.getLogger("speechbrain").setLevel(logging.WARNING)
 
-if __name__ == "__main__":
-    engine = VoiceAuthEngine()
 
-    result = engine.verify(
-        "speaker1.wav",
-        "speaker2.wav"
+def main():
+    parser = argparse.ArgumentParser(description="Speaker verification engine")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    verify = commands.add_parser("verify", help="Verify one pair of files")
+    verify.add_argument("file1")
+    verify.add_argument("file2")
+    verify.add_argument("--root", action="append", default=None, help="Audio root for relative paths (repeatable)")
+
+    trials = commands.add_parser("trials", help="Score a trial list ('label enroll_path test_path' per line)")
+    trials.add_argument("trials")
+    trials.add_argument("--root", action="append", default=None, help="Audio root for relative paths (repeatable)")
+    trials.add_argument("--out", default=None, help="Scores file (default: <trials>.scores)")
+    trials.add_argument("--work-dir", default=None, help="Embeddings, failure log and checkpoint (default: <out>.work)")
+    trials.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Embedding processes (0 = in-process)")
+    trials.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Clips per encode_batch call")
+    trials.add_argument("--chunk-size", type=int, default=100_000, help="Trial lines scored per checkpoint")
+    trials.add_argument("--p-target", type=float, default=0.01, help="Target prior for minDCF")
+    trials.add_argument("--summary-json", default=None)
+    trials.add_argument("--restart", action="store_true", help="Discard previous progress")
+    trials.add_argument("--retry-failed", action="store_true",
+                        help="Embed files listed in failed.tsv again (e.g. after a missing mount is back)")
+
+    args = parser.parse_args()
+    roots = args.root or [AUDIO_DIR]
+
+    if args.command == "verify":
+        from core.config import SIMILARITY_THRESHOLD
+        from core.embedding import embedding_cache_stats
+        from src.core_engine import VoiceAuthEngine
+
+        result = VoiceAuthEngine(audio_roots=roots).verify(args.file1, args.file2)
+        print(f"{'VERIFIED' if result['verified'] else 'REJECTED'} (score {result['score']}, threshold {SIMILARITY_THRESHOLD})")
+
+        cache = embedding_cache_stats()
+        if cache["enabled"]:
+            print(f"Embedding cache: {cache['hits']} hits ({cache['disk_hits']} from disk), {cache['misses']} misses, "
+                  f"{cache['memory_bytes'] + cache['disk_bytes']} bytes")
+        return
+
+    from src.trials import run_trials
+
+    run_trials(
+        args.trials,
+        roots,
+        args.out or args.trials + ".scores",
+        work_dir=args.work_dir,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        chunk_size=args.chunk_size,
+        restart=args.restart,
+        retry_failed=args.retry_failed,
+        summary_path=args.summary_json,
+        p_target=args.p_target,
     )
 
-    print("VERIFIED" if result else "REJECTED")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# migrate_templates.py
+#
+# Import per-speaker {speaker_id}.npy templates into the template store:
+#   python -m src.migrate_templates --source models
+
+import argparse
+import os
+
+import numpy as np
+
+from core.config import EMBEDDING_DIM, TEMPLATE_STORE_PATH
+from core.template_store import TemplateStore
+
+
+def find_templates(source: str):
+    for name in sorted(os.listdir(source)):
+        if name.endswith(".npy") and os.path.isfile(os.path.join(source, name)):
+            yield name[:-len(".npy")], os.path.join(source, name)
+
+
+def load_template(path: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    template = np.load(path, allow_pickle=False).astype(np.float32).reshape(-1)
+    if template.shape != (dim,):
+        raise ValueError(f"expected {dim} values, found {template.size}")
+    if not np.isfinite(template).all() or not np.any(template):
+        raise ValueError("template is not finite or is all zeros")
+    return template
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import .npy speaker templates into the template store")
+    parser.add_argument("--source", default="models", help="Directory holding {speaker_id}.npy files")
+    parser.add_argument("--store", default=TEMPLATE_STORE_PATH)
+    parser.add_argument("--batch", type=int, default=10000, help="Templates appended per flush")
+    parser.add_argument("--replace", action="store_true", help="Overwrite speakers already in the store")
+    parser.add_argument("--delete-source", action="store_true", help="Remove each .npy once it is stored")
+    args = parser.parse_args(argv)
+
+    store = TemplateStore(args.store)
+    present = set(store.ids())
+    imported, skipped, failed = 0, 0, 0
+    ids, templates, paths = [], [], []
+
+    def flush():
+        nonlocal imported
+        if not ids:
+            return
+        store.put_many(ids, templates)
+        imported += len(ids)
+        if args.delete_source:
+            for path in paths:
+                os.remove(path)
+        ids.clear(), templates.clear(), paths.clear()
+
+    for speaker_id, path in find_templates(args.source):
+        if speaker_id in present and not args.replace:
+            skipped += 1
+            continue
+        try:
+            templates.append(load_template(path))
+        except Exception as e:
+            print(f"Skipping {path}: {e}")
+            failed += 1
+            continue
+        ids.append(speaker_id)
+        paths.append(path)
+        if len(ids) >= args.batch:
+            flush()
+    flush()
+
+    print(f"Imported {imported}, already present {skipped}, failed {failed}")
+    print(store.stats())
+
+
+if __name__ == "__main__":
+    main()
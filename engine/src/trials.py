@@ -0,0 +1,349 @@
+# trials.py
+#
+# Score a trial list ("label enroll_path test_path" per line) in three
+# resumable phases:
+#   1. embed every unique file once, across a process pool, into a
+#      TemplateStore keyed by path (files already stored are skipped, as
+#      are files in failed.tsv unless --retry-failed);
+#   2. score trials chunk by chunk, appending to the scores file and
+#      checkpointing (lines done, bytes written) after each chunk;
+#   3. stream the scores file into a ScoreAccumulator for EER and
+#      threshold metrics.
+
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+
+import numpy as np
+
+from core.config import EMBEDDING_DIM, SIMILARITY_THRESHOLD
+from core.evaluation import ScoreAccumulator
+from core.template_store import TemplateStore
+from core.validation import validate_audio
+from core.verification import score_pairs
+from src.utils.audio_loader import load_audio
+
+TARGET_LABELS = {"1": 1, "target": 1, "tgt": 1, "0": 0, "nontarget": 0, "imp": 0, "impostor": 0}
+
+_ROOTS = None
+
+
+# -------------------------
+# Trial list
+# -------------------------
+def parse_trial(line: str, line_no: int):
+    """
+    (label, enroll, test) for a trial line, None for a blank or comment line.
+    """
+    parts = line.split()
+    if not parts or parts[0].startswith("#"):
+        return None
+    if len(parts) != 3 or parts[0].lower() not in TARGET_LABELS:
+        raise ValueError(f"Line {line_no}: expected 'label enroll_path test_path', got {line.strip()!r}")
+    return TARGET_LABELS[parts[0].lower()], parts[1], parts[2]
+
+
+def unique_files(trials_path: str) -> list:
+    files = {}
+    with open(trials_path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            trial = parse_trial(line, line_no)
+            if trial is not None:
+                files[trial[1]] = None
+                files[trial[2]] = None
+    return list(files)
+
+
+# -------------------------
+# Phase 1: embeddings
+# -------------------------
+def _init_worker(roots, torch_threads):
+    global _ROOTS
+    _ROOTS = roots
+
+    import torch
+    torch.set_num_threads(max(1, torch_threads))
+
+
+def _cache_counts() -> dict:
+    from core.embedding import embedding_cache_stats
+
+    stats = embedding_cache_stats()
+    return {k: stats.get(k, 0) for k in ("hits", "disk_hits", "misses")}
+
+
+def _embed_batch(files):
+    """
+    (embedded paths, embeddings, [(path, error)], cache counts) for one
+    batch of files. Each worker has its own embedding cache, so the batch
+    reports how many hits and misses it added.
+    """
+    before = _cache_counts()
+    paths, embeddings, failed = _embed_signals(files)
+    after = _cache_counts()
+    return paths, embeddings, failed, {k: after[k] - before[k] for k in after}
+
+
+def _embed_signals(files):
+    from core.embedding import extract_embeddings
+
+    loaded, failed = [], []
+    for path in files:
+        try:
+            signal, sr = load_audio(path, _ROOTS)
+            validate_audio(signal, sr)
+            loaded.append((path, signal))
+        except Exception as e:
+            failed.append((path, str(e)))
+
+    if not loaded:
+        return [], np.empty((0, EMBEDDING_DIM), dtype=np.float32), failed
+
+    try:
+        return [p for p, _ in loaded], extract_embeddings([s for _, s in loaded]), failed
+    except Exception:
+        # Isolate the clip that broke the batch
+        paths, embeddings = [], []
+        for path, signal in loaded:
+            try:
+                embeddings.append(extract_embeddings([signal])[0])
+                paths.append(path)
+            except Exception as e:
+                failed.append((path, str(e)))
+        return paths, np.asarray(embeddings, dtype=np.float32).reshape(-1, EMBEDDING_DIM), failed
+
+
+def read_failures(path: str) -> dict:
+    failures = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if "\t" in line:
+                    file, error = line.rstrip("\n").split("\t", 1)
+                    failures[file] = error
+    return failures
+
+
+def embed_files(files, store: TemplateStore, failures_path: str, roots, workers: int, batch_size: int,
+                retry_failed: bool = False):
+    """
+    Embed every file not already in the store or the failure log. With
+    retry_failed, files in the failure log are tried again and the log
+    is rewritten. With workers=0 batches run in this process.
+    """
+    failures = {} if retry_failed else read_failures(failures_path)
+    stored = set(store.ids())
+    todo = [f for f in files if f not in stored and f not in failures]
+    if not todo:
+        return failures
+
+    batches = [todo[i:i + batch_size] for i in range(0, len(todo), batch_size)]
+    print(f"Embedding {len(todo)} files ({len(files) - len(todo)} already done) in {len(batches)} batches")
+    started = time.perf_counter()
+
+    cache = {"hits": 0, "disk_hits": 0, "misses": 0}
+    with open(failures_path, "w" if retry_failed else "a", encoding="utf-8") as log:
+        def collect(paths, embeddings, failed, cache_counts):
+            for k in cache:
+                cache[k] += cache_counts[k]
+            if paths:
+                store.put_many(paths, embeddings)
+            for path, error in failed:
+                failures[path] = error
+                log.write(f"{path}\t{' '.join(error.split())}\n")
+            log.flush()
+
+        if workers <= 0:
+            _init_worker(roots, os.cpu_count() or 1)
+            results = (_embed_batch(batch) for batch in batches)
+            for done, result in enumerate(results, 1):
+                collect(*result)
+                _progress(done, len(batches), started)
+        else:
+            torch_threads = (os.cpu_count() or 1) // workers
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(roots, torch_threads)) as pool:
+                futures = [pool.submit(_embed_batch, batch) for batch in batches]
+                for done, future in enumerate(as_completed(futures), 1):
+                    collect(*future.result())
+                    _progress(done, len(batches), started)
+
+    if cache["hits"] or cache["misses"]:
+        print(f"Embedding cache: {cache['hits']} hits ({cache['disk_hits']} from disk), {cache['misses']} misses")
+    return failures
+
+
+def _progress(done: int, total: int, started: float):
+    if done == total or done % 100 == 0:
+        elapsed = time.perf_counter() - started
+        print(f"  {done}/{total} batches, {elapsed:.0f}s elapsed, ~{elapsed / done * (total - done):.0f}s left")
+
+
+# -------------------------
+# Phase 2: scoring
+# -------------------------
+def _load_checkpoint(path: str, trials_path: str) -> dict:
+    identity = {"trials": os.path.abspath(trials_path), "trials_bytes": os.path.getsize(trials_path)}
+    if not os.path.exists(path):
+        return {**identity, "lines_done": 0, "out_bytes": 0}
+
+    with open(path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    if {k: state.get(k) for k in identity} != identity:
+        raise ValueError(f"{path} belongs to a different trial list; rerun with --restart")
+    return state
+
+
+def _save_checkpoint(path: str, state: dict):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def score_trials(trials_path: str, store: TemplateStore, out_path: str, checkpoint_path: str, chunk_size: int):
+    """
+    Append "label enroll test score" lines to out_path ("nan" when either
+    file could not be embedded), resuming after the last checkpoint.
+    """
+    state = _load_checkpoint(checkpoint_path, trials_path)
+    if state["lines_done"]:
+        print(f"Resuming after line {state['lines_done']}")
+
+    with open(trials_path, "r", encoding="utf-8") as trials, open(out_path, "ab") as out:
+        # Anything written after the last checkpoint is redone
+        out.truncate(state["out_bytes"])
+        lines = islice(trials, state["lines_done"], None)
+        line_no = state["lines_done"]
+        started = time.perf_counter()
+        scored = 0
+        stored = set(store.ids())
+
+        while True:
+            block = list(islice(lines, chunk_size))
+            if not block:
+                break
+
+            chunk = []
+            for line in block:
+                line_no += 1
+                trial = parse_trial(line, line_no)
+                if trial is not None:
+                    chunk.append(trial)
+
+            files = list(dict.fromkeys(f for _, enroll, test in chunk for f in (enroll, test) if f in stored))
+            row = {f: i for i, f in enumerate(files)}
+            scorable = [i for i, (_, enroll, test) in enumerate(chunk) if enroll in row and test in row]
+            scores = np.full(len(chunk), np.nan, dtype=np.float32)
+            if scorable:
+                left = np.array([row[chunk[i][1]] for i in scorable])
+                right = np.array([row[chunk[i][2]] for i in scorable])
+                scores[scorable] = score_pairs(store.vectors(files), left, right)
+
+            out.write("".join(
+                f"{label} {enroll} {test} {score:.6f}\n" for (label, enroll, test), score in zip(chunk, scores)
+            ).encode("utf-8"))
+            out.flush()
+            os.fsync(out.fileno())
+
+            state.update(lines_done=line_no, out_bytes=out.tell())
+            _save_checkpoint(checkpoint_path, state)
+
+            scored += len(chunk)
+            elapsed = time.perf_counter() - started
+            print(f"  {line_no} lines done ({scored / max(elapsed, 1e-9):.0f} trials/s)")
+
+
+# -------------------------
+# Phase 3: summary
+# -------------------------
+def summarize(scores_path: str, threshold: float = SIMILARITY_THRESHOLD, p_target: float = 0.01,
+              block_lines: int = 1_000_000) -> dict:
+    acc = ScoreAccumulator()
+    unscored = 0
+    with open(scores_path, "r", encoding="utf-8") as f:
+        while True:
+            block = list(islice(f, block_lines))
+            if not block:
+                break
+            parts = [line.split() for line in block]
+            labels = np.array([int(p[0]) for p in parts], dtype=np.int8)
+            scores = np.array([float(p[3]) for p in parts], dtype=np.float64)
+            valid = ~np.isnan(scores)
+            unscored += int((~valid).sum())
+            acc.add(scores[valid], labels[valid])
+
+    eer, eer_threshold = acc.eer()
+    min_dcf, dcf_threshold = acc.min_dcf(p_target=p_target)
+    return {
+        "targets": acc.num_targets,
+        "nontargets": acc.num_nontargets,
+        "unscored": unscored,
+        "eer": eer,
+        "eer_threshold": eer_threshold,
+        "at_threshold": acc.metrics(threshold),
+        "at_far_1pct": acc.threshold_at_far(0.01),
+        "at_far_0_1pct": acc.threshold_at_far(0.001),
+        "min_dcf": min_dcf,
+        "min_dcf_threshold": dcf_threshold,
+        "p_target": p_target,
+    }
+
+
+def print_summary(summary: dict):
+    print("\n--- Results ---")
+    print(f"Trials: {summary['targets']} target, {summary['nontargets']} non-target, {summary['unscored']} unscored")
+    print(f"EER: {summary['eer']:.4f} at threshold {summary['eer_threshold']:.4f}")
+    for name, label in (("at_threshold", "At configured threshold"), ("at_far_1pct", "At FAR 1%"),
+                        ("at_far_0_1pct", "At FAR 0.1%")):
+        m = summary[name]
+        print(f"{label}: threshold {m['threshold']:.4f}, FAR={m['far']:.4f}, FRR={m['frr']:.4f}")
+    print(f"minDCF (p_target={summary['p_target']}): {summary['min_dcf']:.4f} at {summary['min_dcf_threshold']:.4f}")
+
+
+# -------------------------
+# Entry point
+# -------------------------
+def run_trials(trials_path: str, roots, out_path: str, work_dir: str = None, workers: int = 1,
+               batch_size: int = 32, chunk_size: int = 100_000, restart: bool = False,
+               retry_failed: bool = False, summary_path: str = None, p_target: float = 0.01) -> dict:
+    work_dir = work_dir or out_path + ".work"
+    checkpoint_path = os.path.join(work_dir, "checkpoint.json")
+    if restart:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if os.path.exists(out_path):
+            os.remove(out_path)
+    os.makedirs(work_dir, exist_ok=True)
+    # A scores file with no checkpoint is from an unrelated run
+    if not os.path.exists(checkpoint_path) and os.path.exists(out_path):
+        os.remove(out_path)
+
+    files = unique_files(trials_path)
+    print(f"{len(files)} unique files in {trials_path}")
+
+    store = TemplateStore(os.path.join(work_dir, "embeddings"))
+    failures_path = os.path.join(work_dir, "failed.tsv")
+    previous_failures = read_failures(failures_path) if retry_failed else {}
+    failures = embed_files(files, store, failures_path, roots, workers, batch_size, retry_failed)
+    if failures:
+        print(f"{len(failures)} files could not be embedded (see {failures_path})")
+
+    recovered = len(previous_failures.keys() - failures.keys())
+    if recovered and os.path.exists(checkpoint_path):
+        # Lines already scored have "nan" for these files; scoring is cheap next to embedding
+        print(f"{recovered} previously failed files embedded; rescoring all trials")
+        os.remove(checkpoint_path)
+        if os.path.exists(out_path):
+            os.remove(out_path)
+
+    score_trials(trials_path, store, out_path, checkpoint_path, chunk_size)
+
+    summary = summarize(out_path, p_target=p_target)
+    print_summary(summary)
+    if summary_path:
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    return summary
@@ -9,16 +9,33 @@ AUDIO_DIR = os.path.join(PROJECT_ROOT, "audio_samples")
 
 TARGET_SAMPLE_RATE = 16000
 
-def load_audio(filename: str):
-    path = os.path.join(AUDIO_DIR, filename)
 
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"Audio file not found: {path}")
+def resolve_audio_path(filename: str, roots=None) -> str:
+    """
+    Absolute paths are used as given; relative ones are looked up under
+    each root in turn (default: the bundled audio_samples directory).
+    """
+    if os.path.isabs(filename):
+        if os.path.exists(filename):
+            return filename
+        raise FileNotFoundError(f"Audio file not found: {filename}")
+
+    roots = roots or [AUDIO_DIR]
+    for root in roots:
+        path = os.path.join(root, filename)
+        if os.path.exists(path):
+            return path
+
+    raise FileNotFoundError(f"Audio file not found: {filename} (searched {', '.join(roots)})")
+
+
+def load_audio(filename: str, roots=None):
+    path = resolve_audio_path(filename, roots)
 
     # Always load and resample to 16kHz
     signal, sr = librosa.load(
         path,
-        sr=TARGET_SAMPLE_RATE,   
+        sr=TARGET_SAMPLE_RATE,
         mono=True
     )
 
@@ -0,0 +1,71 @@
+import sys
+import os
+import numpy as np
+import soundfile as sf
+import torch
+
+# Adjust path to find engine modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import core.embedding as embedding
+from core.config import EMBEDDING_DIM
+from core.embedding_cache import EmbeddingCache
+from src.core_engine import VoiceAuthEngine
+
+
+class _FakeVerifier:
+    """
+    Deterministic stand-in for ECAPA. Like the real model, a clip's
+    embedding depends on any padding after it.
+    """
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def encode_batch(self, wavs, wav_lens=None):
+        self.batch_sizes.append(len(wavs))
+        t = torch.arange(wavs.shape[1], dtype=torch.float32) / wavs.shape[1]
+        basis = torch.cos(torch.outer(torch.arange(1, EMBEDDING_DIM + 1, dtype=torch.float32), t))
+        return (wavs @ basis.T + 1.0).unsqueeze(1)
+
+
+def _write_clips(root, seconds):
+    rng = np.random.default_rng(0)
+    names = []
+    for i, s in enumerate(seconds):
+        name = f"clip_{i}.wav"
+        sf.write(os.path.join(root, name), rng.normal(0, 0.1, int(16000 * s)).astype(np.float32), 16000)
+        names.append(name)
+    return names
+
+
+def test_verify_many_matches_verify(tmp_path, monkeypatch):
+    verifier = _FakeVerifier()
+    monkeypatch.setattr(embedding, "get_verifier", lambda: verifier)
+    names = _write_clips(str(tmp_path), [3.0, 3.0, 3.5, 4.0, 3.0])
+    pairs = [(names[0], names[1]), (names[1], names[2]), (names[3], names[4]),
+             (names[2], names[0]), (names[0], "missing.wav")]
+    engine = VoiceAuthEngine(audio_roots=[str(tmp_path)])
+
+    monkeypatch.setattr(embedding, "_CACHE", EmbeddingCache("test", dim=EMBEDDING_DIM))
+    batched = list(engine.verify_many(pairs, batch_size=8, workers=2))
+
+    # The three 3 s clips share one batch; the others run alone
+    assert sorted(verifier.batch_sizes) == [1, 1, 3]
+
+    monkeypatch.setattr(embedding, "_CACHE", EmbeddingCache("test", dim=EMBEDDING_DIM))
+    for (file1, file2), result in zip(pairs[:-1], batched):
+        single = engine.verify(file1, file2)
+        assert result == {"file1": file1, "file2": file2, **single}
+    assert "error" in batched[-1] and "score" not in batched[-1]
+
+
+def test_batched_embeddings_equal_single_clip_embeddings(monkeypatch):
+    monkeypatch.setattr(embedding, "get_verifier", lambda: _FakeVerifier())
+    monkeypatch.setattr(embedding, "_CACHE", None)
+    rng = np.random.default_rng(1)
+    signals = [rng.normal(size=n).astype(np.float32) for n in (800, 800, 1200, 800, 1000)]
+
+    batched = embedding.extract_embeddings(signals, batch_size=2)
+    for signal, emb in zip(signals, batched):
+        np.testing.assert_allclose(emb, embedding.extract_embedding(signal), rtol=1e-5, atol=1e-6)
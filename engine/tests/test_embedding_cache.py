@@ -0,0 +1,31 @@
+import sys
+import os
+import numpy as np
+
+# Adjust path to find engine modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import core.embedding as embedding
+from core.config import EMBEDDING_DIM
+from core.embedding_cache import EmbeddingCache
+from test_core_engine import _FakeVerifier
+
+
+def test_engine_reports_cache_stats(monkeypatch):
+    verifier = _FakeVerifier()
+    monkeypatch.setattr(embedding, "get_verifier", lambda: verifier)
+    monkeypatch.setattr(embedding, "_CACHE", EmbeddingCache("test", dim=EMBEDDING_DIM))
+    signal = np.random.default_rng(0).normal(size=48000).astype(np.float32)
+
+    first = embedding.extract_embedding(signal)
+    second = embedding.extract_embeddings([signal, signal])
+
+    np.testing.assert_array_equal(second[0], first)
+    assert len(verifier.batch_sizes) == 1
+    stats = embedding.embedding_cache_stats()
+    assert stats["enabled"] and (stats["hits"], stats["misses"]) == (2, 1)
+    assert stats["memory_entries"] == 1 and stats["model_id"] == "test"
+
+    monkeypatch.setattr(embedding, "EMBEDDING_CACHE_ENABLED", False)
+    monkeypatch.setattr(embedding, "_CACHE", None)
+    assert embedding.embedding_cache_stats() == {"enabled": False}
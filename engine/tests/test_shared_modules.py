@@ -0,0 +1,19 @@
+import sys
+import os
+import pytest
+
+# Adjust path to find engine modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+ENGINE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BACKEND_DIR = os.path.join(ENGINE_DIR, "..", "backend")
+
+
+@pytest.mark.parametrize("module", ["core/embedding_cache.py", "core/evaluation.py", "core/locking.py"])
+def test_module_matches_the_backends_copy(module):
+    # The engine and backend do not import each other, so these modules are
+    # copied; a change to one must be made to both
+    with open(os.path.join(ENGINE_DIR, module), "rb") as f:
+        engine_copy = f.read()
+    with open(os.path.join(BACKEND_DIR, module), "rb") as f:
+        assert f.read() == engine_copy
@@ -0,0 +1,134 @@
+import sys
+import os
+import numpy as np
+import pytest
+
+# Adjust path to find engine modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.locking import file_lock
+from core.template_store import TemplateStore
+from src import migrate_templates
+
+DIM = 4
+
+
+def _unit(*values):
+    v = np.asarray(values, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+def _snapshot(path):
+    out = {}
+    for name in sorted(os.listdir(path)):
+        with open(os.path.join(path, name), "rb") as f:
+            out[name] = f.read()
+    return out
+
+
+def test_put_replace_delete_search_and_reopen(tmp_path):
+    store = TemplateStore(str(tmp_path), dim=DIM, initial_capacity=2)
+    store.put_many(["a", "b", "c"], [[1, 0, 0, 0], [0, 2, 0, 0], [0, 0, 3, 0]])   # grows past 2
+    store.put("b", [0, 0, 0, 5])
+    assert store.delete("c") and not store.delete("c")
+
+    assert sorted(store.ids()) == ["a", "b"]
+    np.testing.assert_allclose(store.get("b"), _unit(0, 0, 0, 1))
+    assert store.search(_unit(0, 0, 1, 1), top_k=5) == [("b", pytest.approx(0.7071, abs=1e-4)),
+                                                        ("a", 0.0)]
+    np.testing.assert_allclose(store.vectors(["b", "a"]), [_unit(0, 0, 0, 1), _unit(1, 0, 0, 0)])
+
+    reopened = TemplateStore(str(tmp_path), dim=DIM)
+    assert sorted(reopened.ids()) == ["a", "b"] and reopened.score("c", _unit(1, 0, 0, 0)) is None
+    assert reopened.stats()["dead_rows"] == 2
+
+
+def test_opening_never_modifies_the_store(tmp_path):
+    store = TemplateStore(str(tmp_path), dim=DIM, initial_capacity=8)
+    store.put_many(["a", "b"], [[1, 0, 0, 0], [0, 1, 0, 0]])
+
+    # A replace of "a" that crashed before its tombstone, a torn record
+    # after it, and a generation a running compaction is still writing
+    store._matrix[2] = _unit(0, 0, 1, 0)
+    store._matrix.flush()
+    with open(os.path.join(tmp_path, "templates_000000.ids"), "ab") as f:
+        f.write(b"a\nhalf-writ")
+    for ext in ("f32", "ids", "dead"):
+        (tmp_path / f"templates_000001.{ext}").write_bytes(b"")
+    before = _snapshot(tmp_path)
+
+    with file_lock(os.path.join(tmp_path, TemplateStore.LOCK_FILE)):
+        reader = TemplateStore(str(tmp_path), dim=DIM)
+        assert sorted(reader.ids()) == ["a", "b"]
+        np.testing.assert_allclose(reader.get("a"), _unit(0, 0, 1, 0))
+        # The replaced row (a = [1, 0, 0, 0]) is not searched
+        assert [score for _, score in reader.search(_unit(1, 0, 0, 0), top_k=3)] == [0.0, 0.0]
+    assert _snapshot(tmp_path) == before
+
+    # The first write repairs what opening left alone
+    reader.put("c", [0, 0, 0, 1])
+    ids_file = (tmp_path / "templates_000000.ids").read_bytes()
+    assert ids_file == b"a\nb\na\nc\n"
+    assert not any(name.startswith("templates_000001") for name in os.listdir(tmp_path))
+    assert TemplateStore(str(tmp_path), dim=DIM).stats()["dead_rows"] == 1
+
+
+def test_handles_follow_each_others_writes_and_compactions(tmp_path):
+    a = TemplateStore(str(tmp_path), dim=DIM, compact_min_rows=1000)
+    b = TemplateStore(str(tmp_path), dim=DIM, compact_min_rows=1000)
+
+    a.put_many([f"s{i}" for i in range(20)], np.eye(DIM)[np.arange(20) % DIM] + 0.1)
+    assert len(b) == 20
+    assert b.delete("s0") and "s0" not in a
+    b.put("s1", [0, 0, 0, 1])
+    np.testing.assert_allclose(a.get("s1"), _unit(0, 0, 0, 1))
+
+    # a writes after b's tombstones, without bringing back what b removed
+    a.put("new", [1, 1, 1, 1])
+    a.compact()
+    assert a.stats()["generation"] == 1 and a.stats()["dead_rows"] == 0
+    assert sorted(b.ids()) == sorted(a.ids()) and "s0" not in b and len(b) == 20
+    np.testing.assert_allclose(b.get("s1"), _unit(0, 0, 0, 1))
+    assert sorted(os.listdir(tmp_path)) == [
+        "store.json", "store.lock", "templates_000001.dead", "templates_000001.f32", "templates_000001.ids",
+    ]
+
+
+def test_compaction_starts_once_dead_rows_pass_the_ratio(tmp_path):
+    store = TemplateStore(str(tmp_path), dim=DIM, compact_ratio=0.25, compact_min_rows=8)
+    store.put_many([f"s{i}" for i in range(8)], np.ones((8, DIM)))
+    store.delete("s0")
+    store.delete("s1")
+    assert store.stats()["generation"] == 0
+    store.delete("s2")                                  # 3 of 8 dead
+    stats = store.stats()
+    assert stats["generation"] == 1 and (stats["rows"], stats["templates"]) == (5, 5)
+
+
+def test_migration_imports_npy_templates(tmp_path, capsys, monkeypatch):
+    source, store_path = tmp_path / "models", str(tmp_path / "store")
+    source.mkdir()
+    np.save(source / "alice.npy", np.array([3.0, 0, 0, 0], dtype=np.float32))
+    np.save(source / "bob.npy", np.array([[0, 1.0, 0, 0]], dtype=np.float32))
+    np.save(source / "short.npy", np.ones(3, dtype=np.float32))
+    np.save(source / "zero.npy", np.zeros(4, dtype=np.float32))
+    (source / "notes.txt").write_text("not a template")
+
+    load_template = migrate_templates.load_template
+    monkeypatch.setattr(migrate_templates, "load_template", lambda path: load_template(path, DIM))
+    monkeypatch.setattr(migrate_templates, "TemplateStore", lambda path: TemplateStore(path, dim=DIM))
+
+    migrate_templates.main(["--source", str(source), "--store", store_path, "--batch", "1"])
+    assert "Imported 2, already present 0, failed 2" in capsys.readouterr().out
+
+    # Re-runs skip what is stored unless --replace
+    np.save(source / "alice.npy", np.array([0, 0, 1.0, 0], dtype=np.float32))
+    migrate_templates.main(["--source", str(source), "--store", store_path])
+    assert "Imported 0, already present 2, failed 2" in capsys.readouterr().out
+    migrate_templates.main(["--source", str(source), "--store", store_path, "--replace", "--delete-source"])
+    assert "Imported 2, already present 0, failed 2" in capsys.readouterr().out
+
+    store = TemplateStore(store_path, dim=DIM)
+    assert sorted(store.ids()) == ["alice", "bob"]
+    np.testing.assert_allclose(store.get("alice"), _unit(0, 0, 1, 0))
+    assert sorted(os.listdir(source)) == ["notes.txt", "short.npy", "zero.npy"]
@@ -0,0 +1,112 @@
+import sys
+import os
+import json
+import shutil
+import numpy as np
+import pytest
+
+# Adjust path to find engine modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import core.embedding as embedding
+from core.template_store import TemplateStore
+from src import trials
+from test_core_engine import _FakeVerifier, _write_clips
+
+
+@pytest.fixture
+def verifier(monkeypatch):
+    fake = _FakeVerifier()
+    monkeypatch.setattr(embedding, "get_verifier", lambda: fake)
+    monkeypatch.setattr(embedding, "EMBEDDING_CACHE_ENABLED", False)
+    monkeypatch.setattr(embedding, "_CACHE", None)
+    return fake
+
+
+def _trial_list(path, names):
+    a, b, c, d = names
+    path.write_text("\n".join([
+        "# label enroll test",
+        f"1 {a} {b}",
+        f"target {a} {a}",
+        f"0 {a} {c}",
+        "",
+        f"imp {b} missing.wav",
+        f"0 {c} {d}",
+        f"1 {d} {c}",
+    ]) + "\n")
+    return str(path)
+
+
+def _run(trials_path, root, out, **kwargs):
+    return trials.run_trials(trials_path, [root], out, workers=0, batch_size=2, chunk_size=2, **kwargs)
+
+
+def test_parse_trial():
+    assert trials.parse_trial("1 a.wav b.wav\n", 1) == (1, "a.wav", "b.wav")
+    assert trials.parse_trial("Nontarget a.wav b.wav", 1) == (0, "a.wav", "b.wav")
+    assert trials.parse_trial("  \n", 2) is None and trials.parse_trial("# header", 3) is None
+    with pytest.raises(ValueError, match="Line 4"):
+        trials.parse_trial("maybe a.wav b.wav", 4)
+
+
+def test_run_scores_every_trial_and_summarizes(tmp_path, verifier):
+    root = str(tmp_path)
+    names = _write_clips(root, [3.0, 3.0, 3.5, 4.0])
+    trials_path = _trial_list(tmp_path / "trials.txt", names)
+    out = str(tmp_path / "scores.txt")
+
+    summary = _run(trials_path, root, out, summary_path=str(tmp_path / "summary.json"))
+
+    lines = [line.split() for line in open(out)]
+    assert [line[:3] for line in lines] == [
+        ["1", names[0], names[1]], ["1", names[0], names[0]], ["0", names[0], names[2]],
+        ["0", names[1], "missing.wav"], ["0", names[2], names[3]], ["1", names[3], names[2]],
+    ]
+    scores = [float(line[3]) for line in lines]
+    assert scores[1] == pytest.approx(1.0) and np.isnan(scores[3])
+    assert scores[4] == scores[5]
+
+    assert (summary["targets"], summary["nontargets"], summary["unscored"]) == (3, 2, 1)
+    assert json.load(open(tmp_path / "summary.json")) == summary
+    assert set(trials.read_failures(str(tmp_path / "scores.txt.work" / "failed.tsv"))) == {"missing.wav"}
+
+
+def test_resume_redoes_only_unfinished_work(tmp_path, verifier):
+    root = str(tmp_path)
+    names = _write_clips(root, [3.0, 3.0, 3.5, 4.0])
+    trials_path = _trial_list(tmp_path / "trials.txt", names)
+    out = str(tmp_path / "scores.txt")
+    _run(trials_path, root, out)
+    expected = open(out).read()
+
+    # Interrupted after the first chunk, mid-way through writing the second
+    work = tmp_path / "scores.txt.work"
+    first_chunk = "".join(expected.splitlines(keepends=True)[:2])
+    (work / "checkpoint.json").write_text(json.dumps({
+        **json.load(open(work / "checkpoint.json")), "lines_done": 3, "out_bytes": len(first_chunk.encode()),
+    }))
+    with open(out, "w") as f:
+        f.write(first_chunk + "0 half-writ")
+
+    verifier.batch_sizes.clear()
+    _run(trials_path, root, out)
+    assert open(out).read() == expected
+    assert verifier.batch_sizes == []                   # nothing re-embedded
+
+
+def test_retry_failed_embeds_files_that_failed_before(tmp_path, verifier):
+    root = str(tmp_path)
+    names = _write_clips(root, [3.0, 3.0, 3.5, 4.0])
+    trials_path = _trial_list(tmp_path / "trials.txt", names)
+    out = str(tmp_path / "scores.txt")
+    _run(trials_path, root, out)
+
+    # The file shows up (a mount came back); without the flag it stays skipped
+    shutil.copy(os.path.join(root, names[2]), os.path.join(root, "missing.wav"))
+    assert _run(trials_path, root, out)["unscored"] == 1
+
+    summary = _run(trials_path, root, out, retry_failed=True)
+    assert summary["unscored"] == 0 and summary["nontargets"] == 3
+    assert trials.read_failures(str(tmp_path / "scores.txt.work" / "failed.tsv")) == {}
+    assert "missing.wav" in TemplateStore(str(tmp_path / "scores.txt.work" / "embeddings"))
@@ -6,29 +6,45 @@
 
 const BASE_URL = 'http://127.0.0.1:8000';
 
+// Users per page requested from the keyset-paginated /users endpoint
+const USERS_PAGE_SIZE = 500;
+
 /**
  * Fetches all registered users from the database.
  * Requires admin authentication token.
  * 
+ * The backend returns one page at a time and sends the cursor for the
+ * next page in the X-Next-Cursor header; pages are followed until none remain.
+ * 
  * @param {string} authToken - JWT authentication token from admin login
  * @returns {Promise<Array>} List of registered users with their details
  * @throws {Error} If request fails or token is invalid
  */
 export const fetchRegisteredUsers = async (authToken) => {
     try {
-        const response = await fetch(`${BASE_URL}/users`, {
-            method: 'GET',
-            headers: {
-                // JWT Bearer token for admin authentication
-                'Authorization': `Bearer ${authToken}`
+        const userList = [];
+        let cursor = null;
+
+        do {
+            const params = new URLSearchParams({ limit: USERS_PAGE_SIZE });
+            if (cursor) params.set('cursor', cursor);
+
+            const response = await fetch(`${BASE_URL}/users?${params}`, {
+                method: 'GET',
+                headers: {
+                    // JWT Bearer token for admin authentication
+                    'Authorization': `Bearer ${authToken}`
+                }
+            });
+
+            if (!response.ok) {
+                throw new Error(`Failed to fetch users: ${response.statusText}`);
             }
-        });
 
-        if (!response.ok) {
-            throw new Error(`Failed to fetch users: ${response.statusText}`);
-        }
+            userList.push(...await response.json());
+            cursor = response.headers.get('X-Next-Cursor');
+        } while (cursor);
 
-        const userList = await response.json();
         return userList;
     } catch (error) {
         console.error('Admin: Failed to retrieve user list:', error);
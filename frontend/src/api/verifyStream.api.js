@@ -0,0 +1,98 @@
+/**
+ * API Service for Streaming Voice Verification
+ * Streams microphone audio to the backend over a WebSocket while the user
+ * is speaking, so a decision can arrive before they stop recording.
+ */
+
+const WS_URL = 'ws://127.0.0.1:8000/ws/verify';
+
+// The backend expects 16 kHz mono 16-bit PCM
+const SAMPLE_RATE = 16000;
+const FRAME_SIZE = 4096;
+
+/**
+ * Converts Float32 samples in [-1, 1] to little-endian 16-bit PCM.
+ */
+const floatTo16BitPCM = (samples) => {
+  const pcm = new Int16Array(samples.length);
+  for (let i = 0; i < samples.length; i++) {
+    const s = Math.max(-1, Math.min(1, samples[i]));
+    pcm[i] = s < 0 ? s * 32768 : s * 32767;
+  }
+  return pcm.buffer;
+};
+
+/**
+ * Opens a streaming verification session on an active microphone stream.
+ *
+ * @param {string} userId - Speaker ID to verify against (1:N search if empty)
+ * @param {MediaStream} mediaStream - Live microphone stream (from useRecorder)
+ * @param {Object} handlers
+ * @param {Function} handlers.onPartial - Called with each rolling-window score
+ * @returns {Object} Session controls
+ * @returns {Promise<Object>} session.decision - Resolves with the final decision
+ *          (same fields as /verify, plus `early` and `seconds`)
+ * @returns {Function} session.finish - Tells the server the user stopped speaking
+ * @returns {Function} session.close - Tears down audio capture and the socket
+ */
+export const openVerificationStream = (userId, mediaStream, { onPartial } = {}) => {
+  const url = userId ? `${WS_URL}?speaker_id=${encodeURIComponent(userId)}` : WS_URL;
+  const socket = new WebSocket(url);
+  socket.binaryType = 'arraybuffer';
+
+  // Let the browser resample the microphone to 16 kHz
+  const audioCtx = new (window.AudioContext || window.webkitAudioContext)({ sampleRate: SAMPLE_RATE });
+  const source = audioCtx.createMediaStreamSource(mediaStream);
+  const processor = audioCtx.createScriptProcessor(FRAME_SIZE, 1, 1);
+
+  const close = () => {
+    processor.disconnect();
+    source.disconnect();
+    if (audioCtx.state !== 'closed') audioCtx.close();
+    if (socket.readyState === WebSocket.OPEN) socket.close();
+  };
+
+  const decision = new Promise((resolve, reject) => {
+    socket.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      if (message.type === 'partial') {
+        if (onPartial) onPartial(message);
+      } else if (message.type === 'decision') {
+        close();
+        resolve(message);
+      } else if (message.type === 'error') {
+        close();
+        reject(new Error(message.message));
+      }
+    };
+    socket.onerror = () => {
+      close();
+      reject(new Error('Verification stream failed'));
+    };
+    socket.onclose = () => reject(new Error('Verification stream closed before a decision'));
+  });
+
+  // Audio captured before the socket opens is held and sent on connect
+  const pending = [];
+  socket.onopen = () => {
+    pending.forEach(chunk => socket.send(chunk));
+    pending.length = 0;
+  };
+
+  processor.onaudioprocess = (event) => {
+    const chunk = floatTo16BitPCM(event.inputBuffer.getChannelData(0));
+    if (socket.readyState === WebSocket.OPEN) {
+      socket.send(chunk);
+    } else if (socket.readyState === WebSocket.CONNECTING) {
+      pending.push(chunk);
+    }
+  };
+  source.connect(processor);
+  processor.connect(audioCtx.destination);
+
+  const finish = () => {
+    if (socket.readyState === WebSocket.OPEN) socket.send('end');
+  };
+
+  return { decision, finish, close };
+};
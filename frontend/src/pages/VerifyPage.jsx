@@ -1,7 +1,8 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useRecorder } from '../audio/useRecorder';
 import { useWaveformAnalyzer } from '../audio/useWaveformAnalyzer';
 import { authenticateVoiceSample } from '../api/verify.api';
+import { openVerificationStream } from '../api/verifyStream.api';
 import { useToast } from '../context/ToastContext';
 import { VERIFICATION_PARAGRAPH } from '../data/phonetics';
 
@@ -32,6 +33,13 @@ const VerifyPage = () => {
   const { isRecording, stream, startRecording, stopRecording } = useRecorder();
   const audioData = useWaveformAnalyzer(stream);
 
+  // Streaming verification session for the current recording.
+  // If it fails, the full recording is uploaded to /verify on stop instead.
+  const verificationStream = useRef(null);
+  const streamFailed = useRef(false);
+  // Recording stopped while the stream was still deciding, kept for the fallback upload
+  const stoppedRecording = useRef(null);
+
   /**
    * Adds a new log entry to the terminal display.
    * Keeps only the most recent 20 logs to prevent memory bloat.
@@ -52,6 +60,47 @@ const VerifyPage = () => {
     return () => clearTimeout(timer);
   }, []);
 
+  // Open a streaming session as soon as the microphone is live, so the
+  // backend can decide while the user is still speaking
+  useEffect(() => {
+    if (!isRecording || !stream || verificationStream.current) return;
+
+    const session = openVerificationStream(targetUserId, stream, {
+      onPartial: (partial) => {
+        setSimilarityScore(partial.similarity_score);
+        appendTerminalLog(`PARTIAL MATCH @ ${partial.seconds.toFixed(1)}s: ${(partial.similarity_score * 100).toFixed(2)}%`);
+      }
+    });
+    verificationStream.current = session;
+    streamFailed.current = false;
+
+    session.decision
+      .then(async (result) => {
+        if (result.early) {
+          appendTerminalLog(`EARLY DECISION AFTER ${result.seconds.toFixed(1)}s`);
+          setVerificationStatus('processing');
+          // The recorder may already be stopping if the user pressed stop meanwhile
+          await stopRecording().catch(() => null);
+        }
+        verificationStream.current = null;
+        stoppedRecording.current = null;
+        presentVerificationResult(result);
+      })
+      .catch((error) => {
+        streamFailed.current = true;
+        const audioBlob = stoppedRecording.current;
+        if (audioBlob) {
+          // The user already pressed stop: nothing else will deliver a decision
+          stoppedRecording.current = null;
+          verificationStream.current = null;
+          appendTerminalLog(`STREAM LOST (${error.message}). FALLING BACK TO UPLOAD...`);
+          submitRecording(audioBlob);
+        } else {
+          appendTerminalLog(`STREAM UNAVAILABLE (${error.message}). BUFFERING LOCALLY...`);
+        }
+      });
+  }, [isRecording, stream]);
+
   /**
    * Toggles microphone recording on/off.
    * When stopping, automatically triggers voice authentication.
@@ -61,23 +110,50 @@ const VerifyPage = () => {
       // Stop recording and process the audio
       appendTerminalLog('TERMINATING DATA STREAM...');
       setVerificationStatus('processing');
-      const audioBlob = await stopRecording();
-
-      if (audioBlob) {
-        appendTerminalLog(`BUFFER LOCKED [${audioBlob.size} BYTES]`);
-        executeAuthenticationProtocol(audioBlob);
-      } else {
-        setVerificationStatus('idle');
-        appendTerminalLog('ERROR: NULL SIGNAL RECEIVED');
+
+      const session = verificationStream.current;
+      if (session && !streamFailed.current) {
+        // The streaming session delivers the decision; the recording is
+        // kept in case the stream closes before it does
+        session.finish();
+        const audioBlob = await stopRecording();
+        if (!streamFailed.current) {
+          stoppedRecording.current = audioBlob;
+          return;
+        }
+        // The stream failed while the recorder was stopping
+        verificationStream.current = null;
+        submitRecording(audioBlob);
+        return;
+      }
+      if (session) {
+        session.close();
+        verificationStream.current = null;
       }
+
+      submitRecording(await stopRecording());
     } else {
       // Start recording
       appendTerminalLog('INITIALIZING SECURE CHANNEL...');
       setVerificationStatus('recording');
+      stoppedRecording.current = null;
       startRecording();
     }
   };
 
+  /**
+   * Uploads a finished recording to /verify.
+   */
+  const submitRecording = (audioBlob) => {
+    if (audioBlob) {
+      appendTerminalLog(`BUFFER LOCKED [${audioBlob.size} BYTES]`);
+      executeAuthenticationProtocol(audioBlob);
+    } else {
+      setVerificationStatus('idle');
+      appendTerminalLog('ERROR: NULL SIGNAL RECEIVED');
+    }
+  };
+
   const { showToast } = useToast();
 
   /**
@@ -116,23 +192,7 @@ const VerifyPage = () => {
       appendTerminalLog('COMPARING AGAINST NEURAL VECTORS...');
       await delay(600);
 
-      setSimilarityScore(result.similarity_score);
-      setResultDetails(result);
-
-      if (result.spoof) {
-        appendTerminalLog('!!! SECURITY VIOLATION: SYNTHETIC SIGNATURE !!!');
-        setVerificationStatus('spoof');
-        showToast('Artificial signature detected.', 'error');
-      } else if (result.verified) {
-        appendTerminalLog(`IDENTITY VERIFIED. CONFIDENCE: ${(result.similarity_score * 100).toFixed(2)}%`);
-        setVerificationStatus('verified');
-      } else {
-        appendTerminalLog(`ACCESS DENIED. CONFIDENCE: ${(result.similarity_score * 100).toFixed(2)}%`);
-        setVerificationStatus('rejected');
-      }
-
-      // Show result modal after a brief moment
-      setTimeout(() => setShowResultModal(true), 500);
+      presentVerificationResult(result);
 
     } catch (error) {
       appendTerminalLog(`FATAL ERROR: ${error.message}`);
@@ -141,6 +201,30 @@ const VerifyPage = () => {
     }
   };
 
+  /**
+   * Shows a verification result (from /verify or the streaming session).
+   * Handles three possible outcomes: verified, rejected, or spoof detected.
+   */
+  const presentVerificationResult = (result) => {
+    setSimilarityScore(result.similarity_score);
+    setResultDetails(result);
+
+    if (result.spoof) {
+      appendTerminalLog('!!! SECURITY VIOLATION: SYNTHETIC SIGNATURE !!!');
+      setVerificationStatus('spoof');
+      showToast('Artificial signature detected.', 'error');
+    } else if (result.verified) {
+      appendTerminalLog(`IDENTITY VERIFIED. CONFIDENCE: ${(result.similarity_score * 100).toFixed(2)}%`);
+      setVerificationStatus('verified');
+    } else {
+      appendTerminalLog(`ACCESS DENIED. CONFIDENCE: ${(result.similarity_score * 100).toFixed(2)}%`);
+      setVerificationStatus('rejected');
+    }
+
+    // Show result modal after a brief moment
+    setTimeout(() => setShowResultModal(true), 500);
+  };
+
   /**
    * Resets the verification system to initial state.
    * Allows user to try authentication again.